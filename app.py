@@ -24,9 +24,12 @@ import secrets
 import sys
 from datetime import datetime
 
+import click
 from flask import Flask, session, g, send_from_directory
 
-from modules.db import init_db
+from modules.db import init_db, set_payload_compression, set_nlp_label_storage
+from modules.diff_handler import set_diff_workers
+from modules.maintenance import MAINTENANCE_INTERVAL_SECONDS, start_maintenance_scheduler
 from modules.translations import get_translation
 from modules.webutils import load_current_user as _load_current_user
 
@@ -99,6 +102,32 @@ if not app.config.get('SECRET_KEY') or app.config['SECRET_KEY'] == 'supersecretk
 
 init_db(app.config['DATABASE_PATH'])
 
+# Optional compressed storage for diff payloads (config.json: "COMPRESS_PAYLOADS": true)
+set_payload_compression(app.config.get('COMPRESS_PAYLOADS', False))
+
+# Store NLP enum codes only; labels are resolved on read (config.json: "COMPACT_NLP_LABELS": true)
+set_nlp_label_storage(app.config.get('COMPACT_NLP_LABELS', False))
+
+def start_background_maintenance():
+    """
+    Start background ANALYZE / incremental vacuum / WAL checkpoint of idle project DBs
+    (config.json: "MAINTENANCE_INTERVAL" in seconds, 0 to disable). Called by the server
+    entry point rather than at import, so CLI commands and tests do not start the thread.
+    """
+    interval = app.config.get('MAINTENANCE_INTERVAL', MAINTENANCE_INTERVAL_SECONDS)
+    if interval:
+        start_maintenance_scheduler(app.config['DATABASE_PATH'], interval)
+
+# Worker processes for project-wide diff computation (config.json: "DIFF_WORKERS", default 1)
+set_diff_workers(app.config.get('DIFF_WORKERS', 1))
+
+# spaCy pipelines load lazily on first use; optionally load them at startup
+# (config.json: "SPACY_WARMUP": true for every language, or a list such as ["fr"])
+_spacy_warmup = app.config.get('SPACY_WARMUP', False)
+if _spacy_warmup:
+    from modules.spacy_models import warm_up
+    warm_up(_spacy_warmup if isinstance(_spacy_warmup, list) else None)
+
 
 # Register Blueprints
 from modules.web.api import api_bp
@@ -151,6 +180,38 @@ def inject_translations():
         return get_translation(key, lang, **kwargs)
     return dict(get_translation=_get_translation)
 
+@app.cli.command('recode-payloads')
+@click.option('--project', 'project_names', multiple=True, help='Project to convert (default: all projects).')
+@click.option('--decompress', is_flag=True, help='Store payloads as plain JSON/HTML text again.')
+def recode_payloads_command(project_names, decompress):
+    """
+    Convert existing json_items/diff_data payloads to the compressed encoding (or back).
+    """
+    from modules.db import get_projects, recode_project_payloads
+    db_path = app.config['DATABASE_PATH']
+    names = project_names or [row[0] for row in get_projects(db_path)]
+    for name in names:
+        stats = recode_project_payloads(name, db_path, compress=not decompress)
+        click.echo(f"{name}: {stats['json_items']} items, {stats['diff_data']} diffs, "
+                   f"{stats['size_before'] / 1e6:.1f} MB -> {stats['size_after'] / 1e6:.1f} MB")
+
+
+@app.cli.command('compact-nlp-labels')
+@click.option('--project', 'project_names', multiple=True, help='Project to convert (default: all projects).')
+@click.option('--expand', is_flag=True, help='Store label strings again, in the project language.')
+def compact_nlp_labels_command(project_names, expand):
+    """
+    Drop the stored token/entity label strings of existing projects (or write them back).
+    """
+    from modules.db import get_projects, recode_project_nlp_labels
+    db_path = app.config['DATABASE_PATH']
+    names = project_names or [row[0] for row in get_projects(db_path)]
+    for name in names:
+        stats = recode_project_nlp_labels(name, db_path, compact=not expand)
+        click.echo(f"{name}: {stats['tokens']} tokens, {stats['entities']} entities, "
+                   f"{stats['size_before'] / 1e6:.1f} MB -> {stats['size_after'] / 1e6:.1f} MB")
+
+
 @app.route('/download_sample_csv')
 def download_sample_csv():
     return send_from_directory(os.path.join(base_path, 'samples'), 'ai_ethics_paragraph_corrections.csv', as_attachment=True)
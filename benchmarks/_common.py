@@ -0,0 +1,93 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+Shared helpers for the benchmark scripts: a synthetic project builder and a timer.
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules import db  # noqa: E402
+
+WORDS = ['le', 'chat', 'mange', 'la', 'souris', 'dans', 'une', 'maison', 'bleue', 'avec',
+         'des', 'amis', 'qui', 'parlent', 'trop', 'fort', 'pendant', 'nuit', 'calme', 'du']
+
+
+def sentence(rng, n=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+def build_project(db_path, project_name, n_pairs, tokens_per_text=20, seed=42):
+    """
+    Create a project DB holding n_pairs synthetic pairs with diff items, NLP rows,
+    tags, annotations, chat messages and notes.
+    """
+    rng = random.Random(seed)
+    db.init_db(db_path)
+    db.create_project_db(project_name, 'benchmark', 'fr', db_path)
+
+    conn = db.get_connection(os.path.join(db_path, f'{project_name}.db'))
+    c = conn.cursor()
+    c.executemany("INSERT INTO tags (name, description, color) VALUES (?, ?, ?)",
+                  [(f'tag{i}', '', '#000000') for i in range(20)])
+    csv_rows, items, tokens, entities, annotations, chats, notes = [], [], [], [], [], [], []
+    for pair_id in range(1, n_pairs + 1):
+        wrong, correct = sentence(rng), sentence(rng)
+        csv_rows.append((pair_id, wrong, correct))
+        for data_type in ('wrong', 'correct', 'diff'):
+            for seg in range(4):
+                content = {'text': rng.choice(WORDS), 'operation': seg % 3 - 1,
+                           'position_in_wrong': seg * 5, 'position_in_correct': seg * 5,
+                           'position_in_diff': seg * 5}
+                items.append((str(pair_id), data_type, json.dumps(content)))
+        for text_type in ('error_text', 'corrected_text'):
+            for pos in range(tokens_per_text):
+                tokens.append((pair_id, text_type, rng.choice(WORDS), pos * 5, 'NOUN', pos, 'dep', 'lemma'))
+            entities.append((pair_id, text_type, 'maison', 'LOCATION', 'maison', 10, 'COMMON'))
+        for k in range(3):
+            annotations.append((pair_id, 'wrong', k * 10, k * 10 + 4, rng.randint(1, 20), 'txt'))
+        chats.append((pair_id, 'user', 'question'))
+        chats.append((pair_id, 'ai', 'answer'))
+        notes.append((pair_id, 'note', 'content'))
+
+    c.executemany("INSERT INTO csv_data (id, error_text, corrected_text) VALUES (?, ?, ?)", csv_rows)
+    c.executemany("INSERT INTO json_items (pair_id, data_type, json_content) VALUES (?, ?, ?)", items)
+    c.executemany('INSERT INTO tokens (pair_id, text_type, token, "position", tag, head_token, label, lemma) '
+                  'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', tokens)
+    c.executemany("INSERT INTO entities (pair_id, text_type, name, type, content, position, common_or_proper) "
+                  "VALUES (?, ?, ?, ?, ?, ?, ?)", entities)
+    c.executemany("INSERT INTO annotations (pair_id, data_type, start_offset, end_offset, tag_id, text) "
+                  "VALUES (?, ?, ?, ?, ?, ?)", annotations)
+    c.executemany("INSERT INTO chat_history (pair_id, sender, message) VALUES (?, ?, ?)", chats)
+    c.executemany("INSERT INTO notes (pair_id, title, content) VALUES (?, ?, ?)", notes)
+    conn.commit()
+    conn.close()
+
+
+def timed(fn, repeat=1):
+    """
+    Run fn repeat times and return (seconds per call, last result).
+    """
+    start = time.perf_counter()
+    result = None
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
@@ -0,0 +1,126 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+Write throughput (rows/s) of the diff JSON and CSV writers on a 50k-segment project:
+per-pair writes (one connection, transaction and INSERT per segment, as before) versus
+the batched single-transaction writers.
+
+    python benchmarks/bench_bulk_writes.py [--segments 50000] [--batch 50]
+"""
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import tempfile
+
+from _common import db, sentence, timed
+
+SEGMENTS_PER_RESULT = 4
+
+
+def make_results(n_pairs):
+    rng = random.Random(7)
+    results = []
+    for pair_id in range(1, n_pairs + 1):
+        result = {'pair_id': pair_id, 'title': f'Pair {pair_id}', 'diff_text': '<span>' + sentence(rng) + '</span>'}
+        for data_type in ('wrong', 'correct', 'diff'):
+            result[data_type] = json.dumps([
+                {'text': sentence(rng, 3), 'operation': (seg % 2) or -1, 'position_in_wrong': seg}
+                for seg in range(SEGMENTS_PER_RESULT)
+            ])
+        results.append(result)
+    return results
+
+
+def per_pair_writes(project_name, results, db_path):
+    # The write pattern of the original process_and_save_text_pairs
+    db_file = os.path.join(db_path, f'{project_name}.db')
+    for r in results:
+        conn = sqlite3.connect(db_file)
+        conn.execute('UPDATE csv_data SET title = ? WHERE id = ?', (r['title'], r['pair_id']))
+        conn.commit()
+        conn.close()
+        for data_type in ('wrong', 'correct', 'diff'):
+            conn = sqlite3.connect(db_file)
+            c = conn.cursor()
+            c.execute('DELETE FROM json_items WHERE pair_id = ? AND data_type = ?', (r['pair_id'], data_type))
+            for item in json.loads(r[data_type]):
+                item['pair_id'] = r['pair_id']
+                c.execute('INSERT INTO json_items (pair_id, data_type, json_content) VALUES (?, ?, ?)',
+                          (r['pair_id'], data_type, json.dumps(item)))
+            conn.commit()
+            conn.close()
+        conn = sqlite3.connect(db_file)
+        conn.execute('INSERT OR REPLACE INTO diff_data (pair_id, diff_text) VALUES (?, ?)', (r['pair_id'], r['diff_text']))
+        conn.commit()
+        conn.close()
+
+
+def batched_writes(project_name, results, db_path, batch):
+    for i in range(0, len(results), batch):
+        db.submit_text_pair_results(project_name, results[i:i + batch], db_path).result()
+
+
+def per_row_csv(project_name, rows, db_path):
+    conn = sqlite3.connect(os.path.join(db_path, f'{project_name}.db'))
+    c = conn.cursor()
+    for item in rows:
+        c.execute('INSERT INTO csv_data (error_text, corrected_text) VALUES (?, ?)', (item['ErrorText'], item['CorrectedText']))
+        item['id'] = c.lastrowid
+    conn.commit()
+    conn.close()
+
+
+def fresh_project(db_path, name):
+    db.create_project_db(name, 'benchmark', 'fr', db_path)
+    return name
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--segments', type=int, default=50000)
+    parser.add_argument('--batch', type=int, default=50)
+    args = parser.parse_args()
+
+    n_pairs = args.segments // (3 * SEGMENTS_PER_RESULT)
+    n_segments = n_pairs * 3 * SEGMENTS_PER_RESULT
+    results = make_results(n_pairs)
+    rng = random.Random(3)
+    csv_rows = [{'ErrorText': sentence(rng), 'CorrectedText': sentence(rng)} for _ in range(n_segments)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(tmp)
+        rows = {}
+        name = fresh_project(tmp, 'per_pair')
+        rows['diff JSON, per pair'] = timed(lambda: per_pair_writes(name, results, tmp))[0]
+        name = fresh_project(tmp, 'batched')
+        rows[f'diff JSON, batches of {args.batch} pairs'] = timed(lambda: batched_writes(name, results, tmp, args.batch))[0]
+        name = fresh_project(tmp, 'csv_per_row')
+        rows['CSV, one INSERT per row'] = timed(lambda: per_row_csv(name, [dict(r) for r in csv_rows], tmp))[0]
+        name = fresh_project(tmp, 'csv_bulk')
+        rows['CSV, executemany'] = timed(lambda: db.save_csv_data_stream(
+            name, iter([[(r['ErrorText'], r['CorrectedText']) for r in csv_rows]]), tmp))[0]
+
+    print(f"{n_segments} diff segments ({n_pairs} pairs), {n_segments} CSV rows")
+    print(f"{'writer':34} {'seconds':>8} {'rows/s':>10}")
+    for label, seconds in rows.items():
+        print(f"{label:34} {seconds:8.2f} {n_segments / seconds:10.0f}")
+
+
+if __name__ == '__main__':
+    main()
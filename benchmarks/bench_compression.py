@@ -0,0 +1,109 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+Project DB size and load time with plain versus compressed diff payloads.
+
+    python benchmarks/bench_compression.py [--pairs 3000] [--segments 8]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+
+from _common import WORDS, db, sentence, timed
+
+TOKEN_FIELDS = ['aspect', 'case', 'form', 'gender', 'mood', 'number', 'person', 'proper',
+                'reciprocity', 'tense', 'voice']
+
+
+def morphology_row(rng, pair_id, position):
+    # Shape of a tokens row as returned by find_token_in_csv
+    row = {'id': rng.randint(1, 10 ** 6), 'pair_id': pair_id, 'text_type': 'error_text',
+           'token': rng.choice(WORDS), 'position': position, 'tag': 'NOUN', 'head_token': position // 5,
+           'label': 'NSUBJ', 'lemma': rng.choice(WORDS), 'distance': 0}
+    for field in TOKEN_FIELDS:
+        row[field] = f'{field.upper()}_UNKNOWN'
+        row[f'{field}_code'] = 0
+    row['tag_code'] = 6
+    row['dep_label_code'] = 28
+    return row
+
+
+def entity_row(rng, pair_id, position):
+    return {'id': rng.randint(1, 10 ** 6), 'pair_id': pair_id, 'text_type': 'error_text', 'name': rng.choice(WORDS),
+            'type': 'OTHER', 'content': rng.choice(WORDS), 'position': position, 'common_or_proper': 'COMMON',
+            'entity_type_code': 7, 'mention_type_code': 2, 'distance': 0}
+
+
+def make_results(n_pairs, segments):
+    rng = random.Random(11)
+    results = []
+    for pair_id in range(1, n_pairs + 1):
+        result = {'pair_id': pair_id, 'title': None,
+                  'diff_text': ''.join(f'<span style="background:#e6ffe6;">{sentence(rng, 4)}</span>' for _ in range(segments))}
+        for data_type in ('wrong', 'correct', 'diff'):
+            result[data_type] = [{
+                'operation': rng.choice(['unchanged', 'added', 'deleted', 'replaced', 'replacedby']),
+                'pair_id': pair_id, 'position_in_diff': seg * 20, 'position_in_wrong': seg * 20,
+                'position_in_correct': seg * 20, 'element': sentence(rng, 3),
+                'morphology': [morphology_row(rng, pair_id, seg * 20)],
+                'entities': [entity_row(rng, pair_id, seg * 20)],
+                'Highlights': [],
+            } for seg in range(segments)]
+        results.append(result)
+    return results
+
+
+def load_all(project_name, db_path):
+    for data_type in ('wrong', 'correct', 'diff'):
+        db.load_json_data(project_name, data_type, db_path)
+
+
+def measure(project_name, db_path):
+    db_file = os.path.join(db_path, f'{project_name}.db')
+    db.close_connections(db_file)
+    load_s, _ = timed(lambda: load_all(project_name, db_path), repeat=3)
+    return os.path.getsize(db_file), load_s
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pairs', type=int, default=3000)
+    parser.add_argument('--segments', type=int, default=8)
+    args = parser.parse_args()
+
+    results = make_results(args.pairs, args.segments)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.init_db(tmp)
+        db.create_project_db('bench', 'benchmark', 'fr', tmp)
+        for i in range(0, len(results), 200):
+            db.submit_text_pair_results('bench', results[i:i + 200], tmp).result()
+        db.recode_project_payloads('bench', tmp, compress=False)  # VACUUM for a fair baseline
+        plain_size, plain_load = measure('bench', tmp)
+
+        convert_s, stats = timed(lambda: db.recode_project_payloads('bench', tmp, compress=True))
+        packed_size, packed_load = measure('bench', tmp)
+
+    segments = args.pairs * args.segments * 3
+    print(f"{args.pairs} pairs, {segments} json_items; conversion took {convert_s:.1f}s")
+    print(f"{'encoding':12} {'DB size MB':>11} {'load all items s':>17}")
+    print(f"{'plain':12} {plain_size / 1e6:11.1f} {plain_load:17.2f}")
+    print(f"{'compressed':12} {packed_size / 1e6:11.1f} {packed_load:17.2f}")
+
+
+if __name__ == '__main__':
+    main()
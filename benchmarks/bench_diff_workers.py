@@ -0,0 +1,52 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+Pairs per second of process_and_save_text_pairs with 1, 2, 4 and 8 worker processes.
+Titles are not generated (no Gemini calls), so only the diff computation and writes are timed.
+
+    python benchmarks/bench_diff_workers.py [--pairs 2000] [--tokens 40] [--workers 1 2 4 8]
+"""
+
+import argparse
+import os
+import tempfile
+
+from _common import build_project, timed
+from modules import diff_handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pairs', type=int, default=2000)
+    parser.add_argument('--tokens', type=int, default=40)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    diff_handler.generate_pair_title = lambda *_: None
+    db_path = tempfile.mkdtemp(prefix='bench_workers_')
+    build_project(db_path, 'bench', args.pairs, args.tokens)
+
+    print(f"{args.pairs} pairs, {args.tokens} NLP tokens per text, {os.cpu_count()} CPUs")
+    baseline = None
+    for workers in args.workers:
+        seconds, _ = timed(lambda: diff_handler.process_and_save_text_pairs('bench', db_path, None, force=True,
+                                                                           workers=workers))
+        baseline = baseline or seconds
+        print(f"  {workers} worker(s): {args.pairs / seconds:9.1f} pairs/s  ({baseline / seconds:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+Per-pair query latency on a synthetic project, without and with the secondary index set.
+
+    python benchmarks/bench_indexes.py [--pairs 10000] [--samples 200]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+
+from _common import build_project, db, timed
+
+PER_PAIR_QUERIES = {
+    'tokens by pair/text_type': (
+        'SELECT * FROM tokens WHERE pair_id = ? AND text_type = ? ORDER BY "position"',
+        lambda p: (p, 'error_text')),
+    'entities by pair': (
+        'SELECT * FROM entities WHERE pair_id = ? AND text_type = ?',
+        lambda p: (p, 'corrected_text')),
+    'json_items by type/pair': (
+        'SELECT id, json_content FROM json_items WHERE data_type = ? AND pair_id = ?',
+        lambda p: ('diff', str(p))),
+    'annotations + tags for pair': (
+        'SELECT a.*, t.name FROM annotations a JOIN tags t ON t.id = a.tag_id '
+        'WHERE a.pair_id = ? AND a.data_type = ?',
+        lambda p: (p, 'wrong')),
+    'save_annotation overlap check': (
+        'SELECT id FROM annotations WHERE pair_id = ? AND data_type = ? AND tag_id = ? '
+        'AND start_offset < ? AND end_offset > ?',
+        lambda p: (p, 'wrong', 3, 14, 10)),
+    'chat_history for pair': (
+        'SELECT sender, message FROM chat_history WHERE pair_id = ? ORDER BY timestamp',
+        lambda p: (p,)),
+    'notes for pair': (
+        'SELECT * FROM notes WHERE pair_id = ?',
+        lambda p: (p,)),
+}
+
+
+def run_queries(conn, pair_ids):
+    results = {}
+    c = conn.cursor()
+    for label, (sql, params) in PER_PAIR_QUERIES.items():
+        def run():
+            for pair_id in pair_ids:
+                c.execute(sql, params(pair_id)).fetchall()
+        elapsed, _ = timed(run)
+        results[label] = elapsed / len(pair_ids) * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--pairs', type=int, default=10000)
+    parser.add_argument('--samples', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_project(tmp, 'bench', args.pairs)
+        pair_ids = random.Random(1).sample(range(1, args.pairs + 1), args.samples)
+        conn = db.get_connection(os.path.join(tmp, 'bench.db'))
+
+        for name, _, _ in db._PROJECT_INDEXES:
+            conn.execute(f'DROP INDEX IF EXISTS {name}')
+        conn.execute('DROP TABLE IF EXISTS sqlite_stat1')
+        conn.commit()
+        before = run_queries(conn, pair_ids)
+
+        elapsed, _ = timed(lambda: db.ensure_project_indexes(conn, 'bench', force=True))
+        after = run_queries(conn, pair_ids)
+        conn.close()
+
+    print(f"{args.pairs} pairs, {args.samples} sampled pairs; index build + ANALYZE: {elapsed:.2f}s")
+    print(f"{'query':32} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+    for label in PER_PAIR_QUERIES:
+        print(f"{label:32} {before[label]:10.3f} {after[label]:10.3f} {before[label] / after[label]:7.0f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+Pairs per second of the diff tokenization: one spaCy load and one nlp() call per segment
+(original compare_texts) versus the shared registry and one nlp.pipe call per batch of pairs.
+
+    python benchmarks/bench_spacy_pipeline.py [--pairs 500] [--words 40]
+"""
+
+import argparse
+import random
+
+import spacy
+
+from _common import sentence, timed
+from modules.diff_handler import PAIR_WRITE_BATCH, diff_segments
+from modules.spacy_models import SPACY_MODELS, get_nlp, tokenize_segments
+
+
+def make_pairs(n_pairs, words):
+    rng = random.Random(7)
+    pairs = []
+    for _ in range(n_pairs):
+        wrong = sentence(rng, words)
+        correct = wrong.split()
+        for _ in range(max(1, words // 8)):
+            correct[rng.randrange(len(correct))] = sentence(rng, 1)
+        pairs.append((wrong, ' '.join(correct)))
+    return pairs
+
+
+def load_model(language):
+    # What compare_texts did for every pair
+    try:
+        return spacy.load(SPACY_MODELS[language])
+    except OSError:
+        return spacy.blank(language)
+
+
+def per_pair(pairs, language):
+    for wrong, correct in pairs:
+        nlp = load_model(language)
+        for _, text in diff_segments(wrong, correct):
+            [token.text for token in nlp(text)]
+
+
+def batched(pairs, language):
+    for start in range(0, len(pairs), PAIR_WRITE_BATCH):
+        diffs = [diff_segments(wrong, correct) for wrong, correct in pairs[start:start + PAIR_WRITE_BATCH]]
+        tokenize_segments(language, [segment[1] for diff in diffs for segment in diff])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pairs', type=int, default=500)
+    parser.add_argument('--words', type=int, default=40)
+    parser.add_argument('--language', default='fr')
+    args = parser.parse_args()
+
+    pairs = make_pairs(args.pairs, args.words)
+    get_nlp(args.language)
+
+    before, _ = timed(lambda: per_pair(pairs, args.language))
+    after, _ = timed(lambda: batched(pairs, args.language))
+    print(f"{args.pairs} pairs, {args.words} words per text, language {args.language}")
+    print(f"  load + nlp() per pair:    {args.pairs / before:9.1f} pairs/s")
+    print(f"  registry + batched pipe:  {args.pairs / after:9.1f} pairs/s  ({before / after:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
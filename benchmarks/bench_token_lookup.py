@@ -0,0 +1,74 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+find_token_in_csv: DataFrame scan per token (original) versus the NlpIndex offset index.
+Both are run on the same lookups and their results are checked to be identical.
+
+    python benchmarks/bench_token_lookup.py [--pairs 300] [--tokens 40] [--lookups 2000]
+"""
+
+import argparse
+import json
+import random
+import tempfile
+
+from _common import WORDS, build_project, db, timed
+from modules.text_processing import NlpIndex, _row_dict
+
+
+def scan_lookup(tokens, position, text_type, df):
+    # The original implementation
+    column = 'token' if 'token' in df.columns else 'name'
+    results = []
+    for token in tokens:
+        if token.strip() == '':
+            continue
+        matched = df[(df[column].str.lower().str.contains(token.lower(), regex=False)) & (df['text_type'] == text_type)].copy()
+        if matched.empty:
+            mask = (df['position'] >= position - 5) & (df['position'] <= position + 5) & (df['text_type'] == text_type)
+            matched = df[mask].copy()
+        if not matched.empty:
+            matched.loc[:, 'distance'] = (matched['position'] - position).abs()
+            results.append(_row_dict(matched.loc[matched['distance'].idxmin()]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pairs', type=int, default=300)
+    parser.add_argument('--tokens', type=int, default=40)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    db_path = tempfile.mkdtemp(prefix='bench_lookup_')
+    build_project(db_path, 'bench', args.pairs, args.tokens)
+    rng = random.Random(5)
+    lookups = [([rng.choice(WORDS + ['maison', 'zz', ',', ' '])], rng.randint(0, args.tokens * 5),
+                rng.choice(['error_text', 'corrected_text'])) for _ in range(args.lookups)]
+
+    for table in ('tokens', 'entities'):
+        df = db.load_nlp_dataframe('bench', table, db_path)
+        scan, expected = timed(lambda: [json.dumps(scan_lookup(t, p, tt, df)) for t, p, tt in lookups])
+        indexed, got = timed(lambda: [json.dumps(index.find(t, p, tt))
+                                      for index in [NlpIndex(df)] for t, p, tt in lookups])
+        assert got == expected, f'{table}: index results differ from the scan'
+        print(f"{table}: {len(df)} rows, {args.lookups} lookups, identical results")
+        print(f"  scan per token:  {scan * 1000:9.1f} ms")
+        print(f"  offset index:    {indexed * 1000:9.1f} ms  ({scan / indexed:.0f}x, index build included)")
+
+
+if __name__ == '__main__':
+    main()
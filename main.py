@@ -13,7 +13,8 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
 
-from app import app
+from app import app, start_background_maintenance
 
 if __name__ == '__main__':
+    start_background_maintenance()
     app.run(debug=True)
\ No newline at end of file
@@ -14,11 +14,471 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
 
 import sqlite3
+import html
 import json
 import os
+import queue
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from functools import partial
+from urllib.request import pathname2url
 import pandas as pd
+from cachetools import TTLCache
+from .nlp_labels import FALLBACK_LABEL, LABEL_COLUMNS, code_map, label_map, resolve_label
 from .utils import sanitize_input
 
+# ========== Connection pool ==========
+# Every database file (maindb.db and one file per project) keeps a small pool of
+# idle connections. A connection is configured once when it is opened (WAL
+# journaling, page cache, mmap, busy timeout) and is handed back to the pool by
+# close() instead of being torn down, so request handlers no longer pay for a
+# fresh connect and PRAGMA setup on every call. The pool also records when each
+# file was last used and when each checked-out connection was leased, which the
+# background maintenance (modules/maintenance.py) uses to find active databases that are idle.
+
+POOL_MAX_IDLE = 8
+BUSY_TIMEOUT_MS = 15000
+CACHE_SIZE_KIB = 32 * 1024
+MMAP_SIZE_BYTES = 256 * 1024 * 1024
+
+_pool_lock = threading.Lock()
+_idle_connections = {}
+_last_used = {}
+_checked_out = {}
+# db_file -> {id(conn): time.monotonic() of its checkout} for connections not yet handed back
+_leases = {}
+# db_file -> lock held while that file is renamed, deleted, vacuumed or maintained (see file_lock)
+_file_locks = {}
+# Connections inherited through fork() belong to the parent; the child keeps a
+# reference so they are never closed (or reused) from the child process.
+_inherited_connections = []
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    sqlite3 connection whose close() returns it to the pool of its database file.
+    """
+
+    def close(self):
+        if self._pooled:
+            return
+        try:
+            if self.in_transaction:
+                self.rollback()
+            self.row_factory = None
+        except sqlite3.Error:
+            self.discard()
+            return
+        self._pooled = True
+        _release(self.db_file, self)
+        _checkin(self)
+
+    def discard(self):
+        """
+        Really close the connection instead of returning it to the pool.
+        """
+        if not self._pooled:
+            _release(self.db_file, self)
+        self._pooled = True
+        super().close()
+
+
+def _open_connection(db_file):
+    conn = sqlite3.connect(db_file, timeout=BUSY_TIMEOUT_MS / 1000,
+                           check_same_thread=False, factory=PooledConnection)
+    conn.db_file = db_file
+    conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+    try:
+        conn.execute('PRAGMA journal_mode = WAL')
+    except sqlite3.OperationalError as e:
+        print(f"[WARN] Could not enable WAL mode for {db_file}: {e}")
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KIB}')
+    conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE_BYTES}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+
+def _release(db_file, conn=None):
+    with _pool_lock:
+        _checked_out[db_file] = max(_checked_out.get(db_file, 0) - 1, 0)
+        _last_used[db_file] = time.monotonic()
+        if conn is not None:
+            _leases.get(db_file, {}).pop(id(conn), None)
+
+
+def _checkin(conn):
+    with _pool_lock:
+        idle = _idle_connections.setdefault(conn.db_file, [])
+        if len(idle) < POOL_MAX_IDLE:
+            idle.append(conn)
+            return
+    conn.discard()
+
+
+def get_connection(db_file):
+    """
+    Check out a pooled connection to db_file. Call close() to hand it back.
+    """
+    db_file = os.path.abspath(db_file)
+    conn = None
+    with _pool_lock:
+        idle = _idle_connections.get(db_file)
+        if idle:
+            conn = idle.pop()
+        _checked_out[db_file] = _checked_out.get(db_file, 0) + 1
+        _last_used[db_file] = time.monotonic()
+    if conn is None:
+        try:
+            conn = _open_connection(db_file)
+        except sqlite3.Error:
+            _release(db_file)
+            raise
+    conn._pooled = False
+    with _pool_lock:
+        _leases.setdefault(db_file, {})[id(conn)] = time.monotonic()
+    return conn
+
+
+def db_activity():
+    """
+    {db_file: (time.monotonic() of the last checkout or close, connections checked out,
+    time.monotonic() of the newest checkout still held or None)} for every database file
+    used through the pool in this process.
+    """
+    with _pool_lock:
+        return {db_file: (last, _checked_out.get(db_file, 0), max(_leases.get(db_file, {}).values(), default=None))
+                for db_file, last in _last_used.items()}
+
+
+def close_connections(db_file):
+    """
+    Close every idle pooled connection to db_file, e.g. before the file is renamed or deleted.
+    """
+    db_file = os.path.abspath(db_file)
+    _forget_migrated(db_file)
+    _forget_nlp_frames(db_file)
+    with _pool_lock:
+        idle = _idle_connections.pop(db_file, [])
+        _last_used.pop(db_file, None)
+    for conn in idle:
+        try:
+            conn.discard()
+        except sqlite3.Error:
+            pass
+
+
+@contextmanager
+def db_transaction(db_file):
+    """
+    Pooled connection to db_file for a with block: committed when the block ends normally,
+    rolled back when it raises, and handed back to the pool on every path.
+    """
+    conn = get_connection(db_file)
+    try:
+        yield conn
+        conn.commit()
+    finally:
+        # close() rolls back a transaction left open by an exception
+        conn.close()
+
+
+def transaction(project_name, db_path):
+    """
+    db_transaction on the project's database file.
+    """
+    return db_transaction(os.path.join(db_path, f'{project_name}.db'))
+
+
+def _main_transaction(db_path):
+    return db_transaction(os.path.join(db_path, 'maindb.db'))
+
+
+def checkpoint_db(db_file):
+    """
+    Copy the WAL back into the main database file so the .db file alone is complete,
+    e.g. before it is zipped for export.
+    """
+    conn = get_connection(db_file)
+    try:
+        conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+    finally:
+        conn.close()
+
+
+def file_lock(db_file):
+    """
+    Lock held while db_file is renamed, deleted, vacuumed or maintained. Each database file
+    has its own, so maintaining one project never holds up another.
+    """
+    db_file = os.path.abspath(db_file)
+    with _pool_lock:
+        return _file_locks.setdefault(db_file, threading.Lock())
+
+
+def open_private_connection(db_file):
+    """
+    Autocommit connection to an existing db_file, outside the pool and its writer:
+    VACUUM cannot run inside a transaction, and mode=rw never recreates a file deleted in the meantime.
+    """
+    return sqlite3.connect(f'file:{pathname2url(os.path.abspath(db_file))}?mode=rw', uri=True,
+                           timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+
+
+def vacuum_db(db_file):
+    """
+    Commit the writes queued to db_file's writer, then VACUUM the file on a private
+    connection under its file_lock, as the background maintenance does.
+    """
+    db_file = os.path.abspath(db_file)
+    with _writers_lock:
+        has_writer = db_file in _writers
+    if has_writer:
+        run_write(db_file, lambda conn: None)
+    with file_lock(db_file):
+        conn = open_private_connection(db_file)
+        try:
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+
+
+def _reset_pool_after_fork():
+    global _pool_lock
+    for idle in _idle_connections.values():
+        _inherited_connections.extend(idle)
+    _idle_connections.clear()
+    _last_used.clear()
+    _checked_out.clear()
+    _leases.clear()
+    _file_locks.clear()
+    _pool_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+try:
+    import fcntl
+except ImportError:  # Windows: BEGIN IMMEDIATE and the busy timeout serialise processes
+    fcntl = None
+
+# ========== Serialised writer ==========
+# Writes that can come from several places at once (the web process and the auto-tag
+# worker processes) are queued to one writer thread per project DB file instead of
+# each caller opening its own write transaction. The writer drains its queue into
+# group commits of up to WRITER_MAX_BATCH writes, each in its own savepoint so one
+# failing write does not undo the others, and holds an flock on "<db>.write-lock"
+# around the transaction so writers of different processes take turns instead of
+# racing for SQLITE_BUSY.
+
+WRITER_MAX_BATCH = 64
+WRITER_LINGER_SECONDS = 0.002
+# How long a group commit waits for another process's writer before failing its batch
+WRITER_LOCK_TIMEOUT_SECONDS = BUSY_TIMEOUT_MS / 1000
+WRITER_LOCK_POLL_SECONDS = 0.01
+
+
+class _DBWriter:
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self.queue = queue.Queue()
+        self.stats = {'writes': 0, 'failed': 0, 'batches': 0, 'wait_total': 0.0, 'wait_max': 0.0,
+                      'commit_total': 0.0}
+        self.thread = threading.Thread(target=self._run, name=f'db-writer:{os.path.basename(db_file)}',
+                                       daemon=True)
+        self.thread.start()
+
+    def submit(self, fn):
+        future = Future()
+        self.queue.put((future, fn, time.monotonic()))
+        return future
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            # Let concurrent callers join this commit
+            time.sleep(WRITER_LINGER_SECONDS)
+            while len(batch) < WRITER_MAX_BATCH:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._commit(batch)
+            except Exception as e:
+                # Keep the thread alive: callers waiting on this batch get the error instead
+                print(f"[WARN] Writer of {os.path.basename(self.db_file)} failed a batch: {e}")
+                for future, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def stop(self):
+        """
+        Commit what is queued, then end the writer thread.
+        """
+        self.queue.put(None)
+        self.thread.join()
+
+    def _lock(self):
+        if fcntl is None:
+            return None
+        lock_file = open(self.db_file + '.write-lock', 'a')
+        deadline = time.monotonic() + WRITER_LOCK_TIMEOUT_SECONDS
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return lock_file
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    lock_file.close()
+                    raise sqlite3.OperationalError(
+                        f'timed out after {WRITER_LOCK_TIMEOUT_SECONDS:g}s waiting for {lock_file.name}')
+                time.sleep(WRITER_LOCK_POLL_SECONDS)
+            except BaseException:
+                lock_file.close()
+                raise
+
+    def _commit(self, batch):
+        started = time.monotonic()
+        outcomes = []
+        lock_file = conn = None
+        try:
+            lock_file = self._lock()
+            conn = get_connection(self.db_file)
+            conn.execute('BEGIN IMMEDIATE')
+            for future, fn, _ in batch:
+                conn.execute('SAVEPOINT queued_write')
+                try:
+                    outcomes.append((future, fn(conn), None))
+                    conn.execute('RELEASE queued_write')
+                except Exception as e:
+                    conn.execute('ROLLBACK TO queued_write')
+                    conn.execute('RELEASE queued_write')
+                    outcomes.append((future, None, e))
+            conn.commit()
+        except Exception as e:
+            print(f"[WARN] Group commit of {len(batch)} writes to {os.path.basename(self.db_file)} failed: {e}")
+            outcomes = [(future, None, e) for future, _, _ in batch]
+        finally:
+            if conn is not None:
+                conn.close()
+            if lock_file is not None:
+                lock_file.close()
+
+        finished = time.monotonic()
+        waits = [started - enqueued for _, _, enqueued in batch]
+        stats = self.stats
+        stats['writes'] += len(batch)
+        stats['failed'] += sum(1 for _, _, error in outcomes if error is not None)
+        stats['batches'] += 1
+        stats['wait_total'] += sum(waits)
+        stats['wait_max'] = max(stats['wait_max'], max(waits))
+        stats['commit_total'] += finished - started
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+_writers_lock = threading.Lock()
+_writers = {}
+
+
+def submit_write(db_file, fn):
+    """
+    Queue fn(conn) to run inside the next group commit of db_file's writer.
+    Returns a Future with fn's result (or its exception).
+    """
+    db_file = os.path.abspath(db_file)
+    with _writers_lock:
+        writer = _writers.get(db_file)
+        if writer is None:
+            writer = _writers[db_file] = _DBWriter(db_file)
+    return writer.submit(fn)
+
+
+def run_write(db_file, fn):
+    """
+    Run fn(conn) through db_file's writer and wait for it to be committed.
+    """
+    return submit_write(db_file, fn).result()
+
+
+def writer_stats():
+    """
+    Queue depth and wait/commit times of the writers of this process, per database file.
+    """
+    with _writers_lock:
+        writers = list(_writers.values())
+    report = {}
+    for writer in writers:
+        stats = dict(writer.stats)
+        writes, batches = stats['writes'], stats['batches']
+        report[os.path.basename(writer.db_file)] = {
+            'queue_depth': writer.queue.qsize(),
+            'writes': writes,
+            'failed': stats['failed'],
+            'batches': batches,
+            'avg_batch_size': round(writes / batches, 2) if batches else 0,
+            'avg_wait_ms': round(stats['wait_total'] / writes * 1000, 3) if writes else 0,
+            'max_wait_ms': round(stats['wait_max'] * 1000, 3),
+            'avg_commit_ms': round(stats['commit_total'] / batches * 1000, 3) if batches else 0,
+        }
+    return report
+
+
+def _retire_writer(db_file):
+    # Before a database file is renamed or deleted: flush its queue and drop its writer
+    db_file = os.path.abspath(db_file)
+    with _writers_lock:
+        writer = _writers.pop(db_file, None)
+    if writer is not None:
+        writer.stop()
+    try:
+        os.remove(db_file + '.write-lock')
+    except OSError:
+        pass
+
+
+def _reset_writers_after_fork():
+    global _writers_lock
+    # Writer threads do not survive fork(); the child starts its own on first use
+    _writers.clear()
+    _writers_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_writers_after_fork)
+
+# json_items keeps the segment JSON plus its hot fields as stored generated columns,
+# so counts, pair segments and offset lookups are plain indexed SQL (no JSON decoding)
+_JSON_ITEMS_DDL = '''
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        pair_id INTEGER NOT NULL,
+        data_type TEXT NOT NULL,
+        json_content JSON NOT NULL,
+        operation TEXT GENERATED ALWAYS AS (json_extract(json_content, '$.operation')) STORED,
+        position_in_wrong INTEGER GENERATED ALWAYS AS (json_extract(json_content, '$.position_in_wrong')) STORED,
+        position_in_correct INTEGER GENERATED ALWAYS AS (json_extract(json_content, '$.position_in_correct')) STORED,
+        position_in_diff INTEGER GENERATED ALWAYS AS (json_extract(json_content, '$.position_in_diff')) STORED
+    )
+'''
+
 def init_db(db_path):
     """
     Initialize the main database by creating the necessary tables if they do not exist.
@@ -26,61 +486,59 @@ def init_db(db_path):
     if not os.path.exists(db_path):
         os.makedirs(db_path)
 
-    conn = sqlite3.connect(os.path.join(db_path, 'maindb.db'))
-    c = conn.cursor()
-    # Create table for storing project metadata including file name and Google NLP JSON file
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS projects (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            description TEXT NOT NULL,
-            file_name TEXT,
+    with _main_transaction(db_path) as conn:
+        c = conn.cursor()
+        # Create table for storing project metadata including file name and Google NLP JSON file
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS projects (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                description TEXT NOT NULL,
+                file_name TEXT,
             
-            nlp_active INTEGER NOT NULL DEFAULT 0,
-            genre_active INTEGER NOT NULL DEFAULT 0,
-            language TEXT NOT NULL DEFAULT 'en'
-        )
-    ''')
-
-    # Ensure owner_id column exists for user scoping of projects
-    try:
-        c.execute("PRAGMA table_info(projects)")
-        cols = [row[1] for row in c.fetchall()]
-        if 'owner_id' not in cols:
-            c.execute("ALTER TABLE projects ADD COLUMN owner_id INTEGER")
-    except Exception as e:
-        print(f"[WARN] Could not ensure owner_id column on projects: {e}")
+                nlp_active INTEGER NOT NULL DEFAULT 0,
+                genre_active INTEGER NOT NULL DEFAULT 0,
+                language TEXT NOT NULL DEFAULT 'en'
+            )
+        ''')
 
-    # Users table for authentication & profile management (lives in main DB)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL UNIQUE,
-            email TEXT,
-            password_hash TEXT NOT NULL,
-            full_name TEXT,
-            bio TEXT,
-            avatar_url TEXT,
-            google_api_key TEXT,
-            google_nlp_key_path TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
+        # Ensure owner_id column exists for user scoping of projects
+        try:
+            c.execute("PRAGMA table_info(projects)")
+            cols = [row[1] for row in c.fetchall()]
+            if 'owner_id' not in cols:
+                c.execute("ALTER TABLE projects ADD COLUMN owner_id INTEGER")
+        except Exception as e:
+            print(f"[WARN] Could not ensure owner_id column on projects: {e}")
+
+        # Users table for authentication & profile management (lives in main DB)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT NOT NULL UNIQUE,
+                email TEXT,
+                password_hash TEXT NOT NULL,
+                full_name TEXT,
+                bio TEXT,
+                avatar_url TEXT,
+                google_api_key TEXT,
+                google_nlp_key_path TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
 
-    # Add columns to users table if they don't exist
-    try:
-        c.execute("PRAGMA table_info(users)")
-        cols = [row[1] for row in c.fetchall()]
-        if 'google_api_key' not in cols:
-            c.execute("ALTER TABLE users ADD COLUMN google_api_key TEXT")
-        if 'google_nlp_key_path' not in cols:
-            c.execute("ALTER TABLE users ADD COLUMN google_nlp_key_path TEXT")
-    except Exception as e:
-        print(f"[WARN] Could not alter users table: {e}")
+        # Add columns to users table if they don't exist
+        try:
+            c.execute("PRAGMA table_info(users)")
+            cols = [row[1] for row in c.fetchall()]
+            if 'google_api_key' not in cols:
+                c.execute("ALTER TABLE users ADD COLUMN google_api_key TEXT")
+            if 'google_nlp_key_path' not in cols:
+                c.execute("ALTER TABLE users ADD COLUMN google_nlp_key_path TEXT")
+        except Exception as e:
+            print(f"[WARN] Could not alter users table: {e}")
 
-    conn.commit()
-    conn.close()
 
     # Ensure the databases directory exists
     if not os.path.exists(db_path):
@@ -105,326 +563,414 @@ def create_project_db(project_name, project_description, project_language, db_pa
         os.makedirs(db_path)
 
     # Get the first project's Google key file, if any
-    conn = sqlite3.connect(os.path.join(db_path, 'maindb.db'))
-    c = conn.cursor()
-    
+    with _main_transaction(db_path) as conn:
+        c = conn.cursor()
 
-    # Save project metadata in the main database
-    if owner_id is not None:
-        c.execute('INSERT INTO projects (name, description, language, owner_id) VALUES (?, ?, ?, ?)',
-                  (project_name, project_description, project_language, owner_id))
-    else:
-        c.execute('INSERT INTO projects (name, description, language) VALUES (?, ?, ?)',
-                  (project_name, project_description, project_language))
-    conn.commit()
-    conn.close()
+        # Save project metadata in the main database
+        if owner_id is not None:
+            c.execute('INSERT INTO projects (name, description, language, owner_id) VALUES (?, ?, ?, ?)',
+                      (project_name, project_description, project_language, owner_id))
+        else:
+            c.execute('INSERT INTO projects (name, description, language) VALUES (?, ?, ?)',
+                      (project_name, project_description, project_language))
+    invalidate_project_owner_cache(db_path, project_name)
 
     # Create a new database for the project in the databases folder
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
+    with db_transaction(project_db_name) as conn:
+        c = conn.cursor()
 
-    # Create table for storing CSV data
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS csv_data (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            error_text TEXT NOT NULL,
-            corrected_text TEXT NOT NULL,
-            meaning TEXT,
-            genre TEXT,
-            title TEXT
-        )
-    ''')
+        # Let background maintenance reclaim free pages with incremental vacuums; the file
+        # is still empty, so the VACUUM that applies the setting is instant
+        c.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        c.execute('VACUUM')
 
-    # Create table for storing JSON data with data_type column
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS json_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            pair_id TEXT NOT NULL,
-            data_type TEXT NOT NULL,
-            json_content JSON NOT NULL
-        )
-    ''')
+        # Create table for storing CSV data
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS csv_data (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                error_text TEXT NOT NULL,
+                corrected_text TEXT NOT NULL,
+                meaning TEXT,
+                genre TEXT,
+                title TEXT
+            )
+        ''')
 
-    # Create classifications table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS classifications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            pair_id INTEGER,
-            text_type TEXT,
-            category_name TEXT,
-            confidence REAL,
-            FOREIGN KEY(pair_id) REFERENCES csv_data(id)
-        )
-    ''')
+        # Create table for storing JSON data with data_type column
+        c.execute(_JSON_ITEMS_DDL.format(table='json_items'))
 
-    # Create tokens table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS tokens (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            pair_id INTEGER,
-            text_type TEXT,
-            token TEXT,
-            "position" INTEGER,
-            tag TEXT,
-            "number" TEXT,
-            proper TEXT,
-            aspect TEXT,
-            "case" TEXT,
-            form TEXT,
-            gender TEXT,
-            mood TEXT,
-            person TEXT,
-            reciprocity TEXT,
-            tense TEXT,
-            voice TEXT,
-            head_token INTEGER,
-            label TEXT,
-            lemma TEXT,
-            -- Enum codes for robust re-labeling across languages
-            tag_code INTEGER,
-            number_code INTEGER,
-            proper_code INTEGER,
-            aspect_code INTEGER,
-            case_code INTEGER,
-            form_code INTEGER,
-            gender_code INTEGER,
-            mood_code INTEGER,
-            person_code INTEGER,
-            reciprocity_code INTEGER,
-            tense_code INTEGER,
-            voice_code INTEGER,
-            dep_label_code INTEGER,
-            FOREIGN KEY(pair_id) REFERENCES csv_data(id)
-        )
-    ''')
+        # Create classifications table
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS classifications (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pair_id INTEGER,
+                text_type TEXT,
+                category_name TEXT,
+                confidence REAL,
+                FOREIGN KEY(pair_id) REFERENCES csv_data(id)
+            )
+        ''')
 
-    # Create entities table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS entities (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            pair_id INTEGER,
-            text_type TEXT,
-            name TEXT,
-            type TEXT,
-            content TEXT,
-            position INTEGER,
-            common_or_proper TEXT,
-            -- Enum codes to support re-labeling
-            entity_type_code INTEGER,
-            mention_type_code INTEGER,
-            FOREIGN KEY(pair_id) REFERENCES csv_data(id)
-        )
-    ''')
+        # Create tokens table
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS tokens (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pair_id INTEGER,
+                text_type TEXT,
+                token TEXT,
+                "position" INTEGER,
+                tag TEXT,
+                "number" TEXT,
+                proper TEXT,
+                aspect TEXT,
+                "case" TEXT,
+                form TEXT,
+                gender TEXT,
+                mood TEXT,
+                person TEXT,
+                reciprocity TEXT,
+                tense TEXT,
+                voice TEXT,
+                head_token INTEGER,
+                label TEXT,
+                lemma TEXT,
+                -- Enum codes for robust re-labeling across languages
+                tag_code INTEGER,
+                number_code INTEGER,
+                proper_code INTEGER,
+                aspect_code INTEGER,
+                case_code INTEGER,
+                form_code INTEGER,
+                gender_code INTEGER,
+                mood_code INTEGER,
+                person_code INTEGER,
+                reciprocity_code INTEGER,
+                tense_code INTEGER,
+                voice_code INTEGER,
+                dep_label_code INTEGER,
+                FOREIGN KEY(pair_id) REFERENCES csv_data(id)
+            )
+        ''')
 
-    # Create tags table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS tags (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            description TEXT,
-            parent_tag_id INTEGER,
-            color TEXT NOT NULL DEFAULT '#000000',
-            FOREIGN KEY(parent_tag_id) REFERENCES tags(id)
-        )
-    ''')
+        # Create entities table
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS entities (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pair_id INTEGER,
+                text_type TEXT,
+                name TEXT,
+                type TEXT,
+                content TEXT,
+                position INTEGER,
+                common_or_proper TEXT,
+                -- Enum codes to support re-labeling
+                entity_type_code INTEGER,
+                mention_type_code INTEGER,
+                FOREIGN KEY(pair_id) REFERENCES csv_data(id)
+            )
+        ''')
 
-    # Create annotations table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS annotations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            project_name TEXT NOT NULL,
-            pair_id INTEGER NOT NULL,
-            data_type TEXT NOT NULL,
-            start_offset INTEGER NOT NULL,
-            end_offset INTEGER NOT NULL,
-            tag_id INTEGER NOT NULL,
-            text TEXT,
-            FOREIGN KEY(tag_id) REFERENCES tags(id)
-        )
-    ''')
+        # Create tags table
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS tags (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE,
+                description TEXT,
+                parent_tag_id INTEGER,
+                color TEXT NOT NULL DEFAULT '#000000',
+                FOREIGN KEY(parent_tag_id) REFERENCES tags(id)
+            )
+        ''')
 
-    conn.commit()
+        # Create annotations table
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS annotations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pair_id INTEGER NOT NULL,
+                data_type TEXT NOT NULL,
+                start_offset INTEGER NOT NULL,
+                end_offset INTEGER NOT NULL,
+                tag_id INTEGER NOT NULL,
+                text TEXT,
+                FOREIGN KEY(tag_id) REFERENCES tags(id)
+            )
+        ''')
+
+        conn.commit()
     
-    # Create nlp_conclusions table (cache for AI-generated NLP analysis)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS nlp_conclusions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            pair_id INTEGER NOT NULL UNIQUE,
-            conclusion TEXT,
-            inconsistencies TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(pair_id) REFERENCES csv_data(id)
-        )
-    ''')
+        # Create nlp_conclusions table (cache for AI-generated NLP analysis)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS nlp_conclusions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pair_id INTEGER NOT NULL UNIQUE,
+                conclusion TEXT,
+                inconsistencies TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(pair_id) REFERENCES csv_data(id)
+            )
+        ''')
 
-    conn.commit()
+        conn.commit()
     
-    # Create nlp_linguistic_analyses table (cache for AI-driven linguistic categorization)
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS nlp_linguistic_analyses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            pair_id INTEGER NOT NULL UNIQUE,
-            analysis_json TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(pair_id) REFERENCES csv_data(id)
-        )
-    ''')
+        # Create nlp_linguistic_analyses table (cache for AI-driven linguistic categorization)
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS nlp_linguistic_analyses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pair_id INTEGER NOT NULL UNIQUE,
+                analysis_json TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(pair_id) REFERENCES csv_data(id)
+            )
+        ''')
 
-    # Create auto_tagging_jobs table
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS auto_tagging_jobs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            pair_id INTEGER NOT NULL,
-            instruction TEXT NOT NULL,
-            plan TEXT,
-            status TEXT NOT NULL DEFAULT 'PENDING',
-            result TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(pair_id) REFERENCES csv_data(id)
-        )
-    ''')
+        # Create auto_tagging_jobs table
+        c.execute('''
+            CREATE TABLE IF NOT EXISTS auto_tagging_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pair_id INTEGER NOT NULL,
+                instruction TEXT NOT NULL,
+                plan TEXT,
+                status TEXT NOT NULL DEFAULT 'PENDING',
+                result TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY(pair_id) REFERENCES csv_data(id)
+            )
+        ''')
 
-    conn.commit()
-    conn.close()
+    # Bring the new DB to the current schema (tables created lazily by migrations, indexes)
+    migrate_project_db(project_name, db_path)
 
 
-def save_google_nlp_to_database(project_name, table, content, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
+# Natural keys of the NLP tables (unique indexes created by _migrate_nlp_unique_keys).
+# Re-running NLP for a pair updates its rows in place instead of duplicating them.
+NLP_UNIQUE_KEYS = {
+    'tokens': ('pair_id', 'text_type', 'position'),
+    'entities': ('pair_id', 'text_type', 'position', 'name'),
+    'classifications': ('pair_id', 'text_type', 'category_name'),
+}
 
-    # Prevent duplicate rows if NLP is re-run: clear prior rows for the same pair_id and text_type
-    try:
-        if content and table in ('tokens', 'entities', 'classifications'):
-            # Support both dict and tuple inputs to extract pair_id and text_type
-            first = content[0]
-            if isinstance(first, dict):
-                pair_id = first.get('pair_id')
-                text_type = first.get('text_type')
-            else:
-                pair_id = first[0]
-                text_type = first[1]
-            if pair_id is not None and text_type is not None:
-                c.execute(f"DELETE FROM {table} WHERE pair_id = ? AND text_type = ?", (pair_id, text_type))
-                conn.commit()
-    except Exception:
-        pass
 
-    def _existing_columns(tbl):
-        c.execute(f"PRAGMA table_info({tbl})")
-        return [row[1] for row in c.fetchall()]
-
-    if table in ('tokens', 'entities', 'classifications'):
-        cols_in_db = _existing_columns(table)
-
-        # Canonical ordered columns for each table
-        canonical = {
-            'tokens': [
-                'pair_id','text_type','token','position','tag','number','proper','aspect','case','form','gender',
-                'mood','person','reciprocity','tense','voice','head_token','label','lemma',
-                'tag_code','number_code','proper_code','aspect_code','case_code','form_code','gender_code','mood_code',
-                'person_code','reciprocity_code','tense_code','voice_code','dep_label_code'
-            ],
-            'entities': [
-                'pair_id','text_type','name','type','content','position','common_or_proper','entity_type_code','mention_type_code'
-            ],
-            'classifications': [
-                'pair_id','text_type','category_name','confidence'
-            ],
-        }
+# With compact label storage, tokens/entities rows keep only the enum codes and the
+# label columns stay NULL; readers label the codes in the project language
+# (load_nlp_dataframe, nlp_label_counts). A label is still stored when its code is missing.
+_compact_nlp_labels = False
 
-        insert_cols = [col for col in canonical[table] if col in cols_in_db]
-        if not insert_cols:
-            conn.close()
-            return
 
-        placeholders = ', '.join(['?'] * len(insert_cols))
-        quoted_cols = ', '.join([f'"{col}"' for col in insert_cols])
-        sql = f"INSERT INTO {table} ({quoted_cols}) VALUES ({placeholders})"
+def set_nlp_label_storage(compact):
+    """
+    Choose whether new tokens/entities rows store label strings or only enum codes.
+    """
+    global _compact_nlp_labels
+    _compact_nlp_labels = bool(compact)
+
 
-        rows = []
-        for item in content:
-            if isinstance(item, dict):
-                rows.append(tuple(item.get(col) for col in insert_cols))
-            else:
-                # Backward compatibility for legacy tuples
-                if table == 'tokens':
-                    # Legacy order had 19 fields up to lemma
-                    legacy_cols = [
-                        'pair_id','text_type','token','position','tag','number','proper','aspect','case','form','gender',
-                        'mood','person','reciprocity','tense','voice','head_token','label','lemma'
-                    ]
-                    legacy_map = dict(zip(legacy_cols, item))
-                    rows.append(tuple(legacy_map.get(col) for col in insert_cols))
-                elif table == 'entities':
-                    legacy_cols = ['pair_id','text_type','name','type','content','position','common_or_proper']
-                    legacy_map = dict(zip(legacy_cols, item))
-                    rows.append(tuple(legacy_map.get(col) for col in insert_cols))
-                else:  # classifications
-                    rows.append(tuple(item[i] for i in range(len(insert_cols))))
+def save_google_nlp_to_database(project_name, table, content, db_path):
+    """
+    Upsert NLP rows on their natural key and delete the rows of the same (pair_id, text_type)
+    that the new run no longer produced.
+    """
+    if table not in NLP_UNIQUE_KEYS or not content:
+        return
+
+    migrate_project_db(project_name, db_path)
+    project_db_name = os.path.join(db_path, f'{project_name}.db')
+    with db_transaction(project_db_name) as conn:
+        cols_in_db = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+    # Canonical ordered columns for each table
+    canonical = {
+        'tokens': [
+            'pair_id','text_type','token','position','tag','number','proper','aspect','case','form','gender',
+            'mood','person','reciprocity','tense','voice','head_token','label','lemma',
+            'tag_code','number_code','proper_code','aspect_code','case_code','form_code','gender_code','mood_code',
+            'person_code','reciprocity_code','tense_code','voice_code','dep_label_code'
+        ],
+        'entities': [
+            'pair_id','text_type','name','type','content','position','common_or_proper','entity_type_code','mention_type_code'
+        ],
+        'classifications': [
+            'pair_id','text_type','category_name','confidence'
+        ],
+    }
+
+    insert_cols = [col for col in canonical[table] if col in cols_in_db]
+    key_cols = NLP_UNIQUE_KEYS[table]
+    if not all(col in insert_cols for col in key_cols):
+        return
+
+    rows = []
+    for item in content:
+        if isinstance(item, dict):
+            rows.append(tuple(item.get(col) for col in insert_cols))
+        else:
+            # Backward compatibility for legacy tuples
+            if table == 'tokens':
+                # Legacy order had 19 fields up to lemma
+                legacy_cols = [
+                    'pair_id','text_type','token','position','tag','number','proper','aspect','case','form','gender',
+                    'mood','person','reciprocity','tense','voice','head_token','label','lemma'
+                ]
+                legacy_map = dict(zip(legacy_cols, item))
+                rows.append(tuple(legacy_map.get(col) for col in insert_cols))
+            elif table == 'entities':
+                legacy_cols = ['pair_id','text_type','name','type','content','position','common_or_proper']
+                legacy_map = dict(zip(legacy_cols, item))
+                rows.append(tuple(legacy_map.get(col) for col in insert_cols))
+            else:  # classifications
+                rows.append(tuple(item[i] for i in range(len(insert_cols))))
+
+    if _compact_nlp_labels and table in LABEL_COLUMNS:
+        coded = [(insert_cols.index(label), insert_cols.index(code))
+                 for label, (code, _) in LABEL_COLUMNS[table].items()
+                 if label in insert_cols and code in insert_cols]
+        compacted = []
+        for row in rows:
+            row = list(row)
+            for label_idx, code_idx in coded:
+                if row[code_idx] is not None:
+                    row[label_idx] = None
+            compacted.append(tuple(row))
+        rows = compacted
+
+    quoted_cols = ', '.join(f'"{col}"' for col in insert_cols)
+    placeholders = ', '.join(['?'] * len(insert_cols))
+    update_cols = [col for col in insert_cols if col not in key_cols]
+    conflict = ', '.join(f'"{col}"' for col in key_cols)
+    if update_cols:
+        action = 'DO UPDATE SET ' + ', '.join(f'"{col}" = excluded."{col}"' for col in update_cols)
+    else:
+        action = 'DO NOTHING'
+    sql = f"INSERT INTO {table} ({quoted_cols}) VALUES ({placeholders}) ON CONFLICT({conflict}) {action}"
 
+    # Remaining key parts of every row, grouped by (pair_id, text_type)
+    key_idx = [insert_cols.index(col) for col in key_cols]
+    kept = {}
+    for row in rows:
+        key = [row[i] for i in key_idx]
+        kept.setdefault((key[0], key[1]), []).append(key[2:])
+    match = ' AND '.join(f"json_extract(k.value, '$[{i}]') IS {table}.\"{col}\"" for i, col in enumerate(key_cols[2:]))
+    prune_sql = f"""
+        DELETE FROM {table}
+        WHERE pair_id = ? AND text_type = ?
+          AND NOT EXISTS (SELECT 1 FROM json_each(?) k WHERE {match})
+    """
+
+    def _upsert(conn):
+        c = conn.cursor()
         c.executemany(sql, rows)
-        conn.commit()
+        for (pair_id, text_type), keys in kept.items():
+            c.execute(prune_sql, (pair_id, text_type, json.dumps(keys)))
+        _bump_nlp_version(c)
+        # Changes the fingerprint of these pairs, so diff processing picks them up again
+        c.executemany('''
+            UPDATE csv_data SET nlp_version = (
+                SELECT CAST(value AS INTEGER) FROM project_meta WHERE key = 'nlp_version'
+            ) WHERE id = ?
+        ''', [(pair_id,) for pair_id in {pair_id for pair_id, _ in kept}])
 
-    conn.close()
+    run_write(project_db_name, _upsert)
 
 
 def get_projects(db_path, owner_id=None):
     """
     Retrieve all projects from the main database.
     """
-    conn = sqlite3.connect(os.path.join(db_path, 'maindb.db'))
-    c = conn.cursor()
-    if owner_id is None:
-        c.execute('SELECT name, description, file_name FROM projects')
-    else:
-        c.execute('SELECT name, description, file_name FROM projects WHERE owner_id = ?', (owner_id,))
-    projects = c.fetchall()
-    conn.close()
+    with _main_transaction(db_path) as conn:
+        c = conn.cursor()
+        if owner_id is None:
+            c.execute('SELECT name, description, file_name FROM projects')
+        else:
+            c.execute('SELECT name, description, file_name FROM projects WHERE owner_id = ?', (owner_id,))
+        projects = c.fetchall()
     return projects
 
 # ========== Users: Authentication & Profile Management (main DB) ==========
 
-def _main_conn(db_path):
-    return sqlite3.connect(os.path.join(db_path, 'maindb.db'))
+# Every request resolves the session user and, on project pages, checks ownership
+# against maindb.db. Both answers are cached in-process for a short TTL and are
+# invalidated explicitly by the functions that change them, so requests that only
+# touch a project DB no longer contend on maindb.db. The project language, which NLP
+# reads need to label enum codes, is cached the same way.
+LOOKUP_CACHE_TTL = 30
+
+_lookup_lock = threading.Lock()
+_user_cache = TTLCache(maxsize=1024, ttl=LOOKUP_CACHE_TTL)
+_owner_cache = TTLCache(maxsize=4096, ttl=LOOKUP_CACHE_TTL)
+_language_cache = TTLCache(maxsize=4096, ttl=LOOKUP_CACHE_TTL)
+
+
+def invalidate_user_cache(db_path, user_id):
+    """
+    Drop the cached users row of user_id.
+    """
+    with _lookup_lock:
+        _user_cache.pop((os.path.abspath(db_path), user_id), None)
+
+
+def invalidate_project_owner_cache(db_path, project_name):
+    """
+    Drop every cached ownership answer (and the cached language) for project_name.
+    """
+    db_path = os.path.abspath(db_path)
+    with _lookup_lock:
+        for key in [k for k in list(_owner_cache.keys()) if k[0] == db_path and k[2] == project_name]:
+            _owner_cache.pop(key, None)
+        _language_cache.pop((db_path, project_name), None)
+
+
+def _reset_lookup_caches_after_fork():
+    global _lookup_lock
+    _lookup_lock = threading.Lock()
+    _user_cache.clear()
+    _owner_cache.clear()
+    _language_cache.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_lookup_caches_after_fork)
 
 def create_user(db_path, username, password_hash, email=None, full_name=None):
-    conn = _main_conn(db_path)
-    c = conn.cursor()
-    c.execute(
-        'INSERT INTO users (username, email, password_hash, full_name) VALUES (?, ?, ?, ?)',
-        (username, email, password_hash, full_name)
-    )
-    conn.commit()
-    user_id = c.lastrowid
-    conn.close()
+    with _main_transaction(db_path) as conn:
+        c = conn.cursor()
+        c.execute(
+            'INSERT INTO users (username, email, password_hash, full_name) VALUES (?, ?, ?, ?)',
+            (username, email, password_hash, full_name)
+        )
+        conn.commit()
+        user_id = c.lastrowid
     return get_user_by_id(db_path, user_id)
 
 def get_user_by_username(db_path, username):
-    conn = _main_conn(db_path)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE username = ?', (username,))
-    row = c.fetchone()
-    conn.close()
+    with _main_transaction(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('SELECT * FROM users WHERE username = ?', (username,))
+        row = c.fetchone()
     return dict(row) if row else None
 
 def get_user_by_id(db_path, user_id):
-    conn = _main_conn(db_path)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-    row = c.fetchone()
-    conn.close()
-    return dict(row) if row else None
+    key = (os.path.abspath(db_path), user_id)
+    with _lookup_lock:
+        cached = _user_cache.get(key)
+    if cached is not None:
+        return dict(cached)
+    with _main_transaction(db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('SELECT * FROM users WHERE id = ?', (user_id,))
+        row = c.fetchone()
+    if not row:
+        return None
+    user = dict(row)
+    with _lookup_lock:
+        _user_cache[key] = user
+    return dict(user)
 
 def update_user_profile(db_path, user_id, full_name=None, bio=None, avatar_url=None, email=None, google_api_key=None, google_nlp_key_path=None):
-    conn = _main_conn(db_path)
-    c = conn.cursor()
     fields = []
     params = []
     if full_name is not None:
@@ -446,173 +992,315 @@ def update_user_profile(db_path, user_id, full_name=None, bio=None, avatar_url=N
         fields.append('google_nlp_key_path = ?')
         params.append(google_nlp_key_path)
     if not fields:
-        conn.close()
         return get_user_by_id(db_path, user_id)
     fields.append('updated_at = CURRENT_TIMESTAMP')
     params.append(user_id)
-    c.execute(f'UPDATE users SET {", ".join(fields)} WHERE id = ?', tuple(params))
-    conn.commit()
-    conn.close()
+    with _main_transaction(db_path) as conn:
+        conn.execute(f'UPDATE users SET {", ".join(fields)} WHERE id = ?', tuple(params))
+    invalidate_user_cache(db_path, user_id)
     return get_user_by_id(db_path, user_id)
 
 def get_project_file(project_name, db_path, owner_id=None):
     """
     Retrieve the file name for a given project from the main database.
     """
-    conn = sqlite3.connect(os.path.join(db_path, 'maindb.db'))
-    c = conn.cursor()
-    if owner_id is None:
-        c.execute('SELECT file_name, nlp_active, language, genre_active FROM projects WHERE name = ?', (project_name,))
-    else:
-        c.execute('SELECT file_name, nlp_active, language, genre_active FROM projects WHERE name = ? AND owner_id = ?', (project_name, owner_id))
-    result = c.fetchone()
-    conn.close()
+    with _main_transaction(db_path) as conn:
+        c = conn.cursor()
+        if owner_id is None:
+            c.execute('SELECT file_name, nlp_active, language, genre_active FROM projects WHERE name = ?', (project_name,))
+        else:
+            c.execute('SELECT file_name, nlp_active, language, genre_active FROM projects WHERE name = ? AND owner_id = ?', (project_name, owner_id))
+        result = c.fetchone()
     return result if result else (None, None)
 
 def update_project_file_name(project_name, file_name, db_path, owner_id=None):
     """
     Update the file name for a project in the main database.
     """
-    conn = sqlite3.connect(os.path.join(db_path, 'maindb.db'))
-    c = conn.cursor()
-    if owner_id is None:
-        c.execute('UPDATE projects SET file_name = ? WHERE name = ?', (file_name, project_name))
-    else:
-        c.execute('UPDATE projects SET file_name = ? WHERE name = ? AND owner_id = ?', (file_name, project_name, owner_id))
-    conn.commit()
-    conn.close()
+    with _main_transaction(db_path) as conn:
+        c = conn.cursor()
+        if owner_id is None:
+            c.execute('UPDATE projects SET file_name = ? WHERE name = ?', (file_name, project_name))
+        else:
+            c.execute('UPDATE projects SET file_name = ? WHERE name = ? AND owner_id = ?', (file_name, project_name, owner_id))
 
 def update_nlp_state(project_name, db_path, owner_id=None):
     """
     Update the nlp_active state to true for a project in the main database.
     """
-    conn = sqlite3.connect(os.path.join(db_path, 'maindb.db'))
-    c = conn.cursor()
-    if owner_id is None:
-        c.execute('UPDATE projects SET nlp_active = ? WHERE name = ?', (1, project_name))
-    else:
-        c.execute('UPDATE projects SET nlp_active = ? WHERE name = ? AND owner_id = ?', (1, project_name, owner_id))
-    conn.commit()
-    conn.close()
+    with _main_transaction(db_path) as conn:
+        c = conn.cursor()
+        if owner_id is None:
+            c.execute('UPDATE projects SET nlp_active = ? WHERE name = ?', (1, project_name))
+        else:
+            c.execute('UPDATE projects SET nlp_active = ? WHERE name = ? AND owner_id = ?', (1, project_name, owner_id))
 
 def update_genre_state(project_name, db_path, owner_id=None):
     """
     Update the genre_active state to true for a project in the main database.
     """
-    conn = sqlite3.connect(os.path.join(db_path, 'maindb.db'))
-    c = conn.cursor()
-    if owner_id is None:
-        c.execute('UPDATE projects SET genre_active = ? WHERE name = ?', (1, project_name))
-    else:
-        c.execute('UPDATE projects SET genre_active = ? WHERE name = ? AND owner_id = ?', (1, project_name, owner_id))
-    conn.commit()
-    conn.close()
+    with _main_transaction(db_path) as conn:
+        c = conn.cursor()
+        if owner_id is None:
+            c.execute('UPDATE projects SET genre_active = ? WHERE name = ?', (1, project_name))
+        else:
+            c.execute('UPDATE projects SET genre_active = ? WHERE name = ? AND owner_id = ?', (1, project_name, owner_id))
+
+
+def get_project_language(project_name, db_path):
+    """
+    Language code of a project ('en' when the project is unknown or has none).
+    """
+    key = (os.path.abspath(db_path), project_name)
+    with _lookup_lock:
+        cached = _language_cache.get(key)
+    if cached is not None:
+        return cached
+    with _main_transaction(db_path) as conn:
+        c = conn.cursor()
+        c.execute('SELECT language FROM projects WHERE name = ?', (project_name,))
+        row = c.fetchone()
+    language = (row[0] if row else None) or 'en'
+    with _lookup_lock:
+        _language_cache[key] = language
+    return language
 
 
 def get_project_details(project_name, db_path, owner_id=None):
     """
     Retrieve details of a specific project from the main database.
     """
-    conn = sqlite3.connect(os.path.join(db_path, 'maindb.db'))
-    c = conn.cursor()
-    if owner_id is None:
-        c.execute('SELECT name, description, language FROM projects WHERE name = ?', (project_name,))
-    else:
-        c.execute('SELECT name, description, language FROM projects WHERE name = ? AND owner_id = ?', (project_name, owner_id))
-    project_details = c.fetchone()
-    conn.close()
+    with _main_transaction(db_path) as conn:
+        c = conn.cursor()
+        if owner_id is None:
+            c.execute('SELECT name, description, language FROM projects WHERE name = ?', (project_name,))
+        else:
+            c.execute('SELECT name, description, language FROM projects WHERE name = ? AND owner_id = ?', (project_name, owner_id))
+        project_details = c.fetchone()
     return project_details
 
 def update_project_db(old_project_name, new_project_name, new_project_description, new_project_language, db_path, owner_id=None):
     """
     Update project details in the main database and rename the project's database file.
     """
-    conn = sqlite3.connect(os.path.join(db_path, 'maindb.db'))
-    c = conn.cursor()
-    if owner_id is None:
-        c.execute('UPDATE projects SET name = ?, description = ?, language = ? WHERE name = ?',
-                  (new_project_name, new_project_description, new_project_language, old_project_name))
-    else:
-        c.execute('UPDATE projects SET name = ?, description = ?, language = ? WHERE name = ? AND owner_id = ?',
-                  (new_project_name, new_project_description, new_project_language, old_project_name, owner_id))
-    conn.commit()
-    conn.close()
+    with _main_transaction(db_path) as conn:
+        c = conn.cursor()
+        if owner_id is None:
+            c.execute('UPDATE projects SET name = ?, description = ?, language = ? WHERE name = ?',
+                      (new_project_name, new_project_description, new_project_language, old_project_name))
+        else:
+            c.execute('UPDATE projects SET name = ?, description = ?, language = ? WHERE name = ? AND owner_id = ?',
+                      (new_project_name, new_project_description, new_project_language, old_project_name, owner_id))
+    invalidate_project_owner_cache(db_path, old_project_name)
+    invalidate_project_owner_cache(db_path, new_project_name)
 
     # Prepare paths
     old_db_path = os.path.join(db_path, f'{old_project_name}.db')
     new_db_path = os.path.join(db_path, f'{new_project_name}.db')
 
-    # If the project database exists, update embedded references before rename
-    if os.path.exists(old_db_path):
-        try:
-            pconn = sqlite3.connect(old_db_path)
-            pc = pconn.cursor()
-            # Best-effort: update annotations.project_name to the new project name
-            try:
-                pc.execute("UPDATE annotations SET project_name = ? WHERE project_name = ?", (new_project_name, old_project_name))
-                pconn.commit()
-            except Exception:
-                # Table may not exist in very old DBs; ignore
-                pass
-        finally:
+    # Rows do not store the project name (the file is the project), so renaming is a file rename
+    if old_db_path != new_db_path and os.path.exists(old_db_path):
+        # Pooled connections keep the file (and its WAL) open; closing the last
+        # one checkpoints the WAL back into the database before the rename.
+        # Both names are locked, in path order so that two renames cannot deadlock
+        first, second = sorted(os.path.abspath(path) for path in (old_db_path, new_db_path))
+        with file_lock(first), file_lock(second):
+            _retire_writer(old_db_path)
+            close_connections(old_db_path)
+
+            # Finally rename the project's database file
+            os.rename(old_db_path, new_db_path)
+        _forget_migrated(old_db_path)
+        _forget_migrated(new_db_path)
+
+def delete_project_db(project_name, db_path, owner_id=None):
+    """
+    Delete a project from the main database and remove its associated database file.
+    """
+    with _main_transaction(db_path) as conn:
+        c = conn.cursor()
+        if owner_id is None:
+            c.execute('DELETE FROM projects WHERE name = ?', (project_name,))
+        else:
+            c.execute('DELETE FROM projects WHERE name = ? AND owner_id = ?', (project_name, owner_id))
+    invalidate_project_owner_cache(db_path, project_name)
+
+    # Delete the project's database file
+    project_db_path = os.path.join(db_path, f'{project_name}.db')
+    _forget_migrated(project_db_path)
+    if os.path.exists(project_db_path):
+        # The file is removed together with its WAL, so there is nothing to checkpoint or vacuum
+        with file_lock(project_db_path):
+            _retire_writer(project_db_path)
+            close_connections(project_db_path)
+
+            for suffix in ('-wal', '-shm'):
+                try:
+                    os.remove(project_db_path + suffix)
+                except OSError:
+                    pass
+
             try:
-                pconn.close()
-            except Exception:
-                pass
+                os.remove(project_db_path)
+            except OSError as e:
+                print(f"Error deleting project database file: {e}")
+                # Re-raise the exception if it's still a permission error
+                raise
+
+def user_owns_project(user_id, project_name, db_path):
+    key = (os.path.abspath(db_path), user_id, project_name)
+    with _lookup_lock:
+        cached = _owner_cache.get(key)
+    if cached is not None:
+        return cached
+    with _main_transaction(db_path) as conn:
+        c = conn.cursor()
+        c.execute('SELECT 1 FROM projects WHERE name = ? AND owner_id = ?', (project_name, user_id))
+        row = c.fetchone()
+    with _lookup_lock:
+        _owner_cache[key] = bool(row)
+    return bool(row)
+
+# ========== Payload encoding ==========
+# With compression enabled, a json_items row keeps only its small hot fields in
+# json_content (what the generated columns and element lookups read) and stores the
+# bulky per-segment NLP rows zlib-compressed in the payload column. diff_data.diff_text
+# is stored as a zlib BLOB. Decoding is transparent and accepts both layouts, so
+# compressed and plain rows can coexist in one project DB.
+
+COMPRESSED_ITEM_FIELDS = ('morphology', 'entities')
+ZLIB_LEVEL = 6
+
+_compress_payloads = False
+
+
+def set_payload_compression(enabled):
+    """
+    Choose whether new json_items and diff_data rows are written compressed.
+    """
+    global _compress_payloads
+    _compress_payloads = bool(enabled)
+
+
+def _encode_json_item(item, compress=None):
+    """
+    Return (json_content, payload) for a segment dict.
+    """
+    if compress is None:
+        compress = _compress_payloads
+    stored = {k: v for k, v in item.items() if k not in ('Highlights', 'id')}  # Highlights have their own table
+    if not compress:
+        return json.dumps(stored), None
+    cold = {k: stored.pop(k) for k in COMPRESSED_ITEM_FIELDS if k in stored}
+    payload = zlib.compress(json.dumps(cold).encode('utf-8'), ZLIB_LEVEL) if cold else None
+    return json.dumps(stored), payload
+
+
+def _decode_item_content(json_content, payload):
+    content = json.loads(json_content)
+    if payload is not None and isinstance(content, dict):
+        content.update(json.loads(zlib.decompress(payload)))
+    return content
+
+
+def _encode_diff_text(diff_text, compress=None):
+    if compress is None:
+        compress = _compress_payloads
+    if compress and isinstance(diff_text, str):
+        return zlib.compress(diff_text.encode('utf-8'), ZLIB_LEVEL)
+    return diff_text
+
+
+def decode_diff_text(value):
+    """
+    Return diff_data.diff_text as a string whether it is stored plain or compressed.
+    """
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode('utf-8')
+    return value
+
+
+# ========== Secondary indexes (project DBs) ==========
+# Whenever _PROJECT_INDEXES changes, bump INDEX_SET_VERSION and append a _migrate_indexes
+# migration step: once the pending steps have run, migrate_project_db calls
+# ensure_project_indexes(), which drops the idx_* indexes that are no longer listed,
+# builds the new ones and refreshes the planner statistics (once per migration, however
+# many index steps were pending).
+
+INDEX_SET_VERSION = 5
+
+_PROJECT_INDEXES = [
+    ('idx_json_items_type_pair', 'json_items', '(data_type, pair_id)'),
+    ('idx_json_items_type_op', 'json_items', '(data_type, operation)'),
+    ('idx_json_items_pos_wrong', 'json_items', '(pair_id, data_type, position_in_wrong)'),
+    ('idx_json_items_pos_correct', 'json_items', '(pair_id, data_type, position_in_correct)'),
+    ('idx_json_items_pos_diff', 'json_items', '(pair_id, data_type, position_in_diff)'),
+    ('idx_annotations_pair_type_tag', 'annotations', '(pair_id, data_type, tag_id, start_offset)'),
+    ('idx_annotations_tag', 'annotations', '(tag_id)'),
+    ('idx_annotations_pair_offset', 'annotations', '(pair_id, start_offset)'),
+    ('idx_tags_parent', 'tags', '(parent_tag_id)'),
+    ('idx_chat_history_pair_ts', 'chat_history', '(pair_id, timestamp)'),
+    ('idx_notes_pair', 'notes', '(pair_id)'),
+    ('idx_auto_tagging_jobs_pair', 'auto_tagging_jobs', '(pair_id, created_at)'),
+    ('idx_highlights_name', 'highlights', '(name, data_type)'),
+    ('idx_highlights_pair', 'highlights', '(pair_id, data_type)'),
+]
+
+
+def _get_meta(c, key):
+    c.execute("SELECT value FROM project_meta WHERE key = ?", (key,))
+    row = c.fetchone()
+    return row[0] if row else None
+
 
-        # Finally rename the project's database file
-        os.rename(old_db_path, new_db_path)
+def _set_meta(c, key, value):
+    c.execute("INSERT OR REPLACE INTO project_meta (key, value) VALUES (?, ?)", (key, str(value)))
 
-def delete_project_db(project_name, db_path, owner_id=None):
+
+def _index_columns(columns):
+    return {col.strip() for col in columns.strip('()').split(',')}
+
+
+def ensure_project_indexes(conn, project_name, force=False):
     """
-    Delete a project from the main database and remove its associated database file.
+    Bring the project's secondary indexes up to INDEX_SET_VERSION and run ANALYZE.
     """
-    conn = sqlite3.connect(os.path.join(db_path, 'maindb.db'))
     c = conn.cursor()
-    if owner_id is None:
-        c.execute('DELETE FROM projects WHERE name = ?', (project_name,))
-    else:
-        c.execute('DELETE FROM projects WHERE name = ? AND owner_id = ?', (project_name, owner_id))
+    c.execute("CREATE TABLE IF NOT EXISTS project_meta (key TEXT PRIMARY KEY, value TEXT)")
+    current = _get_meta(c, 'index_set_version')
+    if not force and current is not None and int(current) >= INDEX_SET_VERSION:
+        return False
+
+    c.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    tables = {row[0] for row in c.fetchall()}
+    # Indexes on tables or columns this file does not have are left out
+    table_columns = {}
+    for table in {table for _, table, _ in _PROJECT_INDEXES if table in tables}:
+        c.execute(f"PRAGMA table_xinfo({table})")
+        table_columns[table] = {row[1] for row in c.fetchall()}
+    buildable = [(name, table, columns) for name, table, columns in _PROJECT_INDEXES
+                 if table in tables and _index_columns(columns) <= table_columns[table]]
+    wanted = {name for name, _, _ in buildable}
+
+    c.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx\\_%' ESCAPE '\\'")
+    for (name,) in c.fetchall():
+        if name not in wanted:
+            c.execute(f"DROP INDEX IF EXISTS {name}")
+
+    for name, table, columns in buildable:
+        c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {columns}")
+
+    c.execute("ANALYZE")
+    _set_meta(c, 'index_set_version', INDEX_SET_VERSION)
     conn.commit()
-    conn.close()
-
-    # Delete the project's database file
-    project_db_path = os.path.join(db_path, f'{project_name}.db')
-    if os.path.exists(project_db_path):
-        # Attempt to close any lingering connections and ensure the database is not busy
-        try:
-            # Connect to the project database to ensure it's not busy and close it
-            project_conn = sqlite3.connect(project_db_path)
-            project_conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
-            project_conn.execute("VACUUM;")
-            project_conn.close()
-        except sqlite3.Error as e:
-            print(f"Error closing project database connection: {e}")
-            # Log the error but continue to try and remove the file
-        
-        try:
-            os.remove(project_db_path)
-        except OSError as e:
-            print(f"Error deleting project database file: {e}")
-            # Re-raise the exception if it's still a permission error
-            raise
+    print(f"[INFO] Index set v{INDEX_SET_VERSION} applied to project {project_name}")
+    return True
 
-def user_owns_project(user_id, project_name, db_path):
-    conn = sqlite3.connect(os.path.join(db_path, 'maindb.db'))
-    c = conn.cursor()
-    c.execute('SELECT 1 FROM projects WHERE name = ? AND owner_id = ?', (project_name, user_id))
-    row = c.fetchone()
-    conn.close()
-    return bool(row)
 
-def migrate_project_db(project_name, db_path):
+def _migrate_base_schema(c, project_name):
     """
-    Apply migrations to a project's database.
+    Tables and columns added since the first release (idempotent, safe on any legacy DB).
     """
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-
     # Check if 'title' column exists in 'csv_data'
     c.execute("PRAGMA table_info(csv_data)")
     columns = [column[1] for column in c.fetchall()]
@@ -749,7 +1437,6 @@ def migrate_project_db(project_name, db_path):
         )
     ''')
 
-    conn.commit()
 
     # Add enum code columns to tokens if missing
     c.execute("PRAGMA table_info(tokens)")
@@ -776,8 +1463,11 @@ def migrate_project_db(project_name, db_path):
         if col not in ent_cols:
             _add_entity_col(col)
 
-    conn.commit()
 
+def _migrate_cleanup_nlp_duplicates(c, project_name):
+    """
+    One-time cleanup of NLP rows duplicated by earlier re-runs and of orphan annotations.
+    """
     # Deduplicate previously inserted NLP rows to avoid duplicated tokens/entities
     try:
         c.execute('''
@@ -801,27 +1491,647 @@ def migrate_project_db(project_name, db_path):
                 GROUP BY pair_id, text_type, category_name, confidence
             )
         ''')
-        conn.commit()
     except Exception as e:
         print(f"[WARN] Deduplication during migration failed for project {project_name}: {e}")
 
     # Cleanup orphan annotations: remove any annotations referencing tags that no longer exist
     try:
         c.execute("DELETE FROM annotations WHERE tag_id NOT IN (SELECT id FROM tags)")
-        conn.commit()
     except Exception as e:
         print(f"[WARN] Cleanup of orphan annotations failed for project {project_name}: {e}")
 
-    conn.close()
 
-def get_nlp_conclusion(project_name, pair_id, db_path):
+def _migrate_indexes(c, project_name):
+    # The index set changed: migrate_project_db rebuilds it after the last pending step
+    c.execute("CREATE TABLE IF NOT EXISTS project_meta (key TEXT PRIMARY KEY, value TEXT)")
+    c.execute("DELETE FROM project_meta WHERE key = 'index_set_version'")
+
+
+def _migrate_highlights_table(c, project_name):
+    """
+    Move the Highlights arrays embedded in json_items into the highlights table.
+    """
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS highlights (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            json_item_id INTEGER NOT NULL,
+            pair_id INTEGER,
+            data_type TEXT NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            active INTEGER,
+            UNIQUE(json_item_id, name),
+            FOREIGN KEY(json_item_id) REFERENCES json_items(id)
+        )
+    ''')
+    c.execute('''
+        INSERT OR IGNORE INTO highlights (json_item_id, pair_id, data_type, name, description, active)
+        SELECT j.id, CAST(j.pair_id AS INTEGER), j.data_type,
+               json_extract(h.value, '$.name'), json_extract(h.value, '$.description'), json_extract(h.value, '$.active')
+        FROM json_items j, json_each(j.json_content, '$.Highlights') h
+        WHERE json_valid(j.json_content)
+          AND json_type(j.json_content, '$.Highlights') = 'array'
+          AND json_extract(h.value, '$.name') IS NOT NULL
+        ORDER BY j.id, h.key
+    ''')
+    moved = c.rowcount
+    c.execute('''
+        UPDATE json_items SET json_content = json_remove(json_content, '$.Highlights')
+        WHERE json_valid(json_content) AND json_type(json_content, '$.Highlights') IS NOT NULL
+    ''')
+    if moved:
+        print(f"[INFO] Moved {moved} highlights out of json_items for project {project_name}")
+
+
+def _migrate_json_items_generated_columns(c, project_name):
+    """
+    Rebuild json_items with an INTEGER pair_id and the generated hot-field columns
+    (SQLite cannot add STORED columns with ALTER TABLE). Row ids are preserved.
+    """
+    c.execute("PRAGMA table_xinfo(json_items)")
+    if 'operation' in [row[1] for row in c.fetchall()]:
+        return
+    c.execute('DROP TABLE IF EXISTS json_items_rebuild')
+    c.execute(_JSON_ITEMS_DDL.format(table='json_items_rebuild'))
+    c.execute('''
+        INSERT INTO json_items_rebuild (id, pair_id, data_type, json_content)
+        SELECT id, CAST(pair_id AS INTEGER), data_type, json_content FROM json_items
+    ''')
+    copied = c.rowcount
+    c.execute('DROP TABLE json_items')
+    c.execute('ALTER TABLE json_items_rebuild RENAME TO json_items')
+    print(f"[INFO] Rebuilt json_items with generated columns ({copied} rows) for project {project_name}")
+
+
+def _migrate_payload_column(c, project_name):
+    c.execute("PRAGMA table_xinfo(json_items)")
+    if 'payload' not in [row[1] for row in c.fetchall()]:
+        c.execute("ALTER TABLE json_items ADD COLUMN payload BLOB")
+
+
+def _migrate_nlp_unique_keys(c, project_name):
+    """
+    Keep the latest row per NLP_UNIQUE_KEYS key and declare the keys as unique indexes.
+    """
+    for table, key_cols in NLP_UNIQUE_KEYS.items():
+        columns = ', '.join(f'"{col}"' for col in key_cols)
+        c.execute(f"DELETE FROM {table} WHERE id NOT IN (SELECT MAX(id) FROM {table} GROUP BY {columns})")
+        if c.rowcount:
+            print(f"[INFO] Removed {c.rowcount} duplicate {table} rows from project {project_name}")
+        c.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS uq_{table}_key ON {table} ({columns})")
+
+
+# ========== Full-text search ==========
+# csv_data texts, annotation texts and notes are indexed by external-content FTS5
+# tables (the text is not stored twice) kept in sync by triggers. The trigram
+# tokenizer matches substrings case-insensitively, i.e. the same rows the former
+# LIKE '%q%' filters matched, but through the index. Queries shorter than three
+# characters, and SQLite builds without FTS5/trigram, fall back to LIKE.
+
+FTS_MIN_QUERY_LENGTH = 3
+# fts table -> (content table, indexed columns)
+FTS_TABLES = {
+    'csv_fts': ('csv_data', ('error_text', 'corrected_text')),
+    'annotations_fts': ('annotations', ('text',)),
+    'notes_fts': ('notes', ('title', 'content')),
+}
+
+
+def _fts_supported():
+    if sqlite3.sqlite_version_info < (3, 34, 0):
+        return False
+    try:
+        probe = sqlite3.connect(':memory:')
+        probe.execute("CREATE VIRTUAL TABLE t USING fts5(x, tokenize='trigram')")
+        probe.close()
+        return True
+    except sqlite3.Error:
+        return False
+
+
+_FTS_SUPPORTED = _fts_supported()
+
+
+def is_derived_table(table_name):
+    """
+    True for tables rebuilt from other tables by triggers (FTS tables with their shadow
+    tables, annotation counters); copying them between DBs would double-count.
+    """
+    if table_name in DERIVED_TABLES:
+        return True
+    return any(table_name == name or table_name.startswith(f'{name}_') for name in FTS_TABLES)
+
+
+def _create_fts_table(c, fts, table, columns):
+    cols = ', '.join(columns)
+    new_cols = ', '.join(f'new.{col}' for col in columns)
+    old_cols = ', '.join(f'old.{col}' for col in columns)
+    c.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', content_rowid='id', tokenize='trigram')")
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+        END
+    ''')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+        END
+    ''')
+    c.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _migrate_search_index(c, project_name):
+    """
+    Build the FTS5 search tables and their sync triggers.
+    """
+    if not _FTS_SUPPORTED:
+        print(f"[WARN] SQLite {sqlite3.sqlite_version} has no FTS5 trigram tokenizer; project {project_name} keeps LIKE search")
+        return
+    c.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    tables = {row[0] for row in c.fetchall()}
+    for fts, (table, columns) in FTS_TABLES.items():
+        if table in tables:
+            _create_fts_table(c, fts, table, columns)
+
+
+# ========== Annotation counters ==========
+# annotation_counts holds the number of annotations per (tag, data_type, pair) and
+# annotation_tag_counts the same rolled up per (tag, data_type). Triggers on annotations
+# and tags keep both current, so reports read O(tags) rows instead of scanning
+# annotations; the per-pair table answers the counts of text-search filtered views.
+
+DERIVED_TABLES = ('annotation_counts', 'annotation_tag_counts')
+
+def _counter_bump_sql(sign, row):
+    """
+    Statements adding sign (+1/-1) for the annotation `row` ('new' or 'old') to both tables.
+    """
+    if sign > 0:
+        return f'''
+            INSERT INTO annotation_counts (tag_id, data_type, pair_id, n) VALUES ({row}.tag_id, {row}.data_type, {row}.pair_id, 1)
+                ON CONFLICT(tag_id, data_type, pair_id) DO UPDATE SET n = n + 1;
+            INSERT INTO annotation_tag_counts (tag_id, data_type, n) VALUES ({row}.tag_id, {row}.data_type, 1)
+                ON CONFLICT(tag_id, data_type) DO UPDATE SET n = n + 1;
+        '''
+    return f'''
+        UPDATE annotation_counts SET n = n - 1
+            WHERE tag_id = {row}.tag_id AND data_type = {row}.data_type AND pair_id = {row}.pair_id;
+        DELETE FROM annotation_counts
+            WHERE tag_id = {row}.tag_id AND data_type = {row}.data_type AND pair_id = {row}.pair_id AND n <= 0;
+        UPDATE annotation_tag_counts SET n = n - 1 WHERE tag_id = {row}.tag_id AND data_type = {row}.data_type;
+        DELETE FROM annotation_tag_counts WHERE tag_id = {row}.tag_id AND data_type = {row}.data_type AND n <= 0;
+    '''
+
+
+def _create_annotation_counter_triggers(c):
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS annotation_counts_ai AFTER INSERT ON annotations BEGIN {_counter_bump_sql(1, 'new')} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS annotation_counts_ad AFTER DELETE ON annotations BEGIN {_counter_bump_sql(-1, 'old')} END")
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS annotation_counts_au AFTER UPDATE OF tag_id, data_type, pair_id ON annotations BEGIN
+            {_counter_bump_sql(-1, 'old')}
+            {_counter_bump_sql(1, 'new')}
+        END
+    ''')
+    c.execute('''
+        CREATE TRIGGER IF NOT EXISTS annotation_counts_tag_ad AFTER DELETE ON tags BEGIN
+            DELETE FROM annotation_counts WHERE tag_id = old.id;
+            DELETE FROM annotation_tag_counts WHERE tag_id = old.id;
+        END
+    ''')
+
+
+def _migrate_annotation_counters(c, project_name):
+    """
+    Create and fill the annotation counter tables and their triggers.
+    """
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS annotation_counts (
+            tag_id INTEGER NOT NULL,
+            data_type TEXT NOT NULL,
+            pair_id INTEGER NOT NULL,
+            n INTEGER NOT NULL,
+            PRIMARY KEY (tag_id, data_type, pair_id)
+        ) WITHOUT ROWID
+    ''')
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS annotation_tag_counts (
+            tag_id INTEGER NOT NULL,
+            data_type TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            PRIMARY KEY (tag_id, data_type)
+        ) WITHOUT ROWID
+    ''')
+    c.execute('DELETE FROM annotation_counts')
+    c.execute('DELETE FROM annotation_tag_counts')
+    c.execute('''
+        INSERT INTO annotation_counts (tag_id, data_type, pair_id, n)
+        SELECT tag_id, data_type, pair_id, COUNT(*) FROM annotations GROUP BY tag_id, data_type, pair_id
+    ''')
+    c.execute('''
+        INSERT INTO annotation_tag_counts (tag_id, data_type, n)
+        SELECT tag_id, data_type, SUM(n) FROM annotation_counts GROUP BY tag_id, data_type
+    ''')
+    _create_annotation_counter_triggers(c)
+
+
+def _create_label_code_table(c, name, language=None):
+    # TEMP (list_name, label, code) rows for the label lists of one language, or of all
+    c.execute(f"DROP TABLE IF EXISTS temp.{name}")
+    c.execute(f"CREATE TEMP TABLE {name} (list_name TEXT, label TEXT, code INTEGER)")
+    list_names = {list_name for columns in LABEL_COLUMNS.values() for _, list_name in columns.values()}
+    c.executemany(f"INSERT INTO {name} VALUES (?, ?, ?)",
+                  [(list_name, label, code) for list_name in sorted(list_names)
+                   for label, code in code_map(list_name, language).items()])
+
+
+def _migrate_nlp_label_codes(c, project_name):
+    # Read paths label rows from their enum codes; give codes to rows that only have labels
+    _create_label_code_table(c, 'nlp_label_codes')
+    for table, columns in LABEL_COLUMNS.items():
+        for column, (code_column, list_name) in columns.items():
+            c.execute(f'''
+                UPDATE {table} SET {code_column} = (
+                    SELECT code FROM nlp_label_codes WHERE list_name = ? AND label = {table}."{column}"
+                )
+                WHERE {code_column} IS NULL AND "{column}" IS NOT NULL
+            ''', (list_name,))
+    c.execute("DROP TABLE temp.nlp_label_codes")
+    _bump_nlp_version(c)
+
+
+def _migrate_drop_annotation_project_name(c, project_name):
+    """
+    annotations.project_name duplicated the DB file's identity and had to be rewritten on
+    every rename; drop it.
+    """
+    c.execute("PRAGMA table_info(annotations)")
+    columns = [row[1] for row in c.fetchall()]
+    if 'project_name' not in columns:
+        return
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        c.execute("ALTER TABLE annotations DROP COLUMN project_name")
+        return
+    # Older SQLite: rebuild the table, then recreate the triggers that went with it
+    kept = ', '.join(col for col in columns if col != 'project_name')
+    c.execute('''
+        CREATE TABLE annotations_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pair_id INTEGER NOT NULL,
+            data_type TEXT NOT NULL,
+            start_offset INTEGER NOT NULL,
+            end_offset INTEGER NOT NULL,
+            tag_id INTEGER NOT NULL,
+            text TEXT,
+            FOREIGN KEY(tag_id) REFERENCES tags(id)
+        )
+    ''')
+    c.execute(f"INSERT INTO annotations_new ({kept}) SELECT {kept} FROM annotations")
+    c.execute("DROP TABLE annotations")
+    c.execute("ALTER TABLE annotations_new RENAME TO annotations")
+    for name, table, index_columns in _PROJECT_INDEXES:
+        if table == 'annotations':
+            c.execute(f"CREATE INDEX IF NOT EXISTS {name} ON annotations {index_columns}")
+    if _has_fts(c, 'annotations_fts'):
+        _create_fts_table(c, 'annotations_fts', *FTS_TABLES['annotations_fts'])
+    _create_annotation_counter_triggers(c)
+
+
+def _migrate_pair_fingerprints(c, project_name):
+    """
+    csv_data.nlp_version: project nlp_version of the last NLP write for the pair.
+    diff_data.fingerprint: inputs the pair's stored diff results were computed from.
+    """
+    c.execute("PRAGMA table_info(csv_data)")
+    if 'nlp_version' not in [row[1] for row in c.fetchall()]:
+        c.execute("ALTER TABLE csv_data ADD COLUMN nlp_version INTEGER")
+    c.execute("PRAGMA table_info(diff_data)")
+    if 'fingerprint' not in [row[1] for row in c.fetchall()]:
+        c.execute("ALTER TABLE diff_data ADD COLUMN fingerprint TEXT")
+
+
+# Ordered schema migrations; a project DB at PRAGMA user_version N has run the first N.
+# Append new steps at the end, never reorder or edit a step that has shipped.
+_MIGRATIONS = [
+    _migrate_base_schema,
+    _migrate_cleanup_nlp_duplicates,
+    _migrate_indexes,
+    _migrate_highlights_table,
+    _migrate_indexes,  # index set v2 (highlights)
+    _migrate_json_items_generated_columns,
+    _migrate_indexes,  # index set v3 (json_items hot fields)
+    _migrate_payload_column,
+    _migrate_nlp_unique_keys,
+    _migrate_indexes,  # index set v4 (NLP lookups served by the unique keys)
+    _migrate_search_index,
+    _migrate_indexes,  # index set v5 (annotation keyset pagination)
+    _migrate_annotation_counters,
+    _migrate_nlp_label_codes,
+    _migrate_drop_annotation_project_name,
+    _migrate_pair_fingerprints,
+]
+
+SCHEMA_VERSION = len(_MIGRATIONS)
+
+_migration_lock = threading.Lock()
+# Project DB files known to be at SCHEMA_VERSION in this process
+_migrated_projects = set()
+
+
+def _forget_migrated(db_file):
+    _migrated_projects.discard(os.path.abspath(db_file))
+
+
+def _reset_migration_lock_after_fork():
+    global _migration_lock
+    # Another thread of the parent may have been migrating when it forked
+    _migration_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_migration_lock_after_fork)
+
+
+def migrate_project_db(project_name, db_path):
+    """
+    Apply pending migrations to a project's database.
+
+    Once a project is at SCHEMA_VERSION this costs one PRAGMA user_version read the
+    first time it is seen in the process, and nothing afterwards.
+    """
+    project_db_name = os.path.abspath(os.path.join(db_path, f'{project_name}.db'))
+    if project_db_name in _migrated_projects:
+        return
+
+    conn = get_connection(project_db_name)
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version < SCHEMA_VERSION:
+            with _migration_lock:
+                # Another thread may have migrated while we waited for the lock
+                version = conn.execute('PRAGMA user_version').fetchone()[0]
+                c = conn.cursor()
+                for step_version, step in enumerate(_MIGRATIONS[version:], start=version + 1):
+                    step(c, project_name)
+                    c.execute(f'PRAGMA user_version = {step_version}')
+                    conn.commit()
+                ensure_project_indexes(conn, project_name)
+                if version < SCHEMA_VERSION:
+                    print(f"[INFO] Project {project_name} migrated from schema v{version} to v{SCHEMA_VERSION}")
+        _migrated_projects.add(project_db_name)
+    finally:
+        conn.close()
+
+def recode_project_payloads(project_name, db_path, compress=True, batch_size=500):
+    """
+    Rewrite a project's json_items and diff_data rows compressed (or back to plain
+    text with compress=False), then VACUUM. Returns counts and file sizes.
+    """
+    migrate_project_db(project_name, db_path)
+    project_db_name = os.path.join(db_path, f'{project_name}.db')
+    checkpoint_db(project_db_name)
+    size_before = os.path.getsize(project_db_name)
+
+    items = 0
+    last_id = 0
+    while last_id is not None:
+        last_id, updated = run_write(project_db_name, partial(
+            _recode_json_items_batch, last_id=last_id, batch_size=batch_size, compress=compress))
+        items += updated
+
+    diffs = run_write(project_db_name, partial(_recode_diff_texts, compress=compress))
+    vacuum_db(project_db_name)
+    checkpoint_db(project_db_name)
+
+    return {
+        'json_items': items,
+        'diff_data': diffs,
+        'size_before': size_before,
+        'size_after': os.path.getsize(project_db_name),
+    }
+
+
+def _recode_json_items_batch(conn, last_id, batch_size, compress):
+    # One batch of json_items after last_id; returns the id to continue from (None when done) and the rows rewritten
+    pending = 'payload IS NULL' if compress else 'payload IS NOT NULL'
+    rows = conn.execute(f'''
+        SELECT id, json_content, payload FROM json_items
+        WHERE id > ? AND {pending}
+        ORDER BY id LIMIT ?
+    ''', (last_id, batch_size)).fetchall()
+    updates = []
+    for item_id, json_content, payload in rows:
+        content = _decode_item_content(json_content, payload)
+        if isinstance(content, dict):
+            updates.append(_encode_json_item(content, compress) + (item_id,))
+    conn.executemany('UPDATE json_items SET json_content = ?, payload = ? WHERE id = ?', updates)
+    return (rows[-1][0] if len(rows) == batch_size else None), len(updates)
+
+
+def _recode_diff_texts(conn, compress):
+    rows = conn.execute("SELECT pair_id, diff_text FROM diff_data WHERE typeof(diff_text) = ?",
+                        ('text' if compress else 'blob',)).fetchall()
+    diffs = [(_encode_diff_text(decode_diff_text(text), compress), pair_id) for pair_id, text in rows]
+    conn.executemany('UPDATE diff_data SET diff_text = ? WHERE pair_id = ?', diffs)
+    return len(diffs)
+
+
+def recode_project_nlp_labels(project_name, db_path, compact=True):
+    """
+    Drop the stored label strings of tokens/entities rows that have enum codes, then
+    VACUUM; with compact=False write the labels back in the project's current language.
+    Returns updated row counts per table and file sizes.
+    """
+    migrate_project_db(project_name, db_path)
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
+    checkpoint_db(project_db_name)
+    size_before = os.path.getsize(project_db_name)
+
+    language = None if compact else get_project_language(project_name, db_path)
+    updated = run_write(project_db_name, partial(_recode_nlp_labels_in, compact=compact, language=language))
+    vacuum_db(project_db_name)
+    checkpoint_db(project_db_name)
+
+    updated['size_before'] = size_before
+    updated['size_after'] = os.path.getsize(project_db_name)
+    return updated
+
+def _recode_nlp_labels_in(conn, compact, language):
     c = conn.cursor()
-    c.execute('SELECT pair_id, conclusion, inconsistencies FROM nlp_conclusions WHERE pair_id = ?', (pair_id,))
-    row = c.fetchone()
-    conn.close()
+    if not compact:
+        _create_label_code_table(c, 'nlp_labels', language)
+    updated = {}
+    try:
+        for table, columns in LABEL_COLUMNS.items():
+            sets, params, pending = [], [], []
+            for column, (code_column, list_name) in columns.items():
+                if compact:
+                    sets.append(f'"{column}" = CASE WHEN {code_column} IS NULL THEN "{column}" END')
+                    pending.append(f'("{column}" IS NOT NULL AND {code_column} IS NOT NULL)')
+                else:
+                    sets.append(f'''"{column}" = CASE WHEN {code_column} IS NULL THEN "{column}" ELSE COALESCE(
+                        (SELECT label FROM nlp_labels WHERE list_name = ? AND code = {code_column}), '{FALLBACK_LABEL}') END''')
+                    params.append(list_name)
+                    pending.append(f'{code_column} IS NOT NULL')
+            c.execute(f"UPDATE {table} SET {', '.join(sets)} WHERE {' OR '.join(pending)}", params)
+            updated[table] = c.rowcount
+    finally:
+        # The writer's connection outlives this write
+        if not compact:
+            c.execute("DROP TABLE IF EXISTS temp.nlp_labels")
+    _bump_nlp_version(c)
+    return updated
+
+
+def _has_fts(c, fts):
+    c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+    return c.fetchone() is not None
+
+
+def _fts_phrase(text):
+    # One quoted phrase: with the trigram tokenizer this is a substring match
+    return '"' + text.replace('"', '""') + '"'
+
+
+def pair_text_filter(conn, search_query, pair_column='a.pair_id'):
+    """
+    SQL condition, params and needs_csv_join for rows whose pair's error or corrected text
+    contains search_query. Uses csv_fts when possible, LIKE on csv_data otherwise; then
+    needs_csv_join is True and the query must join csv_data aliased c on pair_column.
+    """
+    if len(search_query) >= FTS_MIN_QUERY_LENGTH and _has_fts(conn.cursor(), 'csv_fts'):
+        return (f"{pair_column} IN (SELECT rowid FROM csv_fts WHERE csv_fts MATCH ?)",
+                [_fts_phrase(search_query)], False)
+    return "(c.error_text LIKE ? OR c.corrected_text LIKE ?)", [f'%{search_query}%', f'%{search_query}%'], True
+
+
+def annotation_count_summary(conn, tag_name_like=None, data_type=None, tag_name=None, search_query=None, pair_id=None):
+    """
+    Annotation counts from the counter tables, restricted like the /api/annotations filters.
+    Returns {'total': int, 'by_tag': {name: n} (largest first), 'by_data_type': {data_type: n}}.
+    """
+    where, params = [], []
+    joins = ''
+    if search_query or pair_id is not None:
+        table = 'annotation_counts'
+        if pair_id is not None:
+            where.append('k.pair_id = ?'); params.append(pair_id)
+        if search_query:
+            search_sql, search_params, needs_csv_join = pair_text_filter(conn, search_query, pair_column='k.pair_id')
+            if needs_csv_join:
+                joins = ' LEFT JOIN csv_data c ON c.id = k.pair_id'
+            where.append(search_sql); params.extend(search_params)
+    else:
+        table = 'annotation_tag_counts'
+    if tag_name_like:
+        where.append('t.name LIKE ?'); params.append(f'%{tag_name_like}%')
+    if tag_name:
+        where.append('t.name = ?'); params.append(tag_name)
+    if data_type:
+        where.append('k.data_type = ?'); params.append(data_type)
+
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT t.name, k.data_type, SUM(k.n)
+        FROM {table} k JOIN tags t ON t.id = k.tag_id{joins}
+        {'WHERE ' + ' AND '.join(where) if where else ''}
+        GROUP BY t.name, k.data_type
+    ''', params)
+    by_tag, by_data_type = {}, {}
+    for name, dtype, n in c.fetchall():
+        by_tag[name] = by_tag.get(name, 0) + n
+        by_data_type[dtype] = by_data_type.get(dtype, 0) + n
+    by_tag = dict(sorted(by_tag.items(), key=lambda item: -item[1]))
+    return {'total': sum(by_data_type.values()), 'by_tag': by_tag, 'by_data_type': by_data_type}
+
+
+_SNIPPET_START, _SNIPPET_END = '\x02', '\x03'
+SNIPPET_TOKENS = 16
+
+
+def _render_snippet(raw):
+    escaped = html.escape(raw or '')
+    return escaped.replace(_SNIPPET_START, '<mark>').replace(_SNIPPET_END, '</mark>')
+
+
+def _like_snippet(text, query, width=60):
+    pos = (text or '').lower().find(query.lower())
+    if pos < 0:
+        return None
+    start, end = max(0, pos - width), min(len(text), pos + len(query) + width)
+    raw = ('…' if start else '') + text[start:pos] + _SNIPPET_START + text[pos:pos + len(query)] \
+        + _SNIPPET_END + text[pos + len(query):end] + ('…' if end < len(text) else '')
+    return _render_snippet(raw)
+
+
+# source -> (fts table, content table, id column of the pair, columns shown to the user)
+_SEARCH_SOURCES = {
+    'pairs': ('csv_fts', 'csv_data', 'id', ('error_text', 'corrected_text')),
+    'annotations': ('annotations_fts', 'annotations', 'pair_id', ('text',)),
+    'notes': ('notes_fts', 'notes', 'pair_id', ('title', 'content')),
+}
+
+
+def search_project(project_name, query, db_path, sources=None, limit=20):
+    """
+    Ranked full-text search over pair texts, annotation texts and notes. Returns dicts with
+    source, id, pair_id, field, snippet (HTML-escaped, matches wrapped in <mark>) and score
+    (bm25, lower is better).
+    """
+    query = (query or '').strip()
+    if not query:
+        return []
+    with transaction(project_name, db_path) as conn:
+        c = conn.cursor()
+        results = []
+        for source in (sources or _SEARCH_SOURCES):
+            if source not in _SEARCH_SOURCES:
+                continue
+            fts, table, pair_col, columns = _SEARCH_SOURCES[source]
+            if len(query) >= FTS_MIN_QUERY_LENGTH and _has_fts(c, fts):
+                snippets = ', '.join(
+                    f"snippet({fts}, {i}, '{_SNIPPET_START}', '{_SNIPPET_END}', '…', {SNIPPET_TOKENS})"
+                    for i in range(len(columns)))
+                c.execute(f'''
+                    SELECT t.id, t.{pair_col}, bm25({fts}), {snippets}
+                    FROM {fts} JOIN {table} t ON t.id = {fts}.rowid
+                    WHERE {fts} MATCH ?
+                    ORDER BY bm25({fts})
+                    LIMIT ?
+                ''', (_fts_phrase(query), limit))
+                for row in c.fetchall():
+                    # Report the first column whose snippet contains a match
+                    field, snippet = next(((col, s) for col, s in zip(columns, row[3:]) if s and _SNIPPET_START in s),
+                                          (columns[0], row[3]))
+                    results.append({'source': source, 'id': row[0], 'pair_id': row[1], 'field': field,
+                                    'snippet': _render_snippet(snippet), 'score': row[2]})
+            else:
+                like = f'%{query}%'
+                where = ' OR '.join(f'{col} LIKE ?' for col in columns)
+                c.execute(f"SELECT id, {pair_col}, {', '.join(columns)} FROM {table} WHERE {where} LIMIT ?",
+                          [like] * len(columns) + [limit])
+                for row in c.fetchall():
+                    for col, text in zip(columns, row[2:]):
+                        snippet = _like_snippet(text, query)
+                        if snippet:
+                            results.append({'source': source, 'id': row[0], 'pair_id': row[1], 'field': col,
+                                            'snippet': snippet, 'score': 0.0})
+                            break
+    results.sort(key=lambda r: r['score'])
+    return results[:limit]
+
+
+def get_nlp_conclusion(project_name, pair_id, db_path):
+    with transaction(project_name, db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('SELECT pair_id, conclusion, inconsistencies FROM nlp_conclusions WHERE pair_id = ?', (pair_id,))
+        row = c.fetchone()
     if not row:
         return None
     try:
@@ -832,33 +2142,28 @@ def get_nlp_conclusion(project_name, pair_id, db_path):
     return {'pair_id': row['pair_id'], 'conclusion': row['conclusion'] or '', 'inconsistencies': inconsistencies}
 
 def save_nlp_conclusion(project_name, pair_id, conclusion, inconsistencies, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
     import json as _json
     inconsistencies_json = _json.dumps(inconsistencies or [])
+    project_db_name = os.path.join(db_path, f'{project_name}.db')
     # Upsert by pair_id
-    c.execute('''
+    run_write(project_db_name, lambda conn: conn.execute('''
         INSERT INTO nlp_conclusions (pair_id, conclusion, inconsistencies)
         VALUES (?, ?, ?)
         ON CONFLICT(pair_id) DO UPDATE SET
             conclusion=excluded.conclusion,
             inconsistencies=excluded.inconsistencies,
             updated_at=CURRENT_TIMESTAMP
-    ''', (pair_id, conclusion or '', inconsistencies_json))
-    conn.commit()
-    conn.close()
+    ''', (pair_id, conclusion or '', inconsistencies_json)).rowcount)
 
 def get_linguistic_analysis(project_name, pair_id, db_path):
     project_db_name = os.path.join(db_path, f'{project_name}.db')
     if not os.path.exists(project_db_name):
         raise FileNotFoundError(f"Database file not found at {project_db_name}")
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT analysis_json FROM nlp_linguistic_analyses WHERE pair_id = ?', (pair_id,))
-    row = c.fetchone()
-    conn.close()
+    with db_transaction(project_db_name) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('SELECT analysis_json FROM nlp_linguistic_analyses WHERE pair_id = ?', (pair_id,))
+        row = c.fetchone()
     if not row:
         return None
     try:
@@ -868,160 +2173,455 @@ def get_linguistic_analysis(project_name, pair_id, db_path):
         return None
 
 def save_linguistic_analysis(project_name, pair_id, analysis_obj, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
     import json as _json
     payload = _json.dumps(analysis_obj or {})
-    c.execute('''
+    project_db_name = os.path.join(db_path, f'{project_name}.db')
+    run_write(project_db_name, lambda conn: conn.execute('''
         INSERT INTO nlp_linguistic_analyses (pair_id, analysis_json)
         VALUES (?, ?)
         ON CONFLICT(pair_id) DO UPDATE SET
             analysis_json=excluded.analysis_json,
             updated_at=CURRENT_TIMESTAMP
-    ''', (pair_id, payload))
-    conn.commit()
-    conn.close()
+    ''', (pair_id, payload)).rowcount)
 
 def get_all_notes(project_name, db_path):
     """
     Return all notes for a project as a list of dicts: {id, pair_id, title, content}.
     """
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    try:
+    with transaction(project_name, db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
         c.execute('SELECT id, pair_id, title, content FROM notes ORDER BY pair_id, id')
         rows = c.fetchall()
         return [dict(r) for r in rows]
-    finally:
-        conn.close()
 
-def get_notes_count(project_name, db_path):
+def get_notes_count(project_name, db_path):
+    """
+    Return the total number of notes for a project.
+    """
+    with transaction(project_name, db_path) as conn:
+        c = conn.cursor()
+        c.execute('SELECT COUNT(*) FROM notes')
+        return c.fetchone()[0]
+
+def _highlight_dict(name, description, active):
+    highlight = {'name': name}
+    if description is not None:
+        highlight['description'] = description
+    highlight['active'] = bool(active) if active is not None else None
+    return highlight
+
+
+def _fetch_highlights(c, where, params):
+    """
+    Map json item id -> list of highlight dicts for the highlights matching where.
+    """
+    c.execute(f'SELECT json_item_id, name, description, active FROM highlights WHERE {where} ORDER BY id', params)
+    highlights = {}
+    for item_id, name, description, active in c.fetchall():
+        highlights.setdefault(item_id, []).append(_highlight_dict(name, description, active))
+    return highlights
+
+
+def _decode_json_item(row, highlights=None):
+    content = _decode_item_content(row[2], row[3]) # json_content and payload are at index 2 and 3
+    if isinstance(content, dict):
+        content['id'] = row[0] # Add the row ID as 'id'
+        # Prioritize pair_id from content, else use from table
+        content['pair_id'] = content.get('pair_id', row[1])
+        # Highlights live in their own table and are re-attached on load
+        content['Highlights'] = (highlights or {}).get(row[0], [])
+        return content
+    return None
+
+
+def load_json_data(project_name, data_type, db_path):
+    """
+    Load JSON data from the project's database for a given data type.
+    """
+    with transaction(project_name, db_path) as conn:
+        c = conn.cursor()
+        c.execute('''
+            SELECT id, pair_id, json_content, payload
+            FROM json_items
+            WHERE data_type = ?
+            ORDER BY id
+        ''', (data_type,))
+        results = c.fetchall()
+        highlights = _fetch_highlights(c, 'data_type = ?', (data_type,))
+    loaded_data = []
+    for result in results:
+        content = _decode_json_item(result, highlights)
+        if content is not None:
+            loaded_data.append(content)
+    return loaded_data
+
+# Hot fields of a segment, read from generated columns (element is extracted in SQL)
+_SEGMENT_COLUMNS = ("id, pair_id, operation, position_in_wrong, position_in_correct, position_in_diff, "
+                    "json_extract(json_content, '$.element')")
+
+
+def _segment_dict(row):
+    return {
+        'id': row[0],
+        'pair_id': row[1],
+        'operation': row[2],
+        'position_in_wrong': row[3],
+        'position_in_correct': row[4],
+        'position_in_diff': row[5],
+        'element': row[6],
+    }
+
+def load_pair_segments(project_name, data_type, pair_id, db_path):
+    """
+    Load the hot fields (operation, positions, element) of one pair's segments without
+    decoding the full JSON items.
+    """
+    with transaction(project_name, db_path) as conn:
+        c = conn.cursor()
+        c.execute(f'''
+            SELECT {_SEGMENT_COLUMNS}
+            FROM json_items
+            WHERE data_type = ? AND pair_id = ?
+            ORDER BY id
+        ''', (data_type, pair_id))
+        rows = c.fetchall()
+    return [_segment_dict(row) for row in rows]
+
+def count_json_operations(project_name, data_type, db_path, pair_id=None):
     """
-    Return the total number of notes for a project.
+    Count the segments of a data type per operation, for the whole project or one pair.
     """
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    try:
-        c.execute('SELECT COUNT(*) FROM notes')
-        count = c.fetchone()[0]
-        return count
-    finally:
-        conn.close()
+    with transaction(project_name, db_path) as conn:
+        c = conn.cursor()
+        if pair_id is None:
+            c.execute('SELECT operation, COUNT(*) FROM json_items WHERE data_type = ? GROUP BY operation', (data_type,))
+        else:
+            c.execute('SELECT operation, COUNT(*) FROM json_items WHERE data_type = ? AND pair_id = ? GROUP BY operation',
+                      (data_type, pair_id))
+        counts = {operation: count for operation, count in c.fetchall()}
+    return counts
 
-def load_json_data(project_name, data_type, db_path):
+def find_segment_at(project_name, pair_id, data_type, side, offset, db_path):
     """
-    Load JSON data from the project's database for a given data type.
+    Return the segment of a pair that covers the byte offset of the given side
+    ('wrong', 'correct' or 'diff'), i.e. the last one starting at or before it.
     """
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('''
-        SELECT id, pair_id, json_content
-        FROM json_items
-        WHERE data_type = ?
-    ''', (data_type,))
-    results = c.fetchall()
-    conn.close()
-    loaded_data = []
-    for result in results:
-        content = json.loads(result[2]) # json_content is at index 2
-        if isinstance(content, dict):
-            content['id'] = result[0] # Add the row ID as 'id'
-            # Prioritize pair_id from content, else use from table
-            content['pair_id'] = content.get('pair_id', result[1])
-            loaded_data.append(content)
-    return loaded_data
+    if side not in ('wrong', 'correct', 'diff'):
+        raise ValueError(f"Unknown side: {side}")
+    position = f'position_in_{side}'
+    with transaction(project_name, db_path) as conn:
+        c = conn.cursor()
+        c.execute(f'''
+            SELECT {_SEGMENT_COLUMNS}
+            FROM json_items
+            WHERE pair_id = ? AND data_type = ? AND {position} <= ?
+            ORDER BY {position} DESC, id DESC
+            LIMIT 1
+        ''', (pair_id, data_type, offset))
+        row = c.fetchone()
+    return _segment_dict(row) if row else None
 
 def load_text_data(project_name, db_path):
     """
     Load error_text and corrected_text data from the project's database.
     """
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('''
-        SELECT id, error_text, corrected_text, title, scratchpad_content
-        FROM csv_data
-    ''')
-    results = c.fetchall()
-    conn.close()
+    with transaction(project_name, db_path) as conn:
+        c = conn.cursor()
+        c.execute('''
+            SELECT id, error_text, corrected_text, title, scratchpad_content
+            FROM csv_data
+        ''')
+        results = c.fetchall()
     loaded_data = [{'id': result[0], 'error_text': result[1], 'corrected_text': result[2], 'title': result[3], 'scratchpad_content': result[4]} for result in results]
     return loaded_data
 
 
-def load_nlp_dataframe(project_name, table_name, db_path, condition=None):
+# ========== NLP frames ==========
+# tokens/entities/classifications are read into pandas for analyses that run many
+# times per project (per pair, per report). Label columns hold a few dozen distinct
+# strings and code columns hold small enums, so they are loaded as categoricals and
+# small integers. Label columns are filled from the code columns in the project
+# language, so rows stored with codes only read the same as rows stored with labels.
+# Frames are memoised per project DB and language and invalidated through the
+# 'nlp_version' counter in project_meta, which every NLP write bumps; checking it
+# costs one primary-key lookup and also sees writes made by other processes.
+
+NLP_TABLES = ('tokens', 'entities', 'classifications')
+NLP_CATEGORY_COLUMNS = {
+    'tokens': ('text_type', 'tag', 'number', 'proper', 'aspect', 'case', 'form', 'gender', 'mood',
+               'person', 'reciprocity', 'tense', 'voice', 'label'),
+    'entities': ('text_type', 'type', 'common_or_proper'),
+    'classifications': ('text_type', 'category_name'),
+}
+NLP_INT_COLUMNS = {
+    'pair_id': 'Int32', 'position': 'Int32', 'head_token': 'Int32',
+    'tag_code': 'Int8', 'number_code': 'Int8', 'proper_code': 'Int8', 'aspect_code': 'Int8',
+    'case_code': 'Int8', 'form_code': 'Int8', 'gender_code': 'Int8', 'mood_code': 'Int8',
+    'person_code': 'Int8', 'reciprocity_code': 'Int8', 'tense_code': 'Int8', 'voice_code': 'Int8',
+    'dep_label_code': 'Int16', 'entity_type_code': 'Int8', 'mention_type_code': 'Int8',
+}
+NLP_CACHE_MAX_ENTRIES = 32
+
+_nlp_cache_lock = threading.Lock()
+_nlp_frames = OrderedDict()
+
+
+def _bump_nlp_version(c):
+    c.execute("CREATE TABLE IF NOT EXISTS project_meta (key TEXT PRIMARY KEY, value TEXT)")
+    c.execute("""
+        INSERT INTO project_meta (key, value) VALUES ('nlp_version', '1')
+        ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1
+    """)
+
+
+def _nlp_version(c):
+    try:
+        c.execute("SELECT value FROM project_meta WHERE key = 'nlp_version'")
+    except sqlite3.OperationalError:
+        return None
+    row = c.fetchone()
+    return row[0] if row else '0'
+
+
+def _forget_nlp_frames(db_file):
+    db_file = os.path.abspath(db_file)
+    with _nlp_cache_lock:
+        for key in [k for k in _nlp_frames if k[0] == db_file]:
+            del _nlp_frames[key]
+
+
+def _reset_nlp_cache_after_fork():
+    global _nlp_cache_lock
+    _nlp_cache_lock = threading.Lock()
+    _nlp_frames.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_nlp_cache_after_fork)
+
+
+def _nlp_filter_clause(filters, known_columns):
+    clauses, params = [], []
+    for column, value in (filters or {}).items():
+        if column not in known_columns:
+            raise ValueError(f"Unknown column '{column}'")
+        if isinstance(value, (list, tuple, set, frozenset)):
+            values = list(value)
+            if not values:
+                clauses.append('0')
+                continue
+            clauses.append(f'"{column}" IN ({",".join("?" * len(values))})')
+            params.extend(values)
+        elif value is None:
+            clauses.append(f'"{column}" IS NULL')
+        else:
+            clauses.append(f'"{column}" = ?')
+            params.append(value)
+    return ' AND '.join(clauses), params
+
+
+def _freeze_filters(filters):
+    frozen = []
+    for column, value in sorted((filters or {}).items()):
+        if isinstance(value, (list, tuple, set, frozenset)):
+            value = tuple(sorted(value, key=str))
+        frozen.append((column, value))
+    return tuple(frozen)
+
+
+def _label_filters_to_codes(filters, table_name, language):
+    # Labels may not be stored; filter label columns through their codes instead
+    labelled = LABEL_COLUMNS.get(table_name, {})
+    converted = {}
+    for column, value in (filters or {}).items():
+        if column in labelled:
+            code_column, list_name = labelled[column]
+            codes = code_map(list_name, language)
+            values = value if isinstance(value, (list, tuple, set, frozenset)) else [value]
+            column, value = code_column, [codes[v] for v in values if v in codes]
+        converted[column] = value
+    return converted
+
+
+def _label_nlp_frame(df, table_name, language):
+    for column, (code_column, list_name) in LABEL_COLUMNS.get(table_name, {}).items():
+        if column not in df.columns or code_column not in df.columns:
+            continue
+        codes = df[code_column]
+        has_code = codes.notna()
+        if not has_code.any():
+            continue
+        labels = codes.map(label_map(language, list_name))
+        labels[has_code & labels.isna()] = FALLBACK_LABEL
+        df[column] = labels.where(has_code, df[column])
+    return df
+
+
+def _compact_nlp_frame(df, table_name):
+    for column in NLP_CATEGORY_COLUMNS.get(table_name, ()):
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    for column, dtype in NLP_INT_COLUMNS.items():
+        if column in df.columns:
+            try:
+                df[column] = df[column].astype(dtype)
+            except (TypeError, ValueError):
+                pass  # out-of-range or non-integer legacy values: keep the inferred dtype
+    return df
+
+
+def load_nlp_dataframe(project_name, table_name, db_path, columns=None, filters=None, cache=True):
     """
-    Load data from a specified table in the project's database into a pandas DataFrame.
+    Load rows of an NLP table (tokens, entities, classifications) into a pandas DataFrame.
 
     Args:
         project_name (str): The name of the project.
         table_name (str): The name of the table to load data from.
-        condition (str, optional): An optional condition to filter the data.
+        columns (list, optional): Columns to load (default: all).
+        filters (dict, optional): Column -> value equality filters; list values become IN (...).
+        cache (bool): Keep the frame for later identical calls; pass False for one-off loads
+            (e.g. a chunk of pairs) so they do not evict the report frames.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the table data.
+        pd.DataFrame: Label columns (resolved from their codes in the project language) as
+        categoricals, code columns as small nullable integers. The frame may be shared with
+        later callers through the cache; do not modify it in place.
     """
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
+    if table_name not in NLP_TABLES:
+        raise ValueError(f"Unknown NLP table '{table_name}'")
+    language = get_project_language(project_name, db_path) if table_name in LABEL_COLUMNS else None
+    project_db_name = os.path.abspath(os.path.join(db_path, f'{project_name}.db'))
+    with db_transaction(project_db_name) as conn:
+        c = conn.cursor()
 
-    query = f'SELECT * FROM {table_name}'
-    if condition:
-        query += f' WHERE {condition}'
+        version = _nlp_version(c)
+        key = (project_db_name, table_name, tuple(columns) if columns else None, _freeze_filters(filters), language)
+        with _nlp_cache_lock:
+            cached = _nlp_frames.get(key) if cache else None
+            if cached is not None and version is not None and cached[0] == version:
+                _nlp_frames.move_to_end(key)
+                return cached[1].copy(deep=False)
+
+        c.execute(f'PRAGMA table_info({table_name})')
+        known_columns = [row[1] for row in c.fetchall()]
+        if columns:
+            unknown = [col for col in columns if col not in known_columns]
+            if unknown:
+                raise ValueError(f"Unknown column(s) {unknown} for table '{table_name}'")
+            # Requested labels are resolved from their code columns
+            labelled = LABEL_COLUMNS.get(table_name, {})
+            code_columns = [labelled[col][0] for col in columns
+                            if col in labelled and labelled[col][0] in known_columns and labelled[col][0] not in columns]
+            select = ', '.join(f'"{col}"' for col in list(columns) + code_columns)
+        else:
+            code_columns = []
+            select = '*'
+        where, params = _nlp_filter_clause(_label_filters_to_codes(filters, table_name, language), known_columns)
+
+        query = f'SELECT {select} FROM {table_name}'
+        if where:
+            query += f' WHERE {where}'
+        df = _label_nlp_frame(pd.read_sql_query(query, conn, params=params), table_name, language)
+        df = _compact_nlp_frame(df.drop(columns=code_columns), table_name)
+
+    if cache and version is not None:
+        with _nlp_cache_lock:
+            _nlp_frames[key] = (version, df)
+            _nlp_frames.move_to_end(key)
+            while len(_nlp_frames) > NLP_CACHE_MAX_ENTRIES:
+                _nlp_frames.popitem(last=False)
+    return df.copy(deep=False)
+
+
+def nlp_records(df):
+    """
+    DataFrame rows as JSON-safe dicts (missing labels/codes become None).
+    """
+    if df is None or df.empty:
+        return []
+    return [{k: (None if v is not None and v != v else v) for k, v in row.items()}
+            for row in df.to_dict(orient='records')]
 
-    df = pd.read_sql_query(query, conn)
-    conn.close()
 
-    return df
+def nlp_label_counts(conn, table_name, column, language, group_by=('text_type',)):
+    """
+    Row counts of an NLP table per label of column (resolved in language) and group_by
+    columns, as {(label, *group values): n}. Unlabelled and 'N/A' rows are left out.
+    """
+    code_column, list_name = LABEL_COLUMNS[table_name][column]
+    groups = ', '.join(f'"{col}"' for col in group_by)
+    c = conn.cursor()
+    c.execute(f'''
+        SELECT {code_column}, "{column}", {groups}, COUNT(*) FROM {table_name}
+        GROUP BY {code_column}, "{column}", {groups}
+    ''')
+    counts = {}
+    for row in c.fetchall():
+        label = resolve_label(language, list_name, row[0], row[1])
+        if label is None or label == FALLBACK_LABEL:
+            continue
+        key = (label,) + tuple(row[2:-1])
+        counts[key] = counts.get(key, 0) + row[-1]
+    return counts
 
 def load_csv_data(project_name, db_path):
     """
     Load data from the csv_data table of the project's database.
     """
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('''
-        SELECT id, error_text, corrected_text, title
-        FROM csv_data
-    ''')
-    results = c.fetchall()
-    conn.close()
+    with transaction(project_name, db_path) as conn:
+        c = conn.cursor()
+        c.execute('''
+            SELECT id, error_text, corrected_text, title
+            FROM csv_data
+        ''')
+        results = c.fetchall()
     return [{'id': result[0], 'error_text': result[1], 'corrected_text': result[2], 'title': result[3]} for result in results]
 
+def load_pairs_to_process(project_name, db_path, pair_ids=None):
+    """
+    Pairs with what diff processing needs to decide whether to redo them: texts, the pair's
+    NLP version and the fingerprint stored with its current results (None if never processed).
+    """
+    migrate_project_db(project_name, db_path)
+    with transaction(project_name, db_path) as conn:
+        c = conn.cursor()
+        query = '''
+            SELECT c.id, c.error_text, c.corrected_text, c.nlp_version, d.fingerprint
+            FROM csv_data c
+            LEFT JOIN diff_data d ON d.pair_id = c.id
+        '''
+        if pair_ids is not None:
+            pair_ids = [int(pair_id) for pair_id in pair_ids]
+            query += " WHERE c.id IN (SELECT value FROM json_each(?))"
+            c.execute(query + ' ORDER BY c.id', (json.dumps(pair_ids),))
+        else:
+            c.execute(query + ' ORDER BY c.id')
+        results = c.fetchall()
+    return [{'id': row[0], 'error_text': row[1], 'corrected_text': row[2], 'nlp_version': row[3], 'fingerprint': row[4]}
+            for row in results]
+
 def save_title_to_db(project_name, pair_id, title, db_path):
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('''
+    run_write(project_db_name, lambda conn: conn.execute('''
         UPDATE csv_data
         SET title = ?
         WHERE id = ?
-    ''', (title, pair_id))
-    conn.commit()
-    conn.close()
+    ''', (title, pair_id)).rowcount)
 
 
 # Function to save genre and main idea to the database
 def save_genre_and_main_idea(project_name, genre, main_idea, record_id, db_path):
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('''
+    run_write(project_db_name, lambda conn: conn.execute('''
         UPDATE csv_data
         SET genre = ?, meaning = ?
         WHERE id = ?
-    ''', (genre, main_idea, record_id))
-    conn.commit()
-    conn.close()
+    ''', (genre, main_idea, record_id)).rowcount)
 
 
 def retrieve_all_genre_main_idea_and_category(project_name, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    with sqlite3.connect(project_db_name) as conn:
+    with transaction(project_name, db_path) as conn:
         c = conn.cursor()
 
         # Retrieve data from csv_data table
@@ -1043,111 +2643,174 @@ def retrieve_all_genre_main_idea_and_category(project_name, db_path):
         "Classifications": classifications_results
     }
 
-def save_json_data_if_not_exists(project_name, pair_id, data_type, json_content, db_path):
+def _json_item_rows(pair_id, data_type, json_content):
     """
-    Save JSON data to the project's database, replacing existing entries for the same pair_id and data_type.
+    Turn one diff result (JSON string or list of segments) into json_items rows.
+    Only segments carrying an operation are stored.
     """
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
+    if isinstance(json_content, str):
+        json_content = json.loads(json_content)  # Convert JSON string to a list of dictionaries
+    rows = []
+    for item in json_content:
+        if item.get('operation'):
+            item['pair_id'] = pair_id  # Add pair_id to the item
+            rows.append((pair_id, data_type) + _encode_json_item(item))
+    return rows
 
-    # Delete existing data for this pair_id and data_type to prevent duplication
-    c.execute('DELETE FROM json_items WHERE pair_id = ? AND data_type = ?', (pair_id, data_type))
 
-    try:
-        # Ensure json_content is a valid JSON string
-        if isinstance(json_content, str):
-            json_content = json.loads(json_content)  # Convert JSON string to a list of dictionaries
-        else:
-            json_content = json_content  # Already a list of dictionaries
-
-        for item in json_content:
-            operation_type = item.get('operation')
-            if operation_type:
-                item['pair_id'] = pair_id # Add pair_id to the item
-                json_item = json.dumps(item)
-                c.execute('''
-                    INSERT INTO json_items (pair_id, data_type, json_content)
-                    VALUES (?, ?, ?)
-                ''', (pair_id, data_type, json_item))
-                item_id = c.lastrowid
-
-    except json.JSONDecodeError as jde:
-        print(f"JSON decode error: {jde}, json_content: {json_content[:50]}...")  # Debugging print
-    except Exception as e:
-        print(f"Error inserting item: {e}, json_content: {json_content[:50]}...")  # Debugging print
+def _replace_json_items(c, results):
+    """
+    Replace the json_items of every (pair_id, data_type, json_content) in results.
+    """
+    keys = []
+    rows = []
+    for pair_id, data_type, json_content in results:
+        keys.append((pair_id, data_type))
+        try:
+            rows.extend(_json_item_rows(pair_id, data_type, json_content))
+        except json.JSONDecodeError as jde:
+            print(f"JSON decode error: {jde}, json_content: {json_content[:50]}...")  # Debugging print
+    # Delete existing data for these pair_id/data_type keys to prevent duplication
+    c.executemany('DELETE FROM highlights WHERE pair_id = ? AND data_type = ?', keys)
+    c.executemany('DELETE FROM json_items WHERE pair_id = ? AND data_type = ?', keys)
+    c.executemany('INSERT INTO json_items (pair_id, data_type, json_content, payload) VALUES (?, ?, ?, ?)', rows)
+    return len(rows)
+
+
+def _save_text_pair_results_in(c, results):
+    c.executemany('UPDATE csv_data SET title = ? WHERE id = ?',
+                  [(r['title'], r['pair_id']) for r in results if r.get('title')])
+    count = _replace_json_items(c, [
+        (r['pair_id'], data_type, r[data_type])
+        for r in results for data_type in ('wrong', 'correct', 'diff')
+    ])
+    c.executemany('INSERT OR REPLACE INTO diff_data (pair_id, diff_text, fingerprint) VALUES (?, ?, ?)',
+                  [(r['pair_id'], _encode_diff_text(r['diff_text']), r.get('fingerprint')) for r in results])
+    return count
+
+
+def submit_text_pair_results(project_name, results, db_path):
+    """
+    Queue the processing results of a batch of pairs to the project DB's writer, to be
+    written in one savepoint.
 
-    conn.commit()
-    conn.close()
+    Each result is a dict with 'pair_id', 'wrong', 'correct', 'diff', 'diff_text'
+    and optional 'title' and 'fingerprint'. Returns a Future with the number of diff
+    segments written.
+    """
+    project_db_name = os.path.join(db_path, f'{project_name}.db')
+    return submit_write(project_db_name, lambda conn: _save_text_pair_results_in(conn.cursor(), results))
 
 
-def save_csv_data_if_not_exists(project_name, csv_data, db_path):
+def _insert_csv_chunk(conn, rows, claim_empty=False):
     """
-    Save CSV data to the project's database if it does not already exist.
+    Insert (error_text, corrected_text) rows under ids following the last one AUTOINCREMENT
+    handed out. Returns the (first, last) ids given to them; with claim_empty, returns None
+    without inserting when csv_data already has rows.
     """
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
     c = conn.cursor()
-    c.execute('SELECT COUNT(*) FROM csv_data')
-    if c.fetchone()[0] == 0:
-        for item in csv_data:
-            c.execute('''
-                INSERT INTO csv_data (error_text, corrected_text)
-                VALUES (?, ?)
-            ''', (item['ErrorText'], item['CorrectedText']))
-            item['id'] = c.lastrowid
-        conn.commit()
-    conn.close()
+    if claim_empty:
+        c.execute('SELECT 1 FROM csv_data LIMIT 1')
+        if c.fetchone():
+            return None
+    c.execute("SELECT seq FROM sqlite_sequence WHERE name = 'csv_data'")
+    row = c.fetchone()
+    first_id = (row[0] if row else 0) + 1
+    c.executemany('INSERT INTO csv_data (id, error_text, corrected_text) VALUES (?, ?, ?)',
+                  [(first_id + i, error_text, corrected_text) for i, (error_text, corrected_text) in enumerate(rows)])
+    return first_id, first_id + len(rows) - 1
+
 
-def update_json_item(project_name, data_type, item_id, json_content, db_path):
+def _remove_csv_id_ranges(conn, id_ranges):
+    c = conn.cursor()
+    c.executemany('DELETE FROM csv_data WHERE id BETWEEN ? AND ?', id_ranges)
+    # Hand the ids back only if nothing was inserted after them
+    c.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'csv_data' AND seq = ?",
+              (id_ranges[0][0] - 1, id_ranges[-1][1]))
+
+
+def save_csv_data_stream(project_name, chunks, db_path):
     """
-    Update a JSON item in the project's database with new content.
+    Insert (error_text, corrected_text) rows chunk by chunk, one transaction per chunk, if
+    csv_data is still empty. Returns the number of rows inserted (None if the project
+    already had data). If reading or inserting fails midway, the rows this call inserted
+    are removed again before the error is re-raised.
     """
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('UPDATE json_items SET json_content = ? WHERE data_type = ? AND id = ?', (json.dumps(json_content), data_type, item_id))
-    conn.commit()
-    conn.close()
-
+    id_ranges = []
+    total = 0
+    try:
+        for rows in chunks:
+            if not rows:
+                continue
+            # The first chunk checks and fills the empty table in one write, so of two
+            # concurrent uploads only one gets to insert
+            id_range = run_write(project_db_name, partial(_insert_csv_chunk, rows=rows, claim_empty=not id_ranges))
+            if id_range is None:
+                return None
+            id_ranges.append(id_range)
+            total += len(rows)
+    except BaseException:
+        if id_ranges:
+            run_write(project_db_name, partial(_remove_csv_id_ranges, id_ranges=id_ranges))
+        raise
+    if not id_ranges:
+        with transaction(project_name, db_path) as conn:
+            if conn.execute('SELECT 1 FROM csv_data LIMIT 1').fetchone():
+                return None
+    return total
 
 def save_highlights(project_name, data_type, original_name, db_path, new_name=None, new_description=None):
     """
-    Update the highlights in the JSON content stored in the json_items table.
+    Rename and/or re-describe every highlight called original_name (optionally of one data type only).
     """
+    sets = []
+    params = []
+    if new_name:
+        sets.append('name = ?')
+        params.append(new_name)
+    if new_description:
+        sets.append('description = ?')
+        params.append(new_description)
+    if not sets:
+        return 0
+    where = 'name = ?'
+    params.append(original_name)
+    if data_type:
+        where += ' AND data_type = ?'
+        params.append(data_type)
+
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
+    # OR REPLACE merges into an item's existing highlight when renaming onto a name it already has
+    return run_write(project_db_name, lambda conn: conn.execute(
+        f'UPDATE OR REPLACE highlights SET {", ".join(sets)} WHERE {where}', params).rowcount)
 
-    # Select the json_content from the json_items table
-    c.execute('SELECT id, json_content FROM json_items WHERE data_type = ?', (data_type,))
-    rows = c.fetchall()
+def _is_unset(value):
+    return value in (None, '', 'undefined')
 
-    for row in rows:
-        item_id, json_content = row
-        content = json.loads(json_content)
-
-        # Update the Highlights in the json_content
-        updated = False
-        for highlight in content.get('Highlights', []):
-            if highlight['name'] == original_name:
-                if new_name:
-                    highlight['name'] = new_name
-                if new_description:
-                    highlight['description'] = new_description
-                updated = True
-
-        # Save the updated json_content back to the database
-        if updated:
-            new_json_content = json.dumps(content)
-            c.execute('UPDATE json_items SET json_content = ? WHERE id = ?', (new_json_content, item_id))
+def _find_json_item(c, data_type, element_text, pos_wrong, pos_correct, pos_diff, pair_id):
+    """
+    Return the hot fields of the first item of data_type showing element_text at the
+    given positions, or None. Unset positions and pair id match anything.
+    """
+    sql = f'SELECT {_SEGMENT_COLUMNS} FROM json_items WHERE data_type = ? AND json_extract(json_content, \'$.element\') = ?'
+    params = [data_type, element_text]
+    for column, value in (('pair_id', pair_id), ('position_in_wrong', pos_wrong),
+                          ('position_in_correct', pos_correct), ('position_in_diff', pos_diff)):
+        if not _is_unset(value):
+            sql += f' AND {column} = ?'
+            params.append(value)
+    c.execute(sql + ' ORDER BY id LIMIT 1', params)
+    row = c.fetchone()
+    return _segment_dict(row) if row else None
 
-    conn.commit()
-    conn.close()
 
 def update_tags_or_highlights(project_name, data, is_highlight_update, db_path):
     """
-    Update tags or highlights in the JSON data based on the provided data.
+    Set a highlight on the text element described by data, creating it if needed.
+
+    Tag updates (is_highlight_update=False) activate the highlight and give a new one
+    the tag's description; highlight updates set its active flag to data['active'].
     """
     elementText = data['elementText']
     elementPosWrong = data.get('elementPosWrong', '')
@@ -1157,158 +2820,76 @@ def update_tags_or_highlights(project_name, data, is_highlight_update, db_path):
 
     tagName = data['name']
 
-    tagDescription = None
-    isActive = None
-
     if is_highlight_update:
-        isActive = data['active']
+        description = None
+        active = data['active']
     else:
-        tagDescription = data.get('description', '')
-
-    html_wrong = load_json_data(project_name, 'wrong', db_path)
-    html_correct = load_json_data(project_name, 'correct', db_path)
-    html_diff = load_json_data(project_name, 'diff', db_path)
-
-    updated_highlights, updated_element, updated_pos_wrong, updated_pos_correct, updated_pos_diff, updated_pair_id = (
-        update_highlights(html_wrong, project_name, 'wrong', elementText, elementPosWrong, elementPosCorrect, elementPosDiff, elementDataPairId, tagName, db_path, tagDescription, isActive) or
-        update_highlights(html_correct, project_name, 'correct', elementText, elementPosWrong, elementPosCorrect, elementPosDiff, elementDataPairId, tagName, db_path, tagDescription, isActive) or
-        update_highlights(html_diff, project_name, 'diff', elementText, elementPosWrong, elementPosCorrect, elementPosDiff, tagName, elementDataPairId, db_path, tagDescription, isActive)
-    )
-
-    return {
-        "updated_highlights": updated_highlights,
-        "updated_element": updated_element,
-        "updated_pos_wrong": updated_pos_wrong,
-        "updated_pos_correct": updated_pos_correct,
-        "updated_pos_diff": updated_pos_diff,
-        "updated_pair_id": updated_pair_id
-    }
-
-def update_highlights(dataset, project_name, data_type, elementText, elementPosWrong, elementPosCorrect, elementPosDiff, elementDataPairId, tagName, db_path, tagDescription=None, isActive=None):
-    """
-    Helper function to update highlights in the JSON dataset.
-    """
-    updated = False
-    for item in dataset:
-        # Ensure item is a dictionary and has the necessary keys
-        if not isinstance(item, dict):
-            continue
-
-        # Access position data directly from the item dictionary
-        item_pos_wrong = item.get('position_in_wrong')
-        item_pos_correct = item.get('position_in_correct')
-        item_pos_diff = item.get('position_in_diff')
-        item_pair_id = item.get('pair_id')
-
-        match_found = (item.get('element') == elementText and
-                       (elementPosWrong in [None, '', "undefined"] or item_pos_wrong == elementPosWrong) and
-                       (elementPosCorrect in ['', "undefined"] or item_pos_correct == elementPosCorrect) and
-                       (elementPosDiff in ['', "undefined"] or item_pos_diff == elementPosDiff) and
-                       (elementDataPairId in ['', "undefined"] or item_pair_id == elementDataPairId))
-
-        if tagDescription is not None:
-            tag_exists = False
-            for highlight in item.get('Highlights', []):
-                if highlight['name'] == tagName:
-                    if highlight['active'] != match_found:
-                        highlight['active'] = match_found
-                        updated = True
-                    tag_exists = True
-                    break
+        description = data.get('description', '')
+        active = True
 
-            if not tag_exists:
-                item.setdefault('Highlights', []).append({
-                    'name': tagName,
-                    'description': tagDescription,
-                    'active': match_found
-                })
-                updated = True
+    def _set_highlight(conn):
+        # Lookup and upsert share one write so the element cannot change in between
+        c = conn.cursor()
+        for data_type in ('wrong', 'correct', 'diff'):
+            found = _find_json_item(c, data_type, elementText, elementPosWrong, elementPosCorrect, elementPosDiff, elementDataPairId)
+            if found:
+                break
         else:
-            highlight_found = False
-            for highlight in item.get('Highlights', []):
-                if highlight['name'] == tagName:
-                    highlight['active'] = isActive
-                    highlight_found = True
-                    updated = True
-                    break
+            return None, []
 
-            if not highlight_found:
-                item.setdefault('Highlights', []).append({
-                    'name': tagName,
-                    'active': isActive
-                })
-                updated = True
-
-        if match_found:
-            if updated:
-                update_json_item(project_name, data_type, item['id'], item, db_path)
-            return (item.get('Highlights', []),
-                    item.get('element'),
-                    item.get('position_in_wrong'),
-                    item.get('position_in_correct'),
-                    item.get('position_in_diff'),
-                    item.get('pair_id'))
-
-    return [], None, None, None, None
-
-
-# Save highlight function
-def save_highlight(dataset, project_name, data_type, original_name, new_name, new_description, db_path):
-    updated = False
-    for item in dataset:
-        for highlight in item.get('Highlights', []):
-            if highlight['name'] == original_name:
-                highlight['name'] = new_name
-                highlight['description'] = new_description
-                updated = True
-                break
+        item_id = found['id']
+        c.execute('''
+            INSERT INTO highlights (json_item_id, pair_id, data_type, name, description, active)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(json_item_id, name) DO UPDATE SET active = excluded.active
+        ''', (item_id, found['pair_id'], data_type, tagName, description, active))
+        return found, _fetch_highlights(c, 'json_item_id = ?', (item_id,)).get(item_id, [])
 
-        if updated:
-            update_json_item(project_name, data_type, item['id'], item, db_path)
-            return (item.get('Highlights', []),
-                    item.get('element', None),
-                    item.get('position_in_wrong', None),
-                    item.get('position_in_correct', None),
-                    item.get('position_in_diff', None),
-                    item.get('pair_id', None))
+    project_db_name = os.path.join(db_path, f'{project_name}.db')
+    found, highlights = run_write(project_db_name, _set_highlight)
+    if not found:
+        return {
+            "updated_highlights": [],
+            "updated_element": None,
+            "updated_pos_wrong": None,
+            "updated_pos_correct": None,
+            "updated_pos_diff": None,
+            "updated_pair_id": None
+        }
 
-    return [], None, None, None, None
+    return {
+        "updated_highlights": highlights,
+        "updated_element": found['element'],
+        "updated_pos_wrong": found['position_in_wrong'],
+        "updated_pos_correct": found['position_in_correct'],
+        "updated_pos_diff": found['position_in_diff'],
+        "updated_pair_id": found['pair_id']
+    }
 
 def get_tags(project_name, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM tags')
-    tags = [dict(row) for row in c.fetchall()]
-    conn.close()
+    with transaction(project_name, db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('SELECT * FROM tags')
+        tags = [dict(row) for row in c.fetchall()]
     return tags
 
 def create_tag(project_name, name, description, parent_tag_id, color, db_path):
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('INSERT INTO tags (name, description, parent_tag_id, color) VALUES (?, ?, ?, ?)', (name, description, parent_tag_id, color))
-    conn.commit()
-    new_tag_id = c.lastrowid
-    conn.close()
+    new_tag_id = run_write(project_db_name, lambda conn: conn.execute(
+        'INSERT INTO tags (name, description, parent_tag_id, color) VALUES (?, ?, ?, ?)',
+        (name, description, parent_tag_id, color)).lastrowid)
     return get_tag(project_name, new_tag_id, db_path)
 
 def get_tag(project_name, tag_id, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM tags WHERE id = ?', (tag_id,))
-    tag = dict(c.fetchone())
-    conn.close()
+    with transaction(project_name, db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('SELECT * FROM tags WHERE id = ?', (tag_id,))
+        tag = dict(c.fetchone())
     return tag
 
 def update_tag(project_name, tag_id, db_path, **kwargs):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-
     fields_to_update = []
     params = []
 
@@ -1316,245 +2897,146 @@ def update_tag(project_name, tag_id, db_path, **kwargs):
         fields_to_update.append(f"{key} = ?")
         params.append(value)
 
-    if not fields_to_update:
-        return get_tag(project_name, tag_id, db_path)
+    if fields_to_update:
+        params.append(tag_id)
+        project_db_name = os.path.join(db_path, f'{project_name}.db')
+        run_write(project_db_name, lambda conn: conn.execute(
+            f'UPDATE tags SET {", ".join(fields_to_update)} WHERE id = ?', tuple(params)).rowcount)
 
-    params.append(tag_id)
-    c.execute(f'UPDATE tags SET {", ".join(fields_to_update)} WHERE id = ?', tuple(params))
-    
-    conn.commit()
-    conn.close()
     return get_tag(project_name, tag_id, db_path)
 
 def delete_tag(project_name, tag_id, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-
-    # Get all descendant tags (including the tag itself)
-    c.execute('''
-        WITH RECURSIVE Subtags AS (
-            SELECT id FROM tags WHERE id = ?
-            UNION ALL
-            SELECT t.id FROM tags t JOIN Subtags s ON t.parent_tag_id = s.id
-        )
-        SELECT id FROM Subtags;
-    ''', (tag_id,))
-    tags_to_delete = [row[0] for row in c.fetchall()]
-
-    if tags_to_delete:
-        # Also remove any manual highlights (JSON) whose name matches the tag(s)
-        try:
-            # Fetch names before deleting tags
-            placeholders = ','.join('?' * len(tags_to_delete))
-            c.execute(f'SELECT name FROM tags WHERE id IN ({placeholders})', tags_to_delete)
-            tag_names = [row[0] for row in c.fetchall()]
-        except Exception:
-            tag_names = []
+    return delete_tags(project_name, [tag_id], db_path)
 
-        try:
-            if tag_names:
-                html_wrong = load_json_data(project_name, 'wrong', db_path)
-                html_correct = load_json_data(project_name, 'correct', db_path)
-                html_diff = load_json_data(project_name, 'diff', db_path)
-                for nm in tag_names:
-                    try:
-                        delete_highlight(html_wrong, project_name, 'wrong', nm, db_path)
-                    except Exception:
-                        pass
-                    try:
-                        delete_highlight(html_correct, project_name, 'correct', nm, db_path)
-                    except Exception:
-                        pass
-                    try:
-                        delete_highlight(html_diff, project_name, 'diff', nm, db_path)
-                    except Exception:
-                        pass
-        except Exception:
-            pass
-
-        # Delete annotations associated with these tags
-        placeholders = ','.join('?' * len(tags_to_delete))
-        c.execute(f'DELETE FROM annotations WHERE tag_id IN ({placeholders})', tags_to_delete)
-
-        # Delete the tags themselves
-        c.execute(f'DELETE FROM tags WHERE id IN ({placeholders})', tags_to_delete)
-
-    conn.commit()
-    conn.close()
-
-def delete_tags(project_name, tag_ids, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
+def _delete_tags_in(conn, tag_ids):
+    counts = {'tags': 0, 'annotations': 0, 'highlights': 0}
     c = conn.cursor()
-
-    if not tag_ids:
-        conn.close()
-        return
-
-    placeholders = ','.join('?' for _ in tag_ids)
-
-    # Get all descendant tags (including the tags themselves)
+    # Resolve the subtree once into a temp table; every DELETE below joins against it
+    c.execute('CREATE TEMP TABLE IF NOT EXISTS doomed_tags (id INTEGER PRIMARY KEY, name TEXT)')
+    c.execute('DELETE FROM temp.doomed_tags')
     c.execute(f'''
+        INSERT OR IGNORE INTO temp.doomed_tags (id, name)
         WITH RECURSIVE Subtags AS (
-            SELECT id FROM tags WHERE id IN ({placeholders})
-            UNION ALL
+            SELECT id FROM tags WHERE id IN ({','.join('?' * len(tag_ids))})
+            UNION
             SELECT t.id FROM tags t JOIN Subtags s ON t.parent_tag_id = s.id
         )
-        SELECT id FROM Subtags;
-    ''', tag_ids)
-    tags_to_delete = [row[0] for row in c.fetchall()]
-
-    if tags_to_delete:
-        # Also remove any manual highlights (JSON) whose name matches the tag(s)
-        try:
-            placeholders = ','.join('?' * len(tags_to_delete))
-            c.execute(f'SELECT name FROM tags WHERE id IN ({placeholders})', tags_to_delete)
-            tag_names = [row[0] for row in c.fetchall()]
-        except Exception:
-            tag_names = []
-
-        try:
-            if tag_names:
-                html_wrong = load_json_data(project_name, 'wrong', db_path)
-                html_correct = load_json_data(project_name, 'correct', db_path)
-                html_diff = load_json_data(project_name, 'diff', db_path)
-                for nm in tag_names:
-                    try:
-                        delete_highlight(html_wrong, project_name, 'wrong', nm, db_path)
-                    except Exception:
-                        pass
-                    try:
-                        delete_highlight(html_correct, project_name, 'correct', nm, db_path)
-                    except Exception:
-                        pass
-                    try:
-                        delete_highlight(html_diff, project_name, 'diff', nm, db_path)
-                    except Exception:
-                        pass
-        except Exception:
-            pass
-
-        # Delete annotations associated with these tags
-        placeholders = ','.join('?' * len(tags_to_delete))
-        c.execute(f'DELETE FROM annotations WHERE tag_id IN ({placeholders})', tags_to_delete)
-
-        # Delete the tags themselves
-        c.execute(f'DELETE FROM tags WHERE id IN ({placeholders})', tags_to_delete)
-
-    conn.commit()
-    conn.close()
+        SELECT t.id, t.name FROM tags t JOIN Subtags s ON t.id = s.id
+    ''', list(tag_ids))
+
+    # Manual highlights carry the tag name
+    c.execute('DELETE FROM highlights WHERE name IN (SELECT name FROM temp.doomed_tags)')
+    counts['highlights'] = c.rowcount
+    c.execute('DELETE FROM annotations WHERE tag_id IN (SELECT id FROM temp.doomed_tags)')
+    counts['annotations'] = c.rowcount
+    c.execute('DELETE FROM tags WHERE id IN (SELECT id FROM temp.doomed_tags)')
+    counts['tags'] = c.rowcount
+    c.execute('DELETE FROM temp.doomed_tags')
+    return counts
 
-def save_annotation(project_name, pair_id, data_type, start_offset, end_offset, tag_id, text, db_path):
+def delete_tags(project_name, tag_ids, db_path):
+    """
+    Delete tags with all their descendants, their annotations and the highlights named
+    after them, in one transaction. Returns the number of rows deleted per table.
+    """
+    if not tag_ids:
+        return {'tags': 0, 'annotations': 0, 'highlights': 0}
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
+    return run_write(project_db_name, partial(_delete_tags_in, tag_ids=tag_ids))
+
+def _save_annotation_in(conn, pair_id, data_type, start_offset, end_offset, tag_id, text):
+    # Returns the id of the stored (or already identical) annotation
     c = conn.cursor()
 
     # Check for an existing annotation with the same attributes
     c.execute('''
         SELECT id FROM annotations 
-        WHERE project_name = ? AND pair_id = ? AND data_type = ? AND start_offset = ? AND end_offset = ? AND tag_id = ?
-    ''', (project_name, pair_id, data_type, start_offset, end_offset, tag_id))
+        WHERE pair_id = ? AND data_type = ? AND start_offset = ? AND end_offset = ? AND tag_id = ?
+    ''', (pair_id, data_type, start_offset, end_offset, tag_id))
     existing_annotation = c.fetchone()
 
     if existing_annotation:
         # If it exists, return the existing annotation
-        conn.close()
-        return get_annotation(project_name, existing_annotation[0], db_path)
+        return existing_annotation[0]
 
     # Delete any existing annotations with the same tag that overlap with the new one.
     # Overlap condition: (StartA <= EndB) and (EndA >= StartB)
     c.execute('''
         DELETE FROM annotations
-        WHERE project_name = ? AND pair_id = ? AND data_type = ? AND tag_id = ? AND
+        WHERE pair_id = ? AND data_type = ? AND tag_id = ? AND
               start_offset <= ? AND end_offset >= ?
-    ''', (project_name, pair_id, data_type, tag_id, end_offset, start_offset))
+    ''', (pair_id, data_type, tag_id, end_offset, start_offset))
 
     # If it doesn't exist, insert the new annotation
-    c.execute('INSERT INTO annotations (project_name, pair_id, data_type, start_offset, end_offset, tag_id, text) VALUES (?, ?, ?, ?, ?, ?, ?)', (project_name, pair_id, data_type, start_offset, end_offset, tag_id, text))
-    conn.commit()
-    new_annotation_id = c.lastrowid
-    conn.close()
-    return get_annotation(project_name, new_annotation_id, db_path)
+    c.execute('INSERT INTO annotations (pair_id, data_type, start_offset, end_offset, tag_id, text) VALUES (?, ?, ?, ?, ?, ?)', (pair_id, data_type, start_offset, end_offset, tag_id, text))
+    return c.lastrowid
 
-def save_diff_text(project_name, pair_id, diff_text, db_path):
+
+def submit_annotation(project_name, pair_id, data_type, start_offset, end_offset, tag_id, text, db_path):
+    """
+    Queue save_annotation's write without waiting; the Future yields the annotation id.
+    Callers saving many annotations submit them all first so they share a group commit.
+    """
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('INSERT OR REPLACE INTO diff_data (pair_id, diff_text) VALUES (?, ?)', (pair_id, diff_text))
-    conn.commit()
-    conn.close()
+    return submit_write(project_db_name, partial(_save_annotation_in, pair_id=pair_id, data_type=data_type,
+                                                 start_offset=start_offset, end_offset=end_offset,
+                                                 tag_id=tag_id, text=text))
+
+
+def save_annotation(project_name, pair_id, data_type, start_offset, end_offset, tag_id, text, db_path):
+    annotation_id = submit_annotation(project_name, pair_id, data_type, start_offset, end_offset,
+                                      tag_id, text, db_path).result()
+    return get_annotation(project_name, annotation_id, db_path)
 
 def get_annotation(project_name, annotation_id, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM annotations WHERE id = ?', (annotation_id,))
-    annotation = dict(c.fetchone())
-    conn.close()
+    with transaction(project_name, db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('SELECT *, ? AS project_name FROM annotations WHERE id = ?', (project_name, annotation_id))
+        annotation = dict(c.fetchone())
     return annotation
 
 # Delete highlight function
-def delete_highlight(dataset, project_name, data_type, name, db_path):
-    updated = False
-    for item in dataset:
-        highlights = item.get('Highlights', [])
-        new_highlights = [highlight for highlight in highlights if highlight['name'] != name]
-
-        if len(highlights) != len(new_highlights):
-            item['Highlights'] = new_highlights
-            updated = True
-
-        if updated:
-            update_json_item(project_name, data_type, item['id'], item, db_path)
-            return (item.get('Highlights', []),
-                    item.get('element', None),
-                    item.get('position_in_wrong', None),
-                    item.get('position_in_correct', None),
-                    item.get('position_in_diff', None),
-                    item.get('pair_id', None))
-
-    return [], None, None, None, None
+def delete_highlight(project_name, name, db_path, data_type=None):
+    """
+    Delete every highlight called name (optionally of one data type only). Returns the number removed.
+    """
+    project_db_name = os.path.join(db_path, f'{project_name}.db')
+    if data_type:
+        sql, params = 'DELETE FROM highlights WHERE name = ? AND data_type = ?', (name, data_type)
+    else:
+        sql, params = 'DELETE FROM highlights WHERE name = ?', (name,)
+    return run_write(project_db_name, lambda conn: conn.execute(sql, params).rowcount)
 
 def delete_annotation(project_name, annotation_id, db_path):
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('DELETE FROM annotations WHERE id = ?', (annotation_id,))
-    conn.commit()
-    conn.close()
+    run_write(project_db_name, lambda conn: conn.execute(
+        'DELETE FROM annotations WHERE id = ?', (annotation_id,)).rowcount)
 
 def save_chat_message(project_name, pair_id, sender, message, db_path):
     """
     Save a chat message to the project's database.
     """
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('''
+    run_write(project_db_name, lambda conn: conn.execute('''
         INSERT INTO chat_history (pair_id, sender, message)
         VALUES (?, ?, ?)
-    ''', (pair_id, sender, message))
-    conn.commit()
-    conn.close()
+    ''', (pair_id, sender, message)).lastrowid)
 
 def get_chat_history(project_name, pair_id, db_path):
     """
     Retrieve the chat history for a given pair_id from the project's database.
     """
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('''
-        SELECT id, sender, message, timestamp
-        FROM chat_history
-        WHERE pair_id = ?
-        ORDER BY timestamp ASC
-    ''', (pair_id,))
-    history = [dict(row) for row in c.fetchall()]
-    conn.close()
+    with transaction(project_name, db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('''
+            SELECT id, sender, message, timestamp
+            FROM chat_history
+            WHERE pair_id = ?
+            ORDER BY timestamp ASC
+        ''', (pair_id,))
+        history = [dict(row) for row in c.fetchall()]
     return history
 
 def save_tr_chat_message(project_name, sender, message, db_path):
@@ -1562,32 +3044,26 @@ def save_tr_chat_message(project_name, sender, message, db_path):
     Save a Tag Report Insights chat message for the project (project-level, not tied to a pair).
     """
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('''
+    run_write(project_db_name, lambda conn: conn.execute('''
         INSERT INTO tr_chat_history (sender, message)
         VALUES (?, ?)
-    ''', (sender, message))
-    conn.commit()
-    conn.close()
+    ''', (sender, message)).lastrowid)
 
 def get_tr_chat_history(project_name, limit, db_path):
     """
     Retrieve the last N Tag Report Insights chat messages for the project, ordered oldest->newest.
     """
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    # Get last 'limit' by id DESC, then reverse to chronological order
-    c.execute('''
-        SELECT id, sender, message, timestamp
-        FROM tr_chat_history
-        ORDER BY id DESC
-        LIMIT ?
-    ''', (int(limit or 10),))
-    rows = c.fetchall()
-    conn.close()
+    with transaction(project_name, db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        # Get last 'limit' by id DESC, then reverse to chronological order
+        c.execute('''
+            SELECT id, sender, message, timestamp
+            FROM tr_chat_history
+            ORDER BY id DESC
+            LIMIT ?
+        ''', (int(limit or 10),))
+        rows = c.fetchall()
     messages = [dict(r) for r in rows][::-1]
     return messages
 
@@ -1596,119 +3072,85 @@ def save_scratchpad_content(project_name, pair_id, content, db_path):
     Save the scratchpad content for a specific pair_id.
     """
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('''
+    run_write(project_db_name, lambda conn: conn.execute('''
         UPDATE csv_data
         SET scratchpad_content = ?
         WHERE id = ?
-    ''', (content, pair_id))
-    conn.commit()
-    conn.close()
+    ''', (content, pair_id)).rowcount)
 
 def create_note(project_name, pair_id, title, content, db_path):
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('INSERT INTO notes (pair_id, title, content) VALUES (?, ?, ?)', (pair_id, title, content))
-    conn.commit()
-    note_id = c.lastrowid
-    conn.close()
+    note_id = run_write(project_db_name, lambda conn: conn.execute(
+        'INSERT INTO notes (pair_id, title, content) VALUES (?, ?, ?)', (pair_id, title, content)).lastrowid)
     return get_note(project_name, note_id, db_path)
 
 def get_note(project_name, note_id, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM notes WHERE id = ?', (note_id,))
-    note = dict(c.fetchone())
-    conn.close()
+    with transaction(project_name, db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('SELECT * FROM notes WHERE id = ?', (note_id,))
+        note = dict(c.fetchone())
     return note
 
 def get_notes_for_pair(project_name, pair_id, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM notes WHERE pair_id = ? ORDER BY updated_at DESC', (pair_id,))
-    notes = [dict(row) for row in c.fetchall()]
-    conn.close()
+    with transaction(project_name, db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('SELECT * FROM notes WHERE pair_id = ? ORDER BY updated_at DESC', (pair_id,))
+        notes = [dict(row) for row in c.fetchall()]
     return notes
 
 def update_note(project_name, note_id, title, content, db_path):
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('UPDATE notes SET title = ?, content = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?', (title, content, note_id))
-    conn.commit()
-    conn.close()
+    run_write(project_db_name, lambda conn: conn.execute(
+        'UPDATE notes SET title = ?, content = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?',
+        (title, content, note_id)).rowcount)
     return get_note(project_name, note_id, db_path)
 
 def delete_note(project_name, note_id, db_path):
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('DELETE FROM notes WHERE id = ?', (note_id,))
-    conn.commit()
-    conn.close()
+    run_write(project_db_name, lambda conn: conn.execute('DELETE FROM notes WHERE id = ?', (note_id,)).rowcount)
 
 
 def create_auto_tagging_job(project_name, pair_id, instruction, plan, db_path):
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('''
+    return run_write(project_db_name, lambda conn: conn.execute('''
         INSERT INTO auto_tagging_jobs (pair_id, instruction, plan)
         VALUES (?, ?, ?)
-    ''', (pair_id, instruction, json.dumps(plan)))
-    conn.commit()
-    job_id = c.lastrowid
-    conn.close()
-    return job_id
+    ''', (pair_id, instruction, json.dumps(plan))).lastrowid)
 
 
 def update_auto_tagging_job_status(project_name, job_id, status, result, db_path):
     project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    c = conn.cursor()
-    c.execute('''
+    run_write(project_db_name, lambda conn: conn.execute('''
         UPDATE auto_tagging_jobs
         SET status = ?, result = ?, updated_at = CURRENT_TIMESTAMP
         WHERE id = ?
-    ''', (status, json.dumps(result), job_id))
-    conn.commit()
-    conn.close()
+    ''', (status, json.dumps(result), job_id)).rowcount)
 
 
 def get_auto_tagging_job(project_name, job_id, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM auto_tagging_jobs WHERE id = ?', (job_id,))
-    job = dict(c.fetchone())
-    conn.close()
+    with transaction(project_name, db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('SELECT * FROM auto_tagging_jobs WHERE id = ?', (job_id,))
+        job = dict(c.fetchone())
     return job
 
 
 def get_auto_tagging_jobs_for_pair(project_name, pair_id, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM auto_tagging_jobs WHERE pair_id = ? ORDER BY created_at DESC', (pair_id,))
-    jobs = [dict(row) for row in c.fetchall()]
-    conn.close()
+    with transaction(project_name, db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('SELECT * FROM auto_tagging_jobs WHERE pair_id = ? ORDER BY created_at DESC', (pair_id,))
+        jobs = [dict(row) for row in c.fetchall()]
     return jobs
 
 
 def load_text_pair(project_name, pair_id, db_path):
-    project_db_name = os.path.join(db_path, f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('SELECT * FROM csv_data WHERE id = ?', (pair_id,))
-    pair = dict(c.fetchone())
-    conn.close()
+    with transaction(project_name, db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('SELECT * FROM csv_data WHERE id = ?', (pair_id,))
+        pair = dict(c.fetchone())
     return pair
@@ -13,51 +13,82 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
 
-import spacy
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 from .diff_match_patch import diff_match_patch as dmp_module
-from .text_processing import connect_text, find_token_in_csv
+from .text_processing import NlpIndex, connect_text, find_token_in_csv
 import json
 from .utils import get_utf8_byte_length
-from .db import load_csv_data, save_json_data_if_not_exists, load_nlp_dataframe, save_title_to_db, save_diff_text
+from .db import load_pairs_to_process, load_nlp_dataframe, submit_text_pair_results, get_project_language
 from .gemini import generate_pair_title
+from .spacy_models import get_nlp, tokenize_segments
 
-def compare_texts(text1, text2, project_name, pair_id, db_path):
+
+def diff_segments(text1, text2):
+    """
+    Semantic diff of the lowercased texts, as a list of (operation, text) segments.
+    """
+    dmp = dmp_module()
+    diff = dmp.diff_main(text1.lower(), text2.lower())
+    dmp.diff_cleanupSemantic(diff)
+    return diff
+
+
+def load_pair_frames(project_name, table_name, pair_ids, db_path):
+    """
+    Rows of an NLP table for the given pairs, loaded in one query, as {pair_id: DataFrame}.
+    Pairs without rows get an empty frame.
     """
-    Perform a text comparison between two French texts using SpaCy and diff-match-patch.
+    df = load_nlp_dataframe(project_name, table_name, db_path, filters={'pair_id': list(pair_ids)}, cache=False)
+    # Keep table order within a pair: lookups break ties on the first row
+    if 'id' in df.columns:
+        df = df.sort_values('id', kind='stable')
+    frames = {pair_id: group for pair_id, group in df.groupby('pair_id', sort=False, observed=True)}
+    return {pair_id: frames.get(pair_id, df.iloc[0:0]) for pair_id in pair_ids}
+
+
+def compare_texts(text1, text2, project_name, pair_id, db_path, language=None, diff=None, segment_tokens=None,
+                  df_tokens=None, df_entities=None):
+    """
+    Perform a text comparison between two texts using SpaCy and diff-match-patch.
     Generate HTML representations of the changes and include morphosyntactic details from a CSV file.
 
     Args:
     text1 (str): The first text to compare.
     text2 (str): The second text to compare.
     project_name (str): The name of the project for saving JSON data.
+    language (str): Project language, picks the spaCy model (looked up when omitted).
+    diff (list): Precomputed diff_segments(text1, text2).
+    segment_tokens (list): Precomputed token texts of each diff segment.
+    df_tokens, df_entities (DataFrame): The pair's tokens/entities rows (loaded when omitted).
 
     Returns:
     tuple: A tuple containing three JSON strings: html_wrong_json, html_correct_json, html_diff_json.
     """
 
-    # Load the table tokens into a DataFrame
-    df_tokens = load_nlp_dataframe(project_name, "tokens", db_path)
-
-    # Load the table classifications into a DataFrame
-    df_classifications = load_nlp_dataframe(project_name, "classifications", db_path)
-
-    # Load the table entities into a DataFrame
-    df_entities = load_nlp_dataframe(project_name, "entities", db_path)
+    # Load the pair's tokens and entities into DataFrames
+    if df_tokens is None:
+        df_tokens = load_pair_frames(project_name, "tokens", [pair_id], db_path)[pair_id]
+    if df_entities is None:
+        df_entities = load_pair_frames(project_name, "entities", [pair_id], db_path)[pair_id]
 
-    # Load the SpaCy French model for natural language processing
-    nlp = spacy.load("fr_core_news_sm")
-
-    # Convert texts to lowercase
-    text1 = text1.lower()
-    text2 = text2.lower()
+    # Offset indexes answering the token/entity lookups of every segment
+    tokens_index = NlpIndex(df_tokens)
+    entities_index = NlpIndex(df_entities)
 
     # Initialize the diff-match-patch object
     dmp = dmp_module()
 
-    # Compute the differences between the two texts
-    diff = dmp.diff_main(text1, text2)
-    dmp.diff_cleanupSemantic(diff)
+    # Compute the differences between the lowercased texts
+    if diff is None:
+        diff = diff_segments(text1, text2)
+
+    # Tokenize every segment in one pass with the project language's spaCy pipeline
+    if segment_tokens is None:
+        if language is None:
+            language = get_project_language(project_name, db_path)
+        segment_tokens = tokenize_segments(language, [segment[1] for segment in diff])
 
     # Initialize lists to hold the HTML representations of the differences
     html_diff = []
@@ -86,10 +117,9 @@ def compare_texts(text1, text2, project_name, pair_id, db_path):
 
         if x[0] == -1 and next[0] == 1:
             # Handle replaced text
-            doc = nlp(text)
-            tokens = [token.text for token in doc]
-            morphology = find_token_in_csv(tokens, position_in_wrong, "error_text", df_tokens)
-            entities = find_token_in_csv(tokens, position_in_wrong, "error_text", df_entities)
+            tokens = segment_tokens[index]
+            morphology = find_token_in_csv(tokens, position_in_wrong, "error_text", tokens_index)
+            entities = find_token_in_csv(tokens, position_in_wrong, "error_text", entities_index)
 
 
             html_diff_replaced_element = {
@@ -122,10 +152,9 @@ def compare_texts(text1, text2, project_name, pair_id, db_path):
 
         elif previous[0] == -1 and x[0] == 1:
             # Handle replaced by text
-            doc = nlp(text)
-            tokens = [token.text for token in doc]
-            morphology = find_token_in_csv(tokens, position_in_correct, "corrected_text", df_tokens)
-            entities = find_token_in_csv(tokens, position_in_correct, "corrected_text", df_entities)
+            tokens = segment_tokens[index]
+            morphology = find_token_in_csv(tokens, position_in_correct, "corrected_text", tokens_index)
+            entities = find_token_in_csv(tokens, position_in_correct, "corrected_text", entities_index)
 
             html_diff_replacedby_element = {
                 "operation": "replacedby",
@@ -158,12 +187,11 @@ def compare_texts(text1, text2, project_name, pair_id, db_path):
         else:
             if x[0] == 0:
                 # Handle unchanged text
-                doc = nlp(text)
-                tokens = [token.text for token in doc]
-                morphology = find_token_in_csv(tokens, position_in_wrong, "error_text", df_tokens)
-                morphology_correct = find_token_in_csv(tokens, position_in_correct, "corrected_text", df_tokens)
-                entities = find_token_in_csv(tokens, position_in_wrong, "error_text", df_entities)
-                entities_correct = find_token_in_csv(tokens, position_in_correct, "corrected_text", df_entities)
+                tokens = segment_tokens[index]
+                morphology = find_token_in_csv(tokens, position_in_wrong, "error_text", tokens_index)
+                morphology_correct = find_token_in_csv(tokens, position_in_correct, "corrected_text", tokens_index)
+                entities = find_token_in_csv(tokens, position_in_wrong, "error_text", entities_index)
+                entities_correct = find_token_in_csv(tokens, position_in_correct, "corrected_text", entities_index)
 
                 html_diff_unchanged_element = {
                     "operation": "unchanged",
@@ -210,10 +238,9 @@ def compare_texts(text1, text2, project_name, pair_id, db_path):
 
             if x[0] == 1:
                 # Handle added text
-                doc = nlp(text)
-                tokens = [token.text for token in doc]
-                morphology = find_token_in_csv(tokens, position_in_correct, "corrected_text", df_tokens)
-                entities = find_token_in_csv(tokens, position_in_correct, "corrected_text", df_entities)
+                tokens = segment_tokens[index]
+                morphology = find_token_in_csv(tokens, position_in_correct, "corrected_text", tokens_index)
+                entities = find_token_in_csv(tokens, position_in_correct, "corrected_text", entities_index)
 
                 html_diff_added_element = {
                     "operation": "added",
@@ -245,10 +272,9 @@ def compare_texts(text1, text2, project_name, pair_id, db_path):
 
             elif x[0] == -1:
                 # Handle deleted text
-                doc = nlp(text)
-                tokens = [token.text for token in doc]
-                morphology = find_token_in_csv(tokens, position_in_wrong, "error_text", df_tokens)
-                entities = find_token_in_csv(tokens, position_in_wrong, "error_text", df_entities)
+                tokens = segment_tokens[index]
+                morphology = find_token_in_csv(tokens, position_in_wrong, "error_text", tokens_index)
+                entities = find_token_in_csv(tokens, position_in_wrong, "error_text", entities_index)
 
                 html_diff_deleted_element = {
                     "operation": "deleted",
@@ -287,29 +313,119 @@ def compare_texts(text1, text2, project_name, pair_id, db_path):
     return html_wrong_json, html_correct_json, html_diff_json, html_diff_raw
 
 
-def process_and_save_text_pairs(project_name, db_path, api_key):
+# Number of processed pairs written per transaction
+PAIR_WRITE_BATCH = 50
+
+# Bump when the diff/lookup output changes, so stored results are recomputed once
+DIFF_PROCESSING_VERSION = 1
+
+# Worker processes computing diffs; 1 processes the pairs in the calling process
+_diff_workers = 1
+
+
+def set_diff_workers(workers):
     """
-    Process each pair of texts from the csv_data table and save the results in the json_items table.
+    Choose how many worker processes process_and_save_text_pairs spreads the pairs over.
     """
-    # Load the text pairs from the csv_data table
-    text_pairs = load_csv_data(project_name, db_path)
+    global _diff_workers
+    _diff_workers = max(1, int(workers or 1))
 
-    # Loop through each text pair
-    for pair in text_pairs:
-        pair_id = pair['id']
-        text1 = pair['error_text']
-        text2 = pair['corrected_text']
 
-        # Generate title
-        title = generate_pair_title(project_name, text1, text2, api_key)
-        if title:
-            save_title_to_db(project_name, pair_id, title, db_path)
+def pair_fingerprint(error_text, corrected_text, language, nlp_version):
+    """
+    Fingerprint of everything a pair's diff results depend on.
+    """
+    key = json.dumps([DIFF_PROCESSING_VERSION, language, nlp_version, error_text, corrected_text])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _init_diff_worker(language):
+    # Load the spaCy pipeline once per worker process
+    get_nlp(language)
+
+
+def _process_chunk(project_name, db_path, language, batch):
+    """
+    Diff results of a chunk of pairs (without titles). The NLP rows of the chunk are read in
+    one query and split per pair, and the diff segments go through one nlp.pipe call.
+    """
+    batch_ids = [pair['id'] for pair in batch]
+    pair_tokens = load_pair_frames(project_name, "tokens", batch_ids, db_path)
+    pair_entities = load_pair_frames(project_name, "entities", batch_ids, db_path)
+    diffs = [diff_segments(pair['error_text'], pair['corrected_text']) for pair in batch]
+    tokens = tokenize_segments(language, [segment[1] for diff in diffs for segment in diff])
+
+    results = []
+    offset = 0
+    for pair, diff in zip(batch, diffs):
+        pair_id = pair['id']
+        segment_tokens = tokens[offset:offset + len(diff)]
+        offset += len(diff)
 
         # Perform the text comparison
-        html_wrong_json, html_correct_json, html_diff_json, html_diff_raw = compare_texts(text1, text2, project_name, pair_id, db_path)
+        html_wrong_json, html_correct_json, html_diff_json, html_diff_raw = compare_texts(
+            pair['error_text'], pair['corrected_text'], project_name, pair_id, db_path,
+            language=language, diff=diff, segment_tokens=segment_tokens,
+            df_tokens=pair_tokens[pair_id], df_entities=pair_entities[pair_id])
+
+        results.append({
+            'pair_id': pair_id,
+            'title': None,
+            'wrong': html_wrong_json,
+            'correct': html_correct_json,
+            'diff': html_diff_json,
+            'diff_text': html_diff_raw,
+            'fingerprint': pair['fingerprint'],
+        })
+    return results
+
+
+def process_and_save_text_pairs(project_name, db_path, api_key, pair_ids=None, force=False, workers=None):
+    """
+    Process each pair of texts from the csv_data table and save the results in the json_items table.
 
-        # Save the comparison results
-        save_json_data_if_not_exists(project_name, pair_id, 'wrong', html_wrong_json, db_path)
-        save_json_data_if_not_exists(project_name, pair_id, 'correct', html_correct_json, db_path)
-        save_json_data_if_not_exists(project_name, pair_id, 'diff', html_diff_json, db_path)
-        save_diff_text(project_name, pair_id, html_diff_raw, db_path)
\ No newline at end of file
+    Pairs whose texts, project language and NLP rows are unchanged since their results were
+    stored are skipped unless force is set. pair_ids restricts processing to those pairs.
+    With more than one worker (default: set_diff_workers), chunks of pairs are computed in a
+    process pool. Returns the number of pairs processed.
+    """
+    # Load the text pairs from the csv_data table
+    language = get_project_language(project_name, db_path)
+    text_pairs = []
+    skipped = 0
+    for pair in load_pairs_to_process(project_name, db_path, pair_ids):
+        fingerprint = pair_fingerprint(pair['error_text'], pair['corrected_text'], language, pair['nlp_version'])
+        if force or fingerprint != pair['fingerprint']:
+            text_pairs.append(dict(pair, fingerprint=fingerprint))
+        else:
+            skipped += 1
+
+    # Chunks of pairs are computed (in this process or in the pool), given their titles here,
+    # where the request context is, and queued to the project DB's writer, which commits each
+    # chunk while the next ones are computed.
+    chunks = [text_pairs[start:start + PAIR_WRITE_BATCH] for start in range(0, len(text_pairs), PAIR_WRITE_BATCH)]
+    workers = min(workers or _diff_workers, len(chunks))
+    texts = {pair['id']: (pair['error_text'], pair['corrected_text']) for pair in text_pairs}
+    writes = []
+
+    def save(results):
+        for result in results:
+            # Generate title
+            result['title'] = generate_pair_title(project_name, *texts[result['pair_id']], api_key)
+        writes.append(submit_text_pair_results(project_name, results, db_path))
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_diff_worker, initargs=(language,)) as pool:
+            futures = [pool.submit(_process_chunk, project_name, db_path, language, batch) for batch in chunks]
+            for future in as_completed(futures):
+                save(future.result())
+    else:
+        for batch in chunks:
+            save(_process_chunk(project_name, db_path, language, batch))
+
+    # Wait for the writer (and surface its errors)
+    for write in writes:
+        write.result()
+
+    print(f"[INFO] Processed {len(text_pairs)} pairs of project {project_name}, {skipped} unchanged")
+    return len(text_pairs)
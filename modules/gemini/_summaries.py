@@ -13,7 +13,10 @@
 # You should have received a copy of the GNU Affero General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
 
-import pandas as pd
+def _labels(series):
+    # Works for object and categorical columns alike
+    s = series.dropna().astype(str)
+    return s[~s.isin(['N/A', ''])]
 
 
 def summarize_tokens(df):
@@ -22,7 +25,7 @@ def summarize_tokens(df):
 
     def vc(col, top=None):
         try:
-            s = df[col].replace(['N/A', None, ''], pd.NA).dropna().astype(str)
+            s = _labels(df[col])
             counts = s.value_counts()
             if top:
                 counts = counts.head(top)
@@ -44,12 +47,12 @@ def summarize_entities(df):
     if df is None or df.empty:
         return {}
     try:
-        s = df['type'].replace(['N/A', None, ''], pd.NA).dropna().astype(str)
+        s = _labels(df['type'])
         type_counts = s.value_counts().to_dict()
     except Exception:
         type_counts = {}
     try:
-        s2 = df['common_or_proper'].replace(['N/A', None, ''], pd.NA).dropna().astype(str)
+        s2 = _labels(df['common_or_proper'])
         properness = s2.value_counts().to_dict()
     except Exception:
         properness = {}
@@ -19,7 +19,7 @@ from pprint import pformat
 from google import genai
 from flask import current_app
 
-from ..db import load_text_data, get_project_file, load_nlp_dataframe, load_json_data
+from ..db import load_text_data, get_project_file, load_nlp_dataframe, load_pair_segments, nlp_records
 from ..translations import get_translation
 from ..models import get_gemini_model
 from ._common import _lang_reply_instruction
@@ -68,13 +68,12 @@ def generate_linguistic_analysis(project_name, pair_id, use_ai=None, **kwargs):
     except Exception:
         language = 'en'
 
-    cond = f"pair_id = {int(pair_id)}"
-    tokens_df = load_nlp_dataframe(project_name, 'tokens', current_app.config['DATABASE_PATH'], condition=cond)
-    entities_df = load_nlp_dataframe(project_name, 'entities', current_app.config['DATABASE_PATH'], condition=cond)
+    pair_filter = {'pair_id': int(pair_id)}
+    tokens_df = load_nlp_dataframe(project_name, 'tokens', current_app.config['DATABASE_PATH'], filters=pair_filter)
+    entities_df = load_nlp_dataframe(project_name, 'entities', current_app.config['DATABASE_PATH'], filters=pair_filter)
 
     try:
-        diff_items_all = load_json_data(project_name, 'diff', current_app.config['DATABASE_PATH'])
-        diff_items = [it for it in diff_items_all if int(it.get('pair_id', -1)) == int(pair_id)]
+        diff_items = load_pair_segments(project_name, 'diff', int(pair_id), current_app.config['DATABASE_PATH'])
     except Exception:
         diff_items = []
 
@@ -465,8 +464,8 @@ def generate_linguistic_analysis(project_name, pair_id, use_ai=None, **kwargs):
     # Bundle NER data inside the same response so the frontend can render the NER tab from the cached analysis
     try:
         if entities_df is not None:
-            ner_wrong = e_wrong.to_dict(orient='records') if (e_wrong is not None and not e_wrong.empty) else []
-            ner_correct = e_corr.to_dict(orient='records') if (e_corr is not None and not e_corr.empty) else []
+            ner_wrong = nlp_records(e_wrong)
+            ner_correct = nlp_records(e_corr)
         else:
             ner_wrong = []
             ner_correct = []
@@ -21,7 +21,7 @@ from ..utils import get_google_api_key
 from ..translations import get_translation
 from ..models import get_gemini_model
 from ._common import _lang_reply_instruction
-from ..db import load_text_data, get_project_file, load_nlp_dataframe
+from ..db import load_text_data, get_project_file, load_nlp_dataframe, nlp_records
 
 
 def generate_qualitative_ner_analysis(project_name, wrong_text, corrected_text, language='en', lang='en'):
@@ -112,8 +112,8 @@ def generate_ner_analysis(project_name, pair_id, lang='en'):
     except Exception:
         language = 'en'
 
-    cond = f"pair_id = {int(pair_id)}"
-    entities_df = load_nlp_dataframe(project_name, 'entities', current_app.config['DATABASE_PATH'], condition=cond)
+    pair_filter = {'pair_id': int(pair_id)}
+    entities_df = load_nlp_dataframe(project_name, 'entities', current_app.config['DATABASE_PATH'], filters=pair_filter)
 
     try:
         e_wrong = entities_df[entities_df['text_type'] == 'error_text'] if entities_df is not None and not entities_df.empty else entities_df
@@ -126,8 +126,8 @@ def generate_ner_analysis(project_name, pair_id, lang='en'):
 
     return {
         'ner_analysis': {
-            'wrong': e_wrong.to_dict(orient='records') if (e_wrong is not None and not e_wrong.empty) else [],
-            'correct': e_corr.to_dict(orient='records') if (e_corr is not None and not e_corr.empty) else [],
+            'wrong': nlp_records(e_wrong),
+            'correct': nlp_records(e_corr),
             'qualitative_analysis': qualitative_ner,
         }
     }
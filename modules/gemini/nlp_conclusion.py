@@ -46,9 +46,9 @@ def generate_nlp_conclusion(project_name, pair_id, lang='en'):
     except Exception:
         wrong_text, corrected_text = '', ''
 
-    cond = f"pair_id = {int(pair_id)}"
-    tokens_df = load_nlp_dataframe(project_name, 'tokens', current_app.config['DATABASE_PATH'], condition=cond)
-    entities_df = load_nlp_dataframe(project_name, 'entities', current_app.config['DATABASE_PATH'], condition=cond)
+    pair_filter = {'pair_id': int(pair_id)}
+    tokens_df = load_nlp_dataframe(project_name, 'tokens', current_app.config['DATABASE_PATH'], filters=pair_filter)
+    entities_df = load_nlp_dataframe(project_name, 'entities', current_app.config['DATABASE_PATH'], filters=pair_filter)
     try:
         tokens_wrong = tokens_df[tokens_df['text_type'] == 'error_text'] if not tokens_df.empty else tokens_df
         tokens_correct = tokens_df[tokens_df['text_type'] == 'corrected_text'] if not tokens_df.empty else tokens_df
@@ -19,6 +19,7 @@ import pandas as pd
 from flask import current_app, g
 from .db import load_json_data, save_google_nlp_to_database, load_csv_data, get_project_file, load_text_data, update_nlp_state, update_genre_state, save_genre_and_main_idea
 from .gemini import get_genre_and_main_idea
+from .nlp_labels import translate_labels
 from google.cloud import language_v1
 
 
@@ -44,47 +45,6 @@ entities_type = ["N/A", "PERSON", "LOCATION", "ORGANIZATION", "EVENT", "WORK_OF_
 mentions_type = ["N/A", "PROPER", "COMMON"]
 '''
 
-def translate_labels(language):
-    translations = {
-        'en': {
-            'parts_of_speech': ['N/A', 'ADJ', 'ADP', 'ADV', 'CONJ', 'DET', 'NOUN', 'NUM', 'PRON', 'PRT', 'PUNCT', 'VERB', 'X', 'AFFIX'],
-            'numbers': ['N/A', 'SINGULAR', 'PLURAL', 'DUAL'],
-            'propers': ['N/A', 'PROPER', 'NOT_PROPER'],
-            'aspects': ['N/A', 'PERFECTIVE', 'IMPERFECTIVE', 'PROGRESSIVE'],
-            'cases': ['N/A', 'ACCUSATIVE', 'ADVERBIAL', 'COMPLEMENTIVE', 'DATIVE', 'GENITIVE', 'INSTRUMENTAL', 'LOCATIVE', 'NOMINATIVE', 'OBLIQUE', 'PARTITIVE', 'PREPOSITIONAL', 'REFLEXIVE_CASE', 'RELATIVE_CASE', 'VOCATIVE'],
-            'forms': ['N/A', 'ADNOMIAL', 'AUXILIARY', 'COMPLEMENTIZER', 'FINAL_ENDING', 'GERUND', 'REALIS', 'IRREALIS', 'SHORT', 'LONG', 'ORDER', 'SPECIFIC'],
-            'genders': ['N/A', 'FEMININE', 'MASCULINE', 'NEUTER'],
-            'moods': ['N/A', 'CONDITIONAL_MOOD', 'IMPERATIVE', 'INDICATIVE', 'INTERROGATIVE', 'JUSSIVE', 'SUBJUNCTIVE'],
-            'persons': ['N/A', 'FIRST', 'SECOND', 'THIRD', 'REFLEXIVE_PERSON'],
-            'reciprocities': ['N/A', 'RECIPROCAL', 'NON_RECIPROCAL'],
-            'tenses': ['N/A', 'CONDITIONAL_TENSE', 'FUTURE', 'PAST', 'PRESENT', 'IMPERFECT', 'PLUPERFECT'],
-            'voices': ['N/A', 'ACTIVE', 'CAUSATIVE', 'PASSIVE'],
-            'dependency_edges': ['N/A', 'ABBREV', 'ACOMP', 'ADVCL', 'ADVMOD', 'AMOD', 'APPOS', 'ATTR', 'AUX', 'AUXPASS', 'CC', 'CCOMP', 'CONJ', 'CSUBJ', 'CSUBJPASS', 'DEP', 'DET', 'DISCOURSE', 'DOBJ', 'EXPL', 'GOESWITH', 'IOBJ', 'MARK', 'MWE', 'MWV', 'NEG', 'NN', 'NPADVMOD', 'NSUBJ', 'NSUBJPASS', 'NUM', 'NUMBER', 'P', 'PARATAXIS', 'PARTMOD', 'PCOMP', 'POBJ', 'POSS', 'POSTNEG', 'PRECOMP', 'PRECONJ', 'PREDET', 'PREF', 'PREP', 'PRONL', 'PRT', 'PS', 'QUANTMOD', 'RCMOD', 'RCMODREL', 'RDROP', 'REF', 'REMNANT', 'REPARANDUM', 'ROOT', 'SNUM', 'SUFF', 'TMOD', 'TOPIC', 'VMOD', 'VOCATIVE', 'XCOMP', 'SUFFIX', 'TITLE', 'ADVPHMOD', 'AUXCAUS', 'AUXVV', 'DTMOD', 'FOREIGN', 'KW', 'LIST', 'NOMC', 'NOMCSUBJ', 'NOMCSUBJPASS', 'NUMC', 'COP', 'DISLOCATED', 'ASP', 'GMOD', 'GOBJ', 'INFMOD', 'MES', 'NCOMP'],
-            'entities_type': ["N/A", "PERSON", "LOCATION", "ORGANIZATION", "EVENT", "WORK_OF_ART", "CONSUMER_GOOD", "OTHER", "PHONE_NUMBER", "ADDRESS", "DATE", "NUMBER", "PRICE"],
-            'mentions_type': ["N/A", "PROPER", "COMMON"]
-        },
-        'fr': {
-            'parts_of_speech': ['N/A', 'ADJ', 'ADP', 'ADV', 'CONJ', 'DET', 'NOUN', 'NUM', 'PRON', 'PRT', 'PUNCT', 'VERB', 'X', 'AFFIX'],
-            'numbers': ['N/A', 'SINGULIER', 'PLURIEL', 'DUAL'],
-            'propers': ['N/A', 'PROPRE', 'PAS_PROPRE'],
-            'aspects': ['N/A', 'PERFECTIF', 'IMPARFAIT', 'PROGRESSIF'],
-            'cases': ['N/A', 'ACCUSATIF', 'ADVERBIAL', 'COMPLÉMENT', 'DATIF', 'GÉNITIF', 'INSTRUMENTAL', 'LOCATIF', 'NOMINATIF', 'OBLIQUE', 'PARTITIF', 'PRÉPOSITIONNEL', 'CAS_RÉFLÉCHI', 'CAS_RELATIF', 'VOCATIF'],
-            'forms': ['N/A', 'ADNOMIAL', 'AUXILIAIRE', 'COMPLÉMENTISATEUR', 'FINAL_ENDING', 'GÉRONDIF', 'RÉEL', 'IRRÉEL', 'COURT', 'LONG', 'ORDRE', 'SPÉCIFIQUE'],
-            'genders': ['N/A', 'FÉMININ', 'MASCULIN', 'NEUTRE'],
-            'moods': ['N/A', 'CONDITIONNEL', 'IMPERATIF', 'INDICATIF', 'INTERROGATIF', 'JUSSIF', 'SUBJONCTIF'],
-            'persons': ['N/A', 'PREMIÈRE', 'DEUXIÈME', 'TROISIÈME', 'PERSONNE_RÉFLÉCHIE'],
-            'reciprocities': ['N/A', 'RÉCIPROQUE', 'NON_RÉCIPROQUE'],
-            'tenses': ['N/A', 'CONDITIONNEL', 'FUTUR', 'PASSÉ', 'PRÉSENT', 'IMPARFAIT', 'PLUS-QUE-PARFAIT'],
-            'voices': ['N/A', 'ACTIF', 'CAUSATIF', 'PASSIF'],
-            'dependency_edges': ['N/A', 'ABBRÉV', 'ACOMP', 'ADVCL', 'ADVMOD', 'AMOD', 'APPOS', 'ATTR', 'AUX', 'AUXPASS', 'CC', 'CCOMP', 'CONJ', 'CSUBJ', 'CSUBJPASS', 'DEP', 'DET', 'DISCOURS', 'DOBJ', 'EXPL', 'GOESWITH', 'IOBJ', 'MARK', 'MWE', 'MWV', 'NEG', 'NN', 'NPADVMOD', 'NSUBJ', 'NSUBJPASS', 'NUM', 'NUMBER', 'P', 'PARATAXIS', 'PARTMOD', 'PCOMP', 'POBJ', 'POSS', 'POSTNEG', 'PRECOMP', 'PRECONJ', 'PREDET', 'PREF', 'PREP', 'PRONL', 'PRT', 'PS', 'QUANTMOD', 'RCMOD', 'RCMODREL', 'RDROP', 'REF', 'REMNANT', 'REPARANDUM', 'ROOT', 'SNUM', 'SUFF', 'TMOD', 'TOPIC', 'VMOD', 'VOCATIF', 'XCOMP', 'SUFFIXE', 'TITRE', 'ADVPHMOD', 'AUXCAUS', 'AUXVV', 'DTMOD', 'ÉTRANGER', 'KW', 'LISTE', 'NOMC', 'NOMCSUBJ', 'NOMCSUBJPASS', 'NUMC', 'COP', 'DISLOQUÉ', 'ASP', 'GMOD', 'GOBJ', 'INFMOD', 'MES', 'NCOMP'],
-            'entities_type': ["N/A", "PERSONNE", "EMPLACEMENT", "ORGANISATION", "ÉVÉNEMENT", "ŒUVRE_D'ART", "BIEN_DE_CONSOMMATION", "AUTRE", "NUMÉRO_DE_TÉLÉPHONE", "ADRESSE", "DATE", "NUMÉRO", "PRIX"],
-            'mentions_type': ["N/A", "PROPRE", "COMMUN"]
-        },
-    }
-
-    return translations.get(language, translations['en'])
-
-
 
 # PARTS OF SPEECH TRANSLATIONS
 '''
@@ -0,0 +1,206 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+Background SQLite maintenance for project databases.
+
+A daemon thread wakes up every MAINTENANCE_INTERVAL_SECONDS and maintains the database
+files this process has used since their last maintenance, once they have been idle
+(no connection checked out) for MAINTENANCE_IDLE_SECONDS. A connection checked out for
+longer than MAINTENANCE_STALE_LEASE_SECONDS is taken as leaked rather than as activity,
+so one connection that is never handed back does not stop maintenance of its file:
+
+- ANALYZE when the file has no statistics yet, PRAGMA optimize otherwise;
+- an incremental vacuum when free pages pass VACUUM_MIN_FREE_PAGES and VACUUM_FREE_RATIO
+  of the file (files created before auto_vacuum was enabled get one full VACUUM instead);
+- a WAL checkpoint when the WAL grows past WAL_CHECKPOINT_BYTES.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+from . import db
+
+MAINTENANCE_INTERVAL_SECONDS = 600
+MAINTENANCE_IDLE_SECONDS = 60
+MAINTENANCE_STALE_LEASE_SECONDS = 3600
+VACUUM_MIN_FREE_PAGES = 1024
+VACUUM_FREE_RATIO = 0.10
+WAL_CHECKPOINT_BYTES = 16 * 1024 * 1024
+
+_AUTO_VACUUM_INCREMENTAL = 2
+
+_scheduler_lock = threading.Lock()
+_scheduler = None
+_stop_event = threading.Event()
+# db_file -> time.monotonic() of its last maintenance in this process
+_maintained_at = {}
+
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def maintain_db(db_file, force=False):
+    """
+    Run the maintenance operations a database file is due for (all of them with force=True).
+    Returns what was done, file sizes (database + WAL) and the duration; None if the file is gone.
+    """
+    db_file = os.path.abspath(db_file)
+    start = time.perf_counter()
+    with db.file_lock(db_file):
+        if not os.path.exists(db_file):
+            return None
+        size_before = _file_size(db_file) + _file_size(db_file + '-wal')
+        conn = db.open_private_connection(db_file)
+        actions = []
+        try:
+            c = conn.cursor()
+            page_count = c.execute('PRAGMA page_count').fetchone()[0]
+            free_pages = c.execute('PRAGMA freelist_count').fetchone()[0]
+            auto_vacuum = c.execute('PRAGMA auto_vacuum').fetchone()[0]
+            has_stats = c.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'").fetchone()
+
+            if force or not has_stats:
+                c.execute('ANALYZE')
+                actions.append('analyze')
+            else:
+                c.execute('PRAGMA optimize')
+                actions.append('optimize')
+
+            if free_pages and (force or (free_pages >= VACUUM_MIN_FREE_PAGES
+                                         and free_pages >= VACUUM_FREE_RATIO * page_count)):
+                if auto_vacuum == _AUTO_VACUUM_INCREMENTAL:
+                    # executescript steps the pragma to completion (execute frees one page)
+                    c.executescript('PRAGMA incremental_vacuum;')
+                    actions.append(f'incremental_vacuum({free_pages} pages)')
+                else:
+                    c.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                    c.execute('VACUUM')
+                    actions.append('vacuum')
+
+            if force or 'vacuum' in actions or _file_size(db_file + '-wal') >= WAL_CHECKPOINT_BYTES:
+                busy, _, _ = c.execute('PRAGMA wal_checkpoint(TRUNCATE)').fetchone()
+                actions.append('checkpoint' if not busy else 'checkpoint(busy)')
+        finally:
+            conn.close()
+        size_after = _file_size(db_file) + _file_size(db_file + '-wal')
+
+    duration = time.perf_counter() - start
+    name = os.path.splitext(os.path.basename(db_file))[0]
+    print(f"[INFO] Maintenance {name}: {', '.join(actions)}; "
+          f"{size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB in {duration:.2f}s")
+    return {
+        'database': name,
+        'actions': actions,
+        'size_before': size_before,
+        'size_after': size_after,
+        'duration': round(duration, 3),
+    }
+
+
+def due_databases(db_path):
+    """
+    Database files under db_path used since their last maintenance and idle since.
+    """
+    db_path = os.path.abspath(db_path)
+    now = time.monotonic()
+    due = []
+    for db_file, (last_used, checked_out, newest_lease) in db.db_activity().items():
+        if os.path.dirname(db_file) != db_path:
+            continue
+        if checked_out and (newest_lease is None or now - newest_lease < MAINTENANCE_STALE_LEASE_SECONDS):
+            continue
+        if now - last_used < MAINTENANCE_IDLE_SECONDS:
+            continue
+        if last_used <= _maintained_at.get(db_file, float('-inf')):
+            continue
+        due.append(db_file)
+    return sorted(due)
+
+
+def run_maintenance(db_path, project_names=None, force=False):
+    """
+    Maintain the given projects' databases, or every due database when project_names is None.
+    Returns the maintain_db results of the files that still exist.
+    """
+    if project_names is None:
+        db_files = due_databases(db_path)
+    else:
+        db_files = [os.path.abspath(os.path.join(db_path, f'{name}.db')) for name in project_names]
+    results = []
+    for db_file in db_files:
+        try:
+            result = maintain_db(db_file, force=force)
+        except sqlite3.Error as e:
+            print(f"[WARN] Maintenance of {os.path.basename(db_file)} failed: {e}")
+            continue
+        finally:
+            # Our own connection does not go through the pool, so this marks the file done
+            _maintained_at[db_file] = time.monotonic()
+        if result:
+            results.append(result)
+    return results
+
+
+def _maintenance_loop(db_path, interval):
+    while not _stop_event.wait(interval):
+        try:
+            run_maintenance(db_path)
+        except Exception as e:
+            print(f"[WARN] Background maintenance pass failed: {e}")
+
+
+def start_maintenance_scheduler(db_path, interval=MAINTENANCE_INTERVAL_SECONDS):
+    """
+    Start the background maintenance thread of this process (once).
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None and _scheduler.is_alive():
+            return _scheduler
+        _stop_event.clear()
+        _scheduler = threading.Thread(target=_maintenance_loop, args=(db_path, interval),
+                                      name='db-maintenance', daemon=True)
+        _scheduler.start()
+        print(f"[INFO] Database maintenance every {interval}s for {db_path}")
+        return _scheduler
+
+
+def stop_maintenance_scheduler():
+    """
+    Stop the background maintenance thread (it finishes the database it is working on).
+    """
+    global _scheduler
+    with _scheduler_lock:
+        _stop_event.set()
+        _scheduler = None
+
+
+def _reset_scheduler_after_fork():
+    global _scheduler, _scheduler_lock, _stop_event
+    # The scheduler thread does not survive fork(); a child starts its own if it needs one
+    _scheduler = None
+    _scheduler_lock = threading.Lock()
+    _stop_event = threading.Event()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_scheduler_after_fork)
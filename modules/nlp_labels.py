@@ -0,0 +1,125 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+
+"""
+Labels for the Google NLP enum codes stored in the tokens and entities tables.
+
+Only the integer codes are needed to reproduce a label: the tables below turn a code
+into the label of a given project language, so labels can be resolved when rows are
+read instead of being stored with every token.
+"""
+
+from functools import lru_cache
+
+FALLBACK_LABEL = 'N/A'
+
+# Label lists per language, indexed by the API enum value
+NLP_LABELS = {
+    'en': {
+        'parts_of_speech': ['N/A', 'ADJ', 'ADP', 'ADV', 'CONJ', 'DET', 'NOUN', 'NUM', 'PRON', 'PRT', 'PUNCT', 'VERB', 'X', 'AFFIX'],
+        'numbers': ['N/A', 'SINGULAR', 'PLURAL', 'DUAL'],
+        'propers': ['N/A', 'PROPER', 'NOT_PROPER'],
+        'aspects': ['N/A', 'PERFECTIVE', 'IMPERFECTIVE', 'PROGRESSIVE'],
+        'cases': ['N/A', 'ACCUSATIVE', 'ADVERBIAL', 'COMPLEMENTIVE', 'DATIVE', 'GENITIVE', 'INSTRUMENTAL', 'LOCATIVE', 'NOMINATIVE', 'OBLIQUE', 'PARTITIVE', 'PREPOSITIONAL', 'REFLEXIVE_CASE', 'RELATIVE_CASE', 'VOCATIVE'],
+        'forms': ['N/A', 'ADNOMIAL', 'AUXILIARY', 'COMPLEMENTIZER', 'FINAL_ENDING', 'GERUND', 'REALIS', 'IRREALIS', 'SHORT', 'LONG', 'ORDER', 'SPECIFIC'],
+        'genders': ['N/A', 'FEMININE', 'MASCULINE', 'NEUTER'],
+        'moods': ['N/A', 'CONDITIONAL_MOOD', 'IMPERATIVE', 'INDICATIVE', 'INTERROGATIVE', 'JUSSIVE', 'SUBJUNCTIVE'],
+        'persons': ['N/A', 'FIRST', 'SECOND', 'THIRD', 'REFLEXIVE_PERSON'],
+        'reciprocities': ['N/A', 'RECIPROCAL', 'NON_RECIPROCAL'],
+        'tenses': ['N/A', 'CONDITIONAL_TENSE', 'FUTURE', 'PAST', 'PRESENT', 'IMPERFECT', 'PLUPERFECT'],
+        'voices': ['N/A', 'ACTIVE', 'CAUSATIVE', 'PASSIVE'],
+        'dependency_edges': ['N/A', 'ABBREV', 'ACOMP', 'ADVCL', 'ADVMOD', 'AMOD', 'APPOS', 'ATTR', 'AUX', 'AUXPASS', 'CC', 'CCOMP', 'CONJ', 'CSUBJ', 'CSUBJPASS', 'DEP', 'DET', 'DISCOURSE', 'DOBJ', 'EXPL', 'GOESWITH', 'IOBJ', 'MARK', 'MWE', 'MWV', 'NEG', 'NN', 'NPADVMOD', 'NSUBJ', 'NSUBJPASS', 'NUM', 'NUMBER', 'P', 'PARATAXIS', 'PARTMOD', 'PCOMP', 'POBJ', 'POSS', 'POSTNEG', 'PRECOMP', 'PRECONJ', 'PREDET', 'PREF', 'PREP', 'PRONL', 'PRT', 'PS', 'QUANTMOD', 'RCMOD', 'RCMODREL', 'RDROP', 'REF', 'REMNANT', 'REPARANDUM', 'ROOT', 'SNUM', 'SUFF', 'TMOD', 'TOPIC', 'VMOD', 'VOCATIVE', 'XCOMP', 'SUFFIX', 'TITLE', 'ADVPHMOD', 'AUXCAUS', 'AUXVV', 'DTMOD', 'FOREIGN', 'KW', 'LIST', 'NOMC', 'NOMCSUBJ', 'NOMCSUBJPASS', 'NUMC', 'COP', 'DISLOCATED', 'ASP', 'GMOD', 'GOBJ', 'INFMOD', 'MES', 'NCOMP'],
+        'entities_type': ["N/A", "PERSON", "LOCATION", "ORGANIZATION", "EVENT", "WORK_OF_ART", "CONSUMER_GOOD", "OTHER", "PHONE_NUMBER", "ADDRESS", "DATE", "NUMBER", "PRICE"],
+        'mentions_type': ["N/A", "PROPER", "COMMON"]
+    },
+    'fr': {
+        'parts_of_speech': ['N/A', 'ADJ', 'ADP', 'ADV', 'CONJ', 'DET', 'NOUN', 'NUM', 'PRON', 'PRT', 'PUNCT', 'VERB', 'X', 'AFFIX'],
+        'numbers': ['N/A', 'SINGULIER', 'PLURIEL', 'DUAL'],
+        'propers': ['N/A', 'PROPRE', 'PAS_PROPRE'],
+        'aspects': ['N/A', 'PERFECTIF', 'IMPARFAIT', 'PROGRESSIF'],
+        'cases': ['N/A', 'ACCUSATIF', 'ADVERBIAL', 'COMPLÉMENT', 'DATIF', 'GÉNITIF', 'INSTRUMENTAL', 'LOCATIF', 'NOMINATIF', 'OBLIQUE', 'PARTITIF', 'PRÉPOSITIONNEL', 'CAS_RÉFLÉCHI', 'CAS_RELATIF', 'VOCATIF'],
+        'forms': ['N/A', 'ADNOMIAL', 'AUXILIAIRE', 'COMPLÉMENTISATEUR', 'FINAL_ENDING', 'GÉRONDIF', 'RÉEL', 'IRRÉEL', 'COURT', 'LONG', 'ORDRE', 'SPÉCIFIQUE'],
+        'genders': ['N/A', 'FÉMININ', 'MASCULIN', 'NEUTRE'],
+        'moods': ['N/A', 'CONDITIONNEL', 'IMPERATIF', 'INDICATIF', 'INTERROGATIF', 'JUSSIF', 'SUBJONCTIF'],
+        'persons': ['N/A', 'PREMIÈRE', 'DEUXIÈME', 'TROISIÈME', 'PERSONNE_RÉFLÉCHIE'],
+        'reciprocities': ['N/A', 'RÉCIPROQUE', 'NON_RÉCIPROQUE'],
+        'tenses': ['N/A', 'CONDITIONNEL', 'FUTUR', 'PASSÉ', 'PRÉSENT', 'IMPARFAIT', 'PLUS-QUE-PARFAIT'],
+        'voices': ['N/A', 'ACTIF', 'CAUSATIF', 'PASSIF'],
+        'dependency_edges': ['N/A', 'ABBRÉV', 'ACOMP', 'ADVCL', 'ADVMOD', 'AMOD', 'APPOS', 'ATTR', 'AUX', 'AUXPASS', 'CC', 'CCOMP', 'CONJ', 'CSUBJ', 'CSUBJPASS', 'DEP', 'DET', 'DISCOURS', 'DOBJ', 'EXPL', 'GOESWITH', 'IOBJ', 'MARK', 'MWE', 'MWV', 'NEG', 'NN', 'NPADVMOD', 'NSUBJ', 'NSUBJPASS', 'NUM', 'NUMBER', 'P', 'PARATAXIS', 'PARTMOD', 'PCOMP', 'POBJ', 'POSS', 'POSTNEG', 'PRECOMP', 'PRECONJ', 'PREDET', 'PREF', 'PREP', 'PRONL', 'PRT', 'PS', 'QUANTMOD', 'RCMOD', 'RCMODREL', 'RDROP', 'REF', 'REMNANT', 'REPARANDUM', 'ROOT', 'SNUM', 'SUFF', 'TMOD', 'TOPIC', 'VMOD', 'VOCATIF', 'XCOMP', 'SUFFIXE', 'TITRE', 'ADVPHMOD', 'AUXCAUS', 'AUXVV', 'DTMOD', 'ÉTRANGER', 'KW', 'LISTE', 'NOMC', 'NOMCSUBJ', 'NOMCSUBJPASS', 'NUMC', 'COP', 'DISLOQUÉ', 'ASP', 'GMOD', 'GOBJ', 'INFMOD', 'MES', 'NCOMP'],
+        'entities_type': ["N/A", "PERSONNE", "EMPLACEMENT", "ORGANISATION", "ÉVÉNEMENT", "ŒUVRE_D'ART", "BIEN_DE_CONSOMMATION", "AUTRE", "NUMÉRO_DE_TÉLÉPHONE", "ADRESSE", "DATE", "NUMÉRO", "PRIX"],
+        'mentions_type': ["N/A", "PROPRE", "COMMUN"]
+    },
+}
+
+# NLP table -> label column -> (code column, label list)
+LABEL_COLUMNS = {
+    'tokens': {
+        'tag': ('tag_code', 'parts_of_speech'),
+        'number': ('number_code', 'numbers'),
+        'proper': ('proper_code', 'propers'),
+        'aspect': ('aspect_code', 'aspects'),
+        'case': ('case_code', 'cases'),
+        'form': ('form_code', 'forms'),
+        'gender': ('gender_code', 'genders'),
+        'mood': ('mood_code', 'moods'),
+        'person': ('person_code', 'persons'),
+        'reciprocity': ('reciprocity_code', 'reciprocities'),
+        'tense': ('tense_code', 'tenses'),
+        'voice': ('voice_code', 'voices'),
+        'label': ('dep_label_code', 'dependency_edges'),
+    },
+    'entities': {
+        'type': ('entity_type_code', 'entities_type'),
+        'common_or_proper': ('mention_type_code', 'mentions_type'),
+    },
+}
+
+
+def translate_labels(language):
+    """
+    Label lists for a language (English when the language has no translation).
+    """
+    return NLP_LABELS.get(language, NLP_LABELS['en'])
+
+
+@lru_cache(maxsize=None)
+def label_map(language, list_name):
+    """
+    code -> label for one label list of a language.
+    """
+    return dict(enumerate(translate_labels(language)[list_name]))
+
+
+@lru_cache(maxsize=None)
+def code_map(list_name, language=None):
+    """
+    label -> code for one label list; with language=None, labels of every language.
+    """
+    languages = [language] if language else ['en'] + [lang for lang in NLP_LABELS if lang != 'en']
+    codes = {}
+    for lang in languages:
+        for code, label in enumerate(translate_labels(lang)[list_name]):
+            codes.setdefault(label, code)
+    return codes
+
+
+def resolve_label(language, list_name, code, stored=None):
+    """
+    Label of an enum code in the given language; the stored label when there is no code.
+    """
+    if code is None or code != code:
+        return stored
+    return label_map(language, list_name).get(int(code), FALLBACK_LABEL)
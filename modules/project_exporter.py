@@ -15,6 +15,7 @@
 
 import os
 import zipfile
+from modules.db import checkpoint_db
 
 def export_project_to_zip(project_name, db_path, output_folder):
     project_db_file = f"{project_name}.db"
@@ -23,6 +24,9 @@ def export_project_to_zip(project_name, db_path, output_folder):
     if not os.path.exists(project_db_path):
         raise Exception("Project database not found.")
 
+    # The project DB runs in WAL mode; fold pending pages into the .db file first
+    checkpoint_db(project_db_path)
+
     zip_file_name = f"{project_name}.zip"
     zip_path = os.path.join(output_folder, zip_file_name)
 
@@ -16,7 +16,7 @@
 import zipfile
 import os
 import sqlite3
-from modules.db import create_project_db, get_project_details
+from modules.db import create_project_db, get_project_details, db_transaction, migrate_project_db, close_connections, is_derived_table
 
 def import_project_from_zip(zip_path, new_project_name, db_path, owner_id):
     extract_path = os.path.join(os.path.dirname(zip_path), new_project_name)
@@ -53,6 +53,14 @@ def import_project_from_zip(zip_path, new_project_name, db_path, owner_id):
     else:
         _, description, language = project_details
 
+    # Bring the exported DB to the current schema so its tables line up with the new project's
+    try:
+        migrate_project_db(old_project_name, extract_path)
+    except sqlite3.Error as e:
+        print(f"[WARN] Could not migrate imported database {db_files[0]}: {e}")
+    finally:
+        close_connections(old_db_path)
+
     # Create a new project
     create_project_db(new_project_name, description, language, db_path, owner_id)
 
@@ -60,40 +68,40 @@ def import_project_from_zip(zip_path, new_project_name, db_path, owner_id):
     new_db_path = os.path.join(db_path, f"{new_project_name}.db")
     
     old_conn = sqlite3.connect(old_db_path)
-    new_conn = sqlite3.connect(new_db_path)
-    
-    old_cursor = old_conn.cursor()
-    new_cursor = new_conn.cursor()
+    try:
+        with db_transaction(new_db_path) as new_conn:
+            old_cursor = old_conn.cursor()
+            new_cursor = new_conn.cursor()
     
-    # Get all tables from the old database
-    old_cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    tables = old_cursor.fetchall()
+            # Get all tables from the old database
+            old_cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+            tables = old_cursor.fetchall()
     
-    for table_name in tables:
-        table_name = table_name[0]
-        if table_name == 'sqlite_sequence':
-            continue
+            for table_name in tables:
+                table_name = table_name[0]
+                # Internal and derived tables; search index and counters are rebuilt by the new DB's triggers
+                if table_name.startswith('sqlite_') or table_name == 'project_meta' or is_derived_table(table_name):
+                    continue
             
-        old_cursor.execute(f"SELECT * FROM {table_name}")
-        rows = old_cursor.fetchall()
+                # Only copy stored columns; generated columns are recomputed by the new DB
+                old_cursor.execute(f"PRAGMA table_xinfo({table_name})")
+                column_names = [row[1] for row in old_cursor.fetchall() if row[6] == 0]
+                quoted_cols = ','.join(f'"{col}"' for col in column_names)
+                old_cursor.execute(f"SELECT {quoted_cols} FROM {table_name}")
+                rows = old_cursor.fetchall()
         
-        if rows:
-            # Get column names
-            column_names = [description[0] for description in old_cursor.description]
-            placeholders = ','.join(['?'] * len(column_names))
+                if rows:
+                    placeholders = ','.join(['?'] * len(column_names))
             
-            # Check if table exists in new db and has same columns
-            new_cursor.execute(f"PRAGMA table_info({table_name})")
-            new_table_cols = [row[1] for row in new_cursor.fetchall()]
+                    # Check if table exists in new db and has same columns
+                    new_cursor.execute(f"PRAGMA table_xinfo({table_name})")
+                    new_table_cols = [row[1] for row in new_cursor.fetchall() if row[6] == 0]
 
-            if set(column_names).issubset(set(new_table_cols)):
-                query = f"INSERT INTO {table_name} ({','.join(column_names)}) VALUES ({placeholders})"
-                new_cursor.executemany(query, rows)
-
-    new_conn.commit()
-    
-    old_conn.close()
-    new_conn.close()
+                    if set(column_names).issubset(set(new_table_cols)):
+                        query = f"INSERT INTO {table_name} ({quoted_cols}) VALUES ({placeholders})"
+                        new_cursor.executemany(query, rows)
+    finally:
+        old_conn.close()
     
     # Clean up extracted files
     for root, dirs, files in os.walk(extract_path, topdown=False):
@@ -0,0 +1,95 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+Process-wide registry of spaCy pipelines, one per project language.
+
+The diff view only needs token boundaries, so models are loaded with every trained
+component excluded (just the language's tokenizer remains), once per process and on
+first use. When a model package is not installed the blank pipeline of the language is
+used instead; its tokenizer follows the same language rules.
+"""
+
+import os
+import threading
+
+import spacy
+
+SPACY_MODELS = {
+    'fr': 'fr_core_news_sm',
+    'en': 'en_core_web_sm',
+}
+DEFAULT_LANGUAGE = 'en'
+# Trained components of the *_sm pipelines; none of them are needed to split tokens
+SPACY_EXCLUDED_PIPES = ['tok2vec', 'tagger', 'morphologizer', 'parser', 'senter', 'attribute_ruler',
+                        'lemmatizer', 'trainable_lemmatizer', 'ner']
+PIPE_BATCH_SIZE = 256
+
+_models_lock = threading.Lock()
+_models = {}
+
+
+def _reset_models_lock_after_fork():
+    global _models_lock
+    # Loaded pipelines stay usable in a forked child (e.g. a diff worker); only the lock
+    # may have been held by another thread of the parent at fork time
+    _models_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_models_lock_after_fork)
+
+
+def _load(language):
+    name = SPACY_MODELS.get(language)
+    if name:
+        try:
+            return spacy.load(name, exclude=SPACY_EXCLUDED_PIPES)
+        except OSError:
+            print(f"[WARN] spaCy model {name} is not installed; using the blank '{language}' tokenizer")
+    try:
+        return spacy.blank(language)
+    except (ImportError, KeyError, ValueError):
+        return spacy.blank(DEFAULT_LANGUAGE)
+
+
+def get_nlp(language):
+    """
+    The spaCy pipeline of a language, loaded on first use and shared by the whole process.
+    """
+    language = language or DEFAULT_LANGUAGE
+    nlp = _models.get(language)
+    if nlp is None:
+        with _models_lock:
+            nlp = _models.get(language)
+            if nlp is None:
+                nlp = _models[language] = _load(language)
+    return nlp
+
+
+def warm_up(languages=None):
+    """
+    Load the pipelines of the given languages (default: every configured one) ahead of use.
+    """
+    for language in languages or SPACY_MODELS:
+        get_nlp(language).make_doc('warm up')
+
+
+def tokenize_segments(language, texts):
+    """
+    Token texts of each of texts, tokenized in one nlp.pipe pass.
+    """
+    nlp = get_nlp(language)
+    return [[token.text for token in doc] for doc in nlp.pipe(texts, batch_size=PIPE_BATCH_SIZE)]
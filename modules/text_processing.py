@@ -19,6 +19,7 @@ connect text fragments by handling leading/trailing spaces and punctuation, and
 """
 
 import string
+from bisect import bisect_left
 
 def is_punctuation(char):
     """
@@ -61,6 +62,116 @@ def connect_text(text, previous_char, next_char):
     return text_stripped
 
 
+def _row_dict(row):
+    # Missing categorical labels come back as NaN; store them as null like before
+    return {k: (None if isinstance(v, float) and v != v else v) for k, v in row.to_dict().items()}
+
+
+# Rows within this many bytes of the position are used when no token text matches
+FALLBACK_DISTANCE = 5
+
+
+def _closest(positions, orders, position):
+    """
+    (distance, order) of the row closest to position in a (position, order)-sorted run, or None.
+    Ties go to the row that comes first in the DataFrame, like idxmin.
+    """
+    i = bisect_left(positions, position)
+    best = None
+    if i < len(positions):
+        # First row at the smallest position >= position has the lowest order at that position
+        best = (positions[i] - position, orders[i])
+    if i > 0:
+        left = bisect_left(positions, positions[i - 1])
+        candidate = (position - positions[left], orders[left])
+        if best is None or candidate < best:
+            best = candidate
+    return best
+
+
+class _TextTypeIndex:
+    """
+    Rows of one text_type, sorted by byte offset, overall and per lowercase token form.
+    """
+
+    def __init__(self, positions, orders, forms):
+        self.positions = positions
+        self.orders = orders
+        self.forms = forms
+        self._matching_forms = {}
+
+    def matching_forms(self, token_lower):
+        forms = self._matching_forms.get(token_lower)
+        if forms is None:
+            forms = self._matching_forms[token_lower] = [runs for form, runs in self.forms.items() if token_lower in form]
+        return forms
+
+
+class NlpIndex:
+    """
+    Offset index over a tokens or entities DataFrame answering find_token_in_csv lookups.
+
+    Each text_type is indexed on first use: rows sorted by position, and the same per distinct
+    lowercase token (or entity name) form. A lookup bisects the runs of the forms containing the
+    token, so it costs O(log n) per matching form instead of a scan of the whole frame.
+    """
+
+    def __init__(self, df):
+        if 'token' in df.columns:
+            self.column = 'token'
+        elif 'name' in df.columns:
+            self.column = 'name'
+        else:
+            raise ValueError("DataFrame does not have the expected columns ('token' or 'name').")
+        self.df = df
+        self._text_types = {}
+        self._rows = {}
+
+    def _build(self, text_type):
+        df = self.df
+        rows = df.index[(df['text_type'] == text_type) & df['position'].notna()]
+        positions = df['position'].reindex(rows)
+        sorted_rows = sorted(zip(positions.tolist(), df.index.get_indexer(rows).tolist(), df[self.column].reindex(rows).tolist()))
+        forms = {}
+        for position, order, value in sorted_rows:
+            if isinstance(value, str):
+                run = forms.setdefault(value.lower(), ([], []))
+                run[0].append(position)
+                run[1].append(order)
+        return _TextTypeIndex([row[0] for row in sorted_rows], [row[1] for row in sorted_rows], forms)
+
+    def _row(self, order, distance):
+        row = self._rows.get(order)
+        if row is None:
+            row = self._rows[order] = _row_dict(self.df.iloc[order])
+        return dict(row, distance=distance)
+
+    def find(self, tokens, position, text_type):
+        """
+        Closest row matching each token around position; see find_token_in_csv.
+        """
+        index = self._text_types.get(text_type)
+        if index is None:
+            index = self._text_types[text_type] = self._build(text_type)
+
+        results = []
+        for token in tokens:
+            if token.strip() == '':
+                continue
+            best = None
+            for positions, orders in index.matching_forms(token.lower()):
+                candidate = _closest(positions, orders, position)
+                if best is None or candidate < best:
+                    best = candidate
+            if best is None:
+                best = _closest(index.positions, index.orders, position)
+                if best is not None and best[0] > FALLBACK_DISTANCE:
+                    best = None
+            if best is not None:
+                results.append(self._row(best[1], best[0]))
+        return results
+
+
 def find_token_in_csv(tokens, position, text_type, df):
     """
     Find tokens in a DataFrame containing morphosyntactic details or entity details.
@@ -69,37 +180,13 @@ def find_token_in_csv(tokens, position, text_type, df):
         tokens (list): List of tokens to find.
         position (int): The position of the token in the text.
         text_type (str): The type of the text ('text1' or 'text2').
-        df (DataFrame): The DataFrame containing the CSV data.
+        df (DataFrame or NlpIndex): The DataFrame containing the CSV data, or an NlpIndex
+            built over it (reuse one index across calls on the same frame).
 
     Returns:
-        list: List of dictionaries containing the matched rows from the DataFrame.
+        list: For each token, the row whose token (or entity name) contains it and whose
+        position is closest, or failing that the closest row within FALLBACK_DISTANCE bytes;
+        with a 'distance' field.
     """
-    results = []
-
-    # Determine the DataFrame type based on the columns
-    if 'token' in df.columns:
-        column_to_search = 'token'
-    elif 'name' in df.columns:
-        column_to_search = 'name'
-    else:
-        raise ValueError("DataFrame does not have the expected columns ('token' or 'name').")
-
-    for token in tokens:
-        if token.strip() == '':
-            continue
-        token_lower = token.lower()
-        matched_rows = df[(df[column_to_search].str.lower().str.contains(token_lower, regex=False)) & (
-                    df['text_type'] == text_type)].copy()
-        if not matched_rows.empty:
-            matched_rows.loc[:, 'distance'] = (matched_rows['position'] - position).abs()
-            closest_row = matched_rows.loc[matched_rows['distance'].idxmin()]
-            results.append(closest_row.to_dict())
-        else:
-            mask = (df['position'] >= position - 5) & (df['position'] <= position + 5) & (df['text_type'] == text_type)
-            matched_rows = df[mask].copy()
-            if not matched_rows.empty:
-                matched_rows.loc[:, 'distance'] = (matched_rows['position'] - position).abs()
-                closest_row = matched_rows.loc[matched_rows['distance'].idxmin()]
-                results.append(closest_row.to_dict())
-
-    return results
\ No newline at end of file
+    index = df if isinstance(df, NlpIndex) else NlpIndex(df)
+    return index.find(tokens, position, text_type)
@@ -15,55 +15,136 @@
 
 import os
 import pandas as pd
-import sqlite3
 from flask import request, redirect, url_for, current_app, flash, g
 from werkzeug.utils import secure_filename
-from .db import save_csv_data_if_not_exists, update_project_file_name, get_project_file
-from .diff_handler import process_and_save_text_pairs
+from .db import save_csv_data_stream, update_project_file_name
+
+# Uploads are parsed straight from the request stream in chunks of this many rows, each
+# written in its own transaction, so memory use does not grow with the file size.
+UPLOAD_CHUNK_ROWS = 20000
+UPLOAD_COLUMNS = ('ErrorText', 'CorrectedText')
+UPLOAD_EXTENSIONS = ('.csv', '.parquet', '.xlsx')
+
+
+class UploadFormatError(ValueError):
+    pass
+
+
+def _check_columns(columns):
+    if not all(col in columns for col in UPLOAD_COLUMNS):
+        raise UploadFormatError('Missing ErrorText/CorrectedText columns')
+
+
+def _text(value):
+    # Both csv_data columns are NOT NULL: empty cells are stored as ''
+    return '' if value is None else str(value)
+
+
+def _frame_rows(df):
+    df = df.fillna('')
+    return list(zip(df['ErrorText'], df['CorrectedText']))
+
+
+def _csv_chunks(stream, encoding):
+    reader = pd.read_csv(stream, encoding=encoding, dtype=str, keep_default_na=False,
+                         chunksize=UPLOAD_CHUNK_ROWS)
+    with reader:
+        for i, chunk in enumerate(reader):
+            if i == 0:
+                _check_columns(chunk.columns)
+            yield _frame_rows(chunk[list(UPLOAD_COLUMNS)])
+
+
+def _parquet_chunks(stream):
+    import pyarrow.parquet as pq
+    parquet_file = pq.ParquetFile(stream)
+    _check_columns(parquet_file.schema_arrow.names)
+    for batch in parquet_file.iter_batches(batch_size=UPLOAD_CHUNK_ROWS, columns=list(UPLOAD_COLUMNS)):
+        columns = [batch.column(name).to_pylist() for name in UPLOAD_COLUMNS]
+        yield [(_text(e), _text(c)) for e, c in zip(*columns)]
+
+
+def _xlsx_chunks(stream):
+    from openpyxl import load_workbook
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell) if cell is not None else '' for cell in next(rows, ())]
+        _check_columns(header)
+        error_idx, corrected_idx = header.index('ErrorText'), header.index('CorrectedText')
+        chunk = []
+        for row in rows:
+            error_text = row[error_idx] if error_idx < len(row) else None
+            corrected_text = row[corrected_idx] if corrected_idx < len(row) else None
+            if error_text is None and corrected_text is None:
+                continue
+            chunk.append((_text(error_text), _text(corrected_text)))
+            if len(chunk) >= UPLOAD_CHUNK_ROWS:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        workbook.close()
+
+
+def iter_upload_chunks(stream, extension, encoding='utf-8'):
+    """
+    Yield lists of (error_text, corrected_text) tuples from a CSV, Parquet or XLSX stream.
+    Raises UploadFormatError when the required columns are missing.
+    """
+    if extension == '.csv':
+        return _csv_chunks(stream, encoding)
+    if extension == '.parquet':
+        return _parquet_chunks(stream)
+    if extension == '.xlsx':
+        return _xlsx_chunks(stream)
+    raise UploadFormatError(f'Unsupported file type {extension}')
+
+
+def ingest_upload(project_name, stream, extension, db_path):
+    """
+    Stream an uploaded file into csv_data. Returns the number of rows stored.
+    """
+    try:
+        return save_csv_data_stream(project_name, iter_upload_chunks(stream, extension), db_path)
+    except UnicodeDecodeError:
+        if extension != '.csv':
+            raise
+        # Not UTF-8: start over as latin1 (the partial import has been rolled back)
+        stream.seek(0)
+        return save_csv_data_stream(project_name, iter_upload_chunks(stream, extension, 'latin1'), db_path)
+
 
 def handle_upload():
     project_name = request.form['project_name']
     file = request.files['csvFile']
+    extension = os.path.splitext(file.filename)[1].lower() if file and file.filename else ''
 
-    if file and file.filename.endswith('.csv'):
+    if file and extension in UPLOAD_EXTENSIONS:
         try:
-            # Attempt to read the CSV file with UTF-8 encoding
-            # Save the uploaded file temporarily
-            temp_filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], "temp_" + secure_filename(file.filename))
-            file.save(temp_filepath)
-
-            # Read the CSV file from the temporary path
-            try:
-                df = pd.read_csv(temp_filepath, encoding='utf-8')
-            except UnicodeDecodeError:
-                df = pd.read_csv(temp_filepath, encoding='latin1')
-
-            if df.empty:
+            # Werkzeug already spooled the upload; parse it from there without another copy
+            inserted = ingest_upload(project_name, file.stream, extension, current_app.config['DATABASE_PATH'])
+
+            if inserted == 0:
                 flash('The uploaded CSV file is empty. Please upload a valid CSV file.', 'error')
                 return redirect(url_for('upload_csv', project_name=project_name))
 
-            if 'ErrorText' in df.columns and 'CorrectedText' in df.columns:
-                # Use the temporary filepath for further processing
-                filepath = temp_filepath
-
-                csv_data = df.to_dict(orient='records')
-                save_csv_data_if_not_exists(project_name, csv_data, current_app.config['DATABASE_PATH'])
-                owner_id = g.current_user['id'] if getattr(g, 'current_user', None) else None
-                update_project_file_name(project_name, secure_filename(file.filename), current_app.config['DATABASE_PATH'], owner_id=owner_id)
-                os.remove(temp_filepath) # Clean up the temporary file
+            owner_id = g.current_user['id'] if getattr(g, 'current_user', None) else None
+            update_project_file_name(project_name, secure_filename(file.filename), current_app.config['DATABASE_PATH'], owner_id=owner_id)
 
-                flash('File uploaded and processed successfully!', 'success')
-                return redirect(url_for('projects.project', project_name=project_name))
-
-            else:
-                flash('Invalid CSV format. The file must contain ErrorText and CorrectedText columns. Download a sample CSV file <a href="/download_sample">here</a>.', 'error')
-                return redirect(url_for('upload_csv', project_name=project_name))
+            flash('File uploaded and processed successfully!', 'success')
+            return redirect(url_for('projects.project', project_name=project_name))
+        except UploadFormatError:
+            flash('Invalid CSV format. The file must contain ErrorText and CorrectedText columns. Download a sample CSV file <a href="/download_sample">here</a>.', 'error')
+            return redirect(url_for('upload_csv', project_name=project_name))
         except pd.errors.EmptyDataError:
             flash('The uploaded CSV file is empty. Please upload a valid CSV file.', 'error')
             return redirect(url_for('upload_csv', project_name=project_name))
-        except pd.errors.ParserError:
+        except (pd.errors.ParserError, ValueError, OSError) as e:
+            print(f"[WARN] Could not parse upload {file.filename}: {e}")
             flash('Error parsing the CSV file. Please ensure it is properly formatted.', 'error')
             return redirect(url_for('upload_csv', project_name=project_name))
     else:
-        flash('Invalid file format. Please upload a CSV file.', 'error')
+        flash('Invalid file format. Please upload a CSV, Parquet or XLSX file.', 'error')
         return redirect(url_for('upload_csv', project_name=project_name))
@@ -15,6 +15,7 @@
 
 import os
 import io
+import base64
 import csv
 import openpyxl
 import yaml
@@ -33,11 +34,11 @@ from google.genai import types
 from modules.utils import get_google_api_key
 
 from modules.translations import get_translation
-from modules.webutils import project_access_required
+from modules.webutils import project_access_required, admin_required
 import multiprocessing
 
 from modules.db import (
-    load_json_data, save_annotation, get_tags, create_tag, update_tag, delete_tag, delete_tags,
+    count_json_operations, save_annotation, submit_annotation, get_tags, create_tag, update_tag, delete_tag, delete_tags,
     delete_annotation, get_chat_history, create_note, get_notes_for_pair,
     update_note, delete_note as db_delete_note, migrate_project_db,
     get_all_notes, get_notes_count,
@@ -46,8 +47,12 @@ from modules.db import (
     get_linguistic_analysis as db_get_linguistic_analysis,
     save_linguistic_analysis as db_save_linguistic_analysis,
     create_auto_tagging_job, get_auto_tagging_job,
-    load_text_pair, update_auto_tagging_job_status
+    load_text_pair, update_auto_tagging_job_status, db_transaction, transaction, decode_diff_text,
+    pair_text_filter, search_project, annotation_count_summary,
+    get_project_language, nlp_label_counts, get_projects, writer_stats
 )
+from modules.nlp_labels import resolve_label
+from modules.maintenance import run_maintenance
 from modules.ai_chat import (
     get_gemini_chat_response,
     generate_note_title,
@@ -137,8 +142,8 @@ def delete_tag_route(tag_id):
     project_name = request.args.get('project_name')
     if not project_name:
         return jsonify({'error': get_translation('Project name is required')}), 400
-    delete_tag(project_name, tag_id, current_app.config.get('DATABASE_PATH', 'databases'))
-    return jsonify({'message': get_translation('Tag deleted successfully')})
+    deleted = delete_tag(project_name, tag_id, current_app.config.get('DATABASE_PATH', 'databases'))
+    return jsonify({'message': get_translation('Tag deleted successfully'), 'deleted': deleted})
 
 
 @api_bp.route('/tags/batch_delete', methods=['DELETE'])
@@ -150,8 +155,9 @@ def batch_delete_tags_route():
     if not project_name or not tag_ids:
         return jsonify({'error': get_translation('Project name and tag IDs are required')}), 400
     try:
-        delete_tags(project_name, tag_ids, current_app.config.get('DATABASE_PATH', 'databases'))
-        return jsonify({'message': get_translation('Tags deleted successfully')})
+        deleted = delete_tags(project_name, tag_ids, current_app.config.get('DATABASE_PATH', 'databases'))
+        return jsonify({'message': get_translation('Tags deleted successfully'),
+                        'deleted': deleted, 'rows_touched': sum(deleted.values())})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -171,20 +177,19 @@ def annotate_text_route():
         return jsonify({'error': get_translation('Missing required fields')}), 400
     annotation = save_annotation(project_name, pair_id, data_type, start_offset, end_offset, tag_id, text, current_app.config.get('DATABASE_PATH', 'databases'))
     project_db_name = os.path.join(current_app.config.get('DATABASE_PATH', 'databases'), f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('''
-        SELECT
-            a.id, a.project_name, a.pair_id, a.data_type,
-            a.start_offset, a.end_offset, a.tag_id, a.text,
-            t.name as tag_name, t.color as tag_color, t.parent_tag_id
-        FROM annotations a
-        JOIN tags t ON a.tag_id = t.id
-        WHERE a.id = ?
-    ''', (annotation['id'],))
-    new_annotation_details = c.fetchone()
-    conn.close()
+    with db_transaction(project_db_name) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('''
+            SELECT
+                a.id, ? AS project_name, a.pair_id, a.data_type,
+                a.start_offset, a.end_offset, a.tag_id, a.text,
+                t.name as tag_name, t.color as tag_color, t.parent_tag_id
+            FROM annotations a
+            JOIN tags t ON a.tag_id = t.id
+            WHERE a.id = ?
+        ''', (project_name, annotation['id']))
+        new_annotation_details = c.fetchone()
     return jsonify(dict(new_annotation_details)), 201
 
 
@@ -247,133 +252,121 @@ def nlp_summary_route(project_name):
     return jsonify(_compute_nlp_summary(project_name))
 def _compute_nlp_summary(project_name):
     import math
-    project_db_name = os.path.join(current_app.config.get('DATABASE_PATH', 'databases'), f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    def _total_tokens():
-        c.execute("SELECT text_type, COUNT(*) AS n FROM tokens GROUP BY text_type")
-        wrong_token_count = 0
-        correct_token_count = 0
-        for row in c.fetchall():
-            if row['text_type'] == 'error_text':
-                wrong_token_count = int(row['n'] or 0)
-            elif row['text_type'] == 'corrected_text':
-                correct_token_count = int(row['n'] or 0)
-        return wrong_token_count, correct_token_count
-    wrong_total_tokens, correct_total_tokens = _total_tokens()
-    c.execute("SELECT pair_id, text_type, COUNT(*) AS n FROM tokens GROUP BY pair_id, text_type")
-    per_pair_tokens = {}
-    for row in c.fetchall():
-        pair_id = int(row['pair_id'])
-        text_type = row['text_type']
-        count = int(row['n'] or 0)
-        per_pair_tokens.setdefault(pair_id, {})[text_type] = count
-    def _fetch_counts(table, col):
-        c.execute(f"""
-            SELECT {col} as label,
-                   SUM(CASE WHEN text_type='error_text' THEN 1 ELSE 0 END) AS wrong,
-                   SUM(CASE WHEN text_type='corrected_text' THEN 1 ELSE 0 END) AS correct
-            FROM {table}
-            WHERE {col} IS NOT NULL AND {col} <> 'N/A'
-            GROUP BY {col}
-        """)
-        rows = c.fetchall()
-        wrong = {}; correct = {}; delta = {}
-        for row in rows:
-            label = row['label']
-            wrong_count = int(row['wrong'] or 0)
-            correct_count = int(row['correct'] or 0)
-            wrong[label] = wrong_count
-            correct[label] = correct_count
-            delta[label] = correct_count - wrong_count
-        c.execute(f"""
-            SELECT pair_id, text_type, {col} AS label, COUNT(*) AS n
-            FROM {table}
-            WHERE {col} IS NOT NULL AND {col} <> 'N/A'
-            GROUP BY pair_id, text_type, {col}
-        """)
-        per_pair = {}
+    db_path = current_app.config.get('DATABASE_PATH', 'databases')
+    language = get_project_language(project_name, db_path)
+    with transaction(project_name, db_path) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        def _total_tokens():
+            c.execute("SELECT text_type, COUNT(*) AS n FROM tokens GROUP BY text_type")
+            wrong_token_count = 0
+            correct_token_count = 0
+            for row in c.fetchall():
+                if row['text_type'] == 'error_text':
+                    wrong_token_count = int(row['n'] or 0)
+                elif row['text_type'] == 'corrected_text':
+                    correct_token_count = int(row['n'] or 0)
+            return wrong_token_count, correct_token_count
+        wrong_total_tokens, correct_total_tokens = _total_tokens()
+        c.execute("SELECT pair_id, text_type, COUNT(*) AS n FROM tokens GROUP BY pair_id, text_type")
+        per_pair_tokens = {}
         for row in c.fetchall():
-            pair_id = int(row['pair_id']); text_type = row['text_type']; label = row['label']; count = int(row['n'] or 0)
-            per_pair.setdefault(label, {}).setdefault(pair_id, {}).setdefault(text_type, 0)
-            per_pair[label][pair_id][text_type] = count
-        alpha = 1.0
-        entries = []
-        pvals = []
-        tmp = []
-        for label in sorted(set(list(wrong.keys()) + list(correct.keys()))):
-            freq_wrong = wrong.get(label, 0); freq_correct = correct.get(label, 0)
-            rate_wrong = (freq_wrong / wrong_total_tokens * 1000.0) if wrong_total_tokens > 0 else 0.0
-            rate_correct = (freq_correct / correct_total_tokens * 1000.0) if correct_total_tokens > 0 else 0.0
-            delta_rate = rate_correct - rate_wrong
-            total_wrong = max(wrong_total_tokens, 1); total_correct = max(correct_total_tokens, 1)
-            logit_wrong = math.log((freq_wrong + alpha) / (total_wrong - freq_wrong + alpha))
-            logit_correct = math.log((freq_correct + alpha) / (total_correct - freq_correct + alpha))
-            log_odds = logit_correct - logit_wrong
-            variance = 1.0/(freq_wrong + alpha) + 1.0/(total_wrong - freq_wrong + alpha) + 1.0/(freq_correct + alpha) + 1.0/(total_correct - freq_correct + alpha)
-            z_score = log_odds / math.sqrt(variance) if variance > 0 else 0.0
-            p_value = float(2.0 * 0.5 * math.erfc(abs(z_score) / math.sqrt(2.0)))
-            deltas = []
-            for pair_id, tokens_in_pair in per_pair_tokens.items():
-                num_wrong_tokens = tokens_in_pair.get('error_text', 0)
-                num_correct_tokens = tokens_in_pair.get('corrected_text', 0)
-                if num_wrong_tokens <= 0 and num_correct_tokens <= 0: continue
-                label_count_wrong = per_pair.get(label, {}).get(pair_id, {}).get('error_text', 0)
-                label_count_correct = per_pair.get(label, {}).get(pair_id, {}).get('corrected_text', 0)
-                rate_wrong_in_pair = (label_count_wrong / num_wrong_tokens * 1000.0) if num_wrong_tokens > 0 else 0.0
-                rate_correct_in_pair = (label_count_correct / num_correct_tokens * 1000.0) if num_correct_tokens > 0 else 0.0
-                deltas.append(rate_correct_in_pair - rate_wrong_in_pair)
-            num_pairs = len(deltas)
-            mean_delta_rate = sum(deltas)/num_pairs if num_pairs > 0 else 0.0
-            standard_error = 0.0; ci_low = mean_delta_rate; ci_high = mean_delta_rate
-            if num_pairs > 1:
-                mean = mean_delta_rate
-                variance_of_deltas = sum((x-mean)*(x-mean) for x in deltas)/(num_pairs-1)
-                standard_error = math.sqrt(variance_of_deltas / num_pairs)
-                ci_low = mean - 1.96*standard_error
-                ci_high = mean + 1.96*standard_error
-            tmp.append({
-                'label': label, 'wrong_count': freq_wrong, 'correct_count': freq_correct,
-                'wrong_rate': rate_wrong, 'correct_rate': rate_correct, 'delta_rate': delta_rate,
-                'log_odds': log_odds, 'z': z_score, 'p': p_value,
-                'paired': {
-                    'n_pairs': num_pairs, 'mean_delta_rate': mean_delta_rate, 'se': standard_error,
-                    'ci_low': ci_low, 'ci_high': ci_high
-                }
-            })
-            pvals.append(p_value)
-        mtests = len(pvals) if pvals else 1
-        order = sorted(range(len(pvals)), key=lambda i: pvals[i])
-        qvals = [None]*len(pvals)
-        min_q = 1.0
-        for rank, idx in enumerate(reversed(order), start=1):
-            i = len(pvals) - rank
-            pi = pvals[order[i]]
-            q = pi * mtests / (i+1)
-            if q < min_q: min_q = q
-            qvals[order[i]] = min_q
-        entries = []
-        for i, entry in enumerate(tmp):
-            entry['q'] = float(qvals[i]) if qvals[i] is not None else float(entry['p'])
-            entries.append(entry)
-        return {'totals': {'wrong_tokens': wrong_total_tokens,'correct_tokens': correct_total_tokens},'entries': entries,'simple_counts': {'wrong': wrong, 'correct': correct, 'delta': delta}}
-    pos = _fetch_counts('tokens', 'tag')
-    dep = _fetch_counts('tokens', 'label')
-    tense = _fetch_counts('tokens', 'tense')
-    number = _fetch_counts('tokens', 'number')
-    ent = _fetch_counts('entities', 'type')
-    edits = {'added': 0, 'deleted': 0, 'replaced': 0}
-    try:
-        items = load_json_data(project_name, 'diff', current_app.config.get('DATABASE_PATH', 'databases'))
-        for it in items:
-            op = (it.get('operation') or '').lower()
-            if op == 'added': edits['added'] += 1
-            elif op == 'deleted': edits['deleted'] += 1
-            elif op in ('replaced', 'replacedby'): edits['replaced'] += 1
-    except Exception:
-        pass
-    conn.close()
+            pair_id = int(row['pair_id'])
+            text_type = row['text_type']
+            count = int(row['n'] or 0)
+            per_pair_tokens.setdefault(pair_id, {})[text_type] = count
+        def _fetch_counts(table, col):
+            # Labels are resolved from the enum codes in the project language
+            label_counts = nlp_label_counts(conn, table, col, language, group_by=('pair_id', 'text_type'))
+            totals = {}
+            per_pair = {}
+            for (label, pair_id, text_type), count in label_counts.items():
+                label_totals = totals.setdefault(label, {'error_text': 0, 'corrected_text': 0})
+                if text_type in label_totals:
+                    label_totals[text_type] += count
+                per_pair.setdefault(label, {}).setdefault(int(pair_id), {})[text_type] = count
+            wrong = {}; correct = {}; delta = {}
+            for label in sorted(totals):
+                wrong_count = totals[label]['error_text']
+                correct_count = totals[label]['corrected_text']
+                wrong[label] = wrong_count
+                correct[label] = correct_count
+                delta[label] = correct_count - wrong_count
+            alpha = 1.0
+            entries = []
+            pvals = []
+            tmp = []
+            for label in sorted(set(list(wrong.keys()) + list(correct.keys()))):
+                freq_wrong = wrong.get(label, 0); freq_correct = correct.get(label, 0)
+                rate_wrong = (freq_wrong / wrong_total_tokens * 1000.0) if wrong_total_tokens > 0 else 0.0
+                rate_correct = (freq_correct / correct_total_tokens * 1000.0) if correct_total_tokens > 0 else 0.0
+                delta_rate = rate_correct - rate_wrong
+                total_wrong = max(wrong_total_tokens, 1); total_correct = max(correct_total_tokens, 1)
+                logit_wrong = math.log((freq_wrong + alpha) / (total_wrong - freq_wrong + alpha))
+                logit_correct = math.log((freq_correct + alpha) / (total_correct - freq_correct + alpha))
+                log_odds = logit_correct - logit_wrong
+                variance = 1.0/(freq_wrong + alpha) + 1.0/(total_wrong - freq_wrong + alpha) + 1.0/(freq_correct + alpha) + 1.0/(total_correct - freq_correct + alpha)
+                z_score = log_odds / math.sqrt(variance) if variance > 0 else 0.0
+                p_value = float(2.0 * 0.5 * math.erfc(abs(z_score) / math.sqrt(2.0)))
+                deltas = []
+                for pair_id, tokens_in_pair in per_pair_tokens.items():
+                    num_wrong_tokens = tokens_in_pair.get('error_text', 0)
+                    num_correct_tokens = tokens_in_pair.get('corrected_text', 0)
+                    if num_wrong_tokens <= 0 and num_correct_tokens <= 0: continue
+                    label_count_wrong = per_pair.get(label, {}).get(pair_id, {}).get('error_text', 0)
+                    label_count_correct = per_pair.get(label, {}).get(pair_id, {}).get('corrected_text', 0)
+                    rate_wrong_in_pair = (label_count_wrong / num_wrong_tokens * 1000.0) if num_wrong_tokens > 0 else 0.0
+                    rate_correct_in_pair = (label_count_correct / num_correct_tokens * 1000.0) if num_correct_tokens > 0 else 0.0
+                    deltas.append(rate_correct_in_pair - rate_wrong_in_pair)
+                num_pairs = len(deltas)
+                mean_delta_rate = sum(deltas)/num_pairs if num_pairs > 0 else 0.0
+                standard_error = 0.0; ci_low = mean_delta_rate; ci_high = mean_delta_rate
+                if num_pairs > 1:
+                    mean = mean_delta_rate
+                    variance_of_deltas = sum((x-mean)*(x-mean) for x in deltas)/(num_pairs-1)
+                    standard_error = math.sqrt(variance_of_deltas / num_pairs)
+                    ci_low = mean - 1.96*standard_error
+                    ci_high = mean + 1.96*standard_error
+                tmp.append({
+                    'label': label, 'wrong_count': freq_wrong, 'correct_count': freq_correct,
+                    'wrong_rate': rate_wrong, 'correct_rate': rate_correct, 'delta_rate': delta_rate,
+                    'log_odds': log_odds, 'z': z_score, 'p': p_value,
+                    'paired': {
+                        'n_pairs': num_pairs, 'mean_delta_rate': mean_delta_rate, 'se': standard_error,
+                        'ci_low': ci_low, 'ci_high': ci_high
+                    }
+                })
+                pvals.append(p_value)
+            mtests = len(pvals) if pvals else 1
+            order = sorted(range(len(pvals)), key=lambda i: pvals[i])
+            qvals = [None]*len(pvals)
+            min_q = 1.0
+            for rank, idx in enumerate(reversed(order), start=1):
+                i = len(pvals) - rank
+                pi = pvals[order[i]]
+                q = pi * mtests / (i+1)
+                if q < min_q: min_q = q
+                qvals[order[i]] = min_q
+            entries = []
+            for i, entry in enumerate(tmp):
+                entry['q'] = float(qvals[i]) if qvals[i] is not None else float(entry['p'])
+                entries.append(entry)
+            return {'totals': {'wrong_tokens': wrong_total_tokens,'correct_tokens': correct_total_tokens},'entries': entries,'simple_counts': {'wrong': wrong, 'correct': correct, 'delta': delta}}
+        pos = _fetch_counts('tokens', 'tag')
+        dep = _fetch_counts('tokens', 'label')
+        tense = _fetch_counts('tokens', 'tense')
+        number = _fetch_counts('tokens', 'number')
+        ent = _fetch_counts('entities', 'type')
+        edits = {'added': 0, 'deleted': 0, 'replaced': 0}
+        try:
+            op_counts = count_json_operations(project_name, 'diff', current_app.config.get('DATABASE_PATH', 'databases'))
+            for op, n in op_counts.items():
+                op = (op or '').lower()
+                if op == 'added': edits['added'] += n
+                elif op == 'deleted': edits['deleted'] += n
+                elif op in ('replaced', 'replacedby'): edits['replaced'] += n
+        except Exception:
+            pass
     return {'pos': pos, 'dep': dep, 'ent': ent, 'tense': tense, 'number': number, 'edits': edits}
 
 
@@ -556,16 +549,18 @@ def api_text_pairs(project_name):
 @project_access_required
 def api_dep_tree(project_name, pair_id):
     project_db_name = os.path.join(current_app.config.get('DATABASE_PATH', 'databases'), f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
     try:
-        c.execute("SELECT token, position, tag, head_token, label, text_type FROM tokens WHERE pair_id=? ORDER BY position ASC", (pair_id,))
-        rows = c.fetchall()
+        with db_transaction(project_db_name) as conn:
+            conn.row_factory = sqlite3.Row
+            c = conn.cursor()
+            c.execute("SELECT token, position, tag, tag_code, head_token, label, dep_label_code, text_type FROM tokens WHERE pair_id=? ORDER BY position ASC", (pair_id,))
+            rows = c.fetchall()
     except Exception as e:
-        conn.close()
         return jsonify({'error': str(e)}), 500
-    conn.close()
+    language = get_project_language(project_name, current_app.config.get('DATABASE_PATH', 'databases'))
+    rows = [dict(r, tag=resolve_label(language, 'parts_of_speech', r['tag_code'], r['tag']),
+                 label=resolve_label(language, 'dependency_edges', r['dep_label_code'], r['label']))
+            for r in rows]
     def build_tree(rows, text_type):
         seq = [r for r in rows if r['text_type'] == text_type]
         words = [{'text': r['token'], 'tag': r['tag']} for r in seq]
@@ -591,68 +586,188 @@ def api_dep_compare(project_name, pair_id):
     return jsonify({'status': 'not_implemented'}), 501
 
 
+# Row order of /api/annotations for each sort_by; the trailing id makes every key unique
+_ANNOTATION_ORDERS = {
+    'pair_id': ('pair_id', 'start_offset', 'id'),
+    'start_offset': ('start_offset', 'pair_id', 'id'),
+}
+
+
+def _encode_annotation_cursor(row, sort_by):
+    key = json.dumps([sort_by] + [row[column] for column in _ANNOTATION_ORDERS[sort_by]])
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def _decode_annotation_cursor(cursor, sort_by):
+    # A cursor only continues the order it was issued for
+    padded = cursor + '=' * (-len(cursor) % 4)
+    cursor_sort, first, second, annotation_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    if cursor_sort != sort_by:
+        raise ValueError('cursor was issued for another sort order')
+    return int(first), int(second), int(annotation_id)
+
+
 @api_bp.route('/annotations', methods=['GET'])
 @project_access_required
 def get_annotations():
+    """
+    Annotations with their tag, pair texts and diff, ordered by (pair_id, start_offset, id),
+    or by (start_offset, pair_id, id) with sort_by=start_offset.
+
+    Pass `cursor` (empty for the first page) for keyset pagination: the response then carries
+    `next_cursor` (null on the last page), valid for the same sort_by only. Without it,
+    limit/offset paging is used.
+    Optional filters: tag_name, data_type, search_query, chart_filter, pair_id.
+    """
     project_name = request.args.get('project_name')
     if not project_name:
         return jsonify({'error': get_translation('Project name is required')}), 400
     tag_name_filter = request.args.get('tag_name', None)
     data_type_filter = request.args.get('data_type', None)
     search_query = request.args.get('search_query', None)
-    sort_by = request.args.get('sort_by', 'pair_id')
+    chart_filter = request.args.get('chart_filter', None)
+    pair_id_filter = request.args.get('pair_id', type=int)
+    sort_by = request.args.get('sort_by') or 'pair_id'
+    if sort_by not in _ANNOTATION_ORDERS:
+        return jsonify({'error': 'Invalid sort_by'}), 400
+    order_columns = ', '.join(f'a.{column}' for column in _ANNOTATION_ORDERS[sort_by])
     limit = request.args.get('limit', default=100, type=int)
     offset = request.args.get('offset', default=0, type=int)
+    cursor = request.args.get('cursor')
+    after = None
+    if cursor:
+        try:
+            after = _decode_annotation_cursor(cursor, sort_by)
+        except (ValueError, TypeError):
+            return jsonify({'error': 'Invalid cursor'}), 400
+
     project_db_name = os.path.join(current_app.config.get('DATABASE_PATH', 'databases'), f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    query = '''
-        SELECT
-            a.id, a.project_name, a.pair_id, a.data_type, a.start_offset, a.end_offset, a.tag_id, a.text,
-            t.name as tag_name, t.description as tag_description, t.color as tag_color, t.parent_tag_id,
-            c.error_text, c.corrected_text, d.diff_text
-        FROM annotations a
-        JOIN tags t ON a.tag_id = t.id
-        LEFT JOIN csv_data c ON a.pair_id = c.id
-        LEFT JOIN diff_data d ON a.pair_id = d.pair_id
-        WHERE a.project_name = ?
-    '''
-    params = (project_name,)
-    if tag_name_filter:
-        query += " AND t.name LIKE ?"; params += (f'%{tag_name_filter}%',)
-    if data_type_filter:
-        query += " AND a.data_type = ?"; params += (data_type_filter,)
-    if search_query:
-        query += " AND (c.error_text LIKE ? OR c.corrected_text LIKE ?)"; params += (f'%{search_query}%', f'%{search_query}%')
-    chart_filter = request.args.get('chart_filter', None)
-    if chart_filter:
-        query += " AND t.name = ?"; params += (chart_filter,)
-    query += " LIMIT ? OFFSET ?"; params += (limit, offset)
-    c.execute(query, params)
-    annotations_rows = c.fetchall()
-    count_query = """
-        SELECT COUNT(*)
-        FROM annotations a
-        JOIN tags t ON a.tag_id = t.id
-        LEFT JOIN csv_data c ON a.pair_id = c.id
-        LEFT JOIN diff_data d ON a.pair_id = d.pair_id
-        WHERE a.project_name = ?
-    """
-    count_params = (project_name,)
-    if tag_name_filter:
-        count_query += " AND t.name LIKE ?"; count_params += (f'%{tag_name_filter}%',)
-    if data_type_filter:
-        count_query += " AND a.data_type = ?"; count_params += (data_type_filter,)
-    if search_query:
-        count_query += " AND (c.error_text LIKE ? OR c.corrected_text LIKE ?)"; count_params += (f'%{search_query}%', f'%{search_query}%')
-    if chart_filter:
-        count_query += " AND t.name = ?"; count_params += (chart_filter,)
-    c.execute(count_query, count_params)
-    total_annotations = c.fetchone()[0]
-    conn.close()
+    with db_transaction(project_db_name) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+
+        where = []
+        params = []
+        if tag_name_filter:
+            where.append("t.name LIKE ?"); params.append(f'%{tag_name_filter}%')
+        if data_type_filter:
+            where.append("a.data_type = ?"); params.append(data_type_filter)
+        if pair_id_filter is not None:
+            where.append("a.pair_id = ?"); params.append(pair_id_filter)
+        if search_query:
+            # csv_data is always joined here, so the LIKE fallback needs no extra join
+            search_sql, search_params, _ = pair_text_filter(conn, search_query)
+            where.append(search_sql); params.extend(search_params)
+        if chart_filter:
+            where.append("t.name = ?"); params.append(chart_filter)
+
+        page_where = list(where)
+        # The project is the DB file; its name is echoed back in every row
+        page_params = [project_name] + params
+        if after:
+            page_where.append(f"({order_columns}) > (?, ?, ?)"); page_params.extend(after)
+        query = f'''
+            SELECT
+                a.id, ? AS project_name, a.pair_id, a.data_type, a.start_offset, a.end_offset, a.tag_id, a.text,
+                t.name as tag_name, t.description as tag_description, t.color as tag_color, t.parent_tag_id,
+                c.error_text, c.corrected_text, d.diff_text
+            FROM annotations a
+            JOIN tags t ON a.tag_id = t.id
+            LEFT JOIN csv_data c ON a.pair_id = c.id
+            LEFT JOIN diff_data d ON a.pair_id = d.pair_id
+            WHERE {' AND '.join(page_where) or '1'}
+            ORDER BY {order_columns}
+        '''
+        if cursor is not None:
+            # One extra row tells whether another page follows
+            query += " LIMIT ?"; page_params.append(limit + 1)
+        else:
+            query += " LIMIT ? OFFSET ?"; page_params.extend([limit, offset])
+        c.execute(query, page_params)
+        annotations_rows = c.fetchall()
+
+        next_cursor = None
+        if cursor is not None and len(annotations_rows) > limit:
+            annotations_rows = annotations_rows[:limit]
+            next_cursor = _encode_annotation_cursor(annotations_rows[-1], sort_by)
+
+        # Totals come from the annotation counters; later keyset pages skip them (the client
+        # keeps the first page's)
+        total_annotations = counts = None
+        if not cursor:
+            counts = annotation_count_summary(conn, tag_name_like=tag_name_filter, data_type=data_type_filter,
+                                              tag_name=chart_filter, search_query=search_query, pair_id=pair_id_filter)
+            total_annotations = counts['total']
     annotations = [dict(row) for row in annotations_rows]
-    return jsonify({'annotations': annotations, 'total': total_annotations})
+    for annotation in annotations:
+        annotation['diff_text'] = decode_diff_text(annotation['diff_text'])
+    response = {'annotations': annotations, 'total': total_annotations}
+    if counts is not None:
+        response['counts'] = {'by_tag': counts['by_tag'], 'by_data_type': counts['by_data_type']}
+    if cursor is not None:
+        response['next_cursor'] = next_cursor
+    return jsonify(response)
+
+
+@api_bp.route('/search', methods=['GET'])
+@project_access_required
+def search_route():
+    """
+    Ranked full-text search across pair texts, annotation texts and notes.
+
+    Query args: project_name, q, sources (comma-separated: pairs,annotations,notes), limit (default 20).
+    Returns { "results": [{source, id, pair_id, field, snippet, score}] }; snippets are HTML-escaped
+    with matches wrapped in <mark>.
+    """
+    project_name = request.args.get('project_name')
+    if not project_name:
+        return jsonify({'error': get_translation('Project name is required')}), 400
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'results': []})
+    sources = [s.strip() for s in (request.args.get('sources') or '').split(',') if s.strip()] or None
+    limit = max(1, min(request.args.get('limit', default=20, type=int), 200))
+    try:
+        results = search_project(project_name, query, current_app.config.get('DATABASE_PATH', 'databases'),
+                                 sources=sources, limit=limit)
+    except sqlite3.Error as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'results': results})
+
+
+@api_bp.route('/admin/maintenance', methods=['POST'])
+@admin_required
+def admin_maintenance_route():
+    """
+    Run database maintenance now (ANALYZE, incremental vacuum, WAL checkpoint).
+
+    JSON body: project_name (optional, default: every project), force (default true: run every
+    operation regardless of thresholds). Returns { "results": [{database, actions, size_before,
+    size_after, duration}] }.
+    """
+    data = request.get_json(silent=True) or {}
+    db_path = current_app.config.get('DATABASE_PATH', 'databases')
+    project_name = data.get('project_name')
+    if project_name:
+        if not os.path.exists(os.path.join(db_path, f'{project_name}.db')):
+            return jsonify({'error': get_translation('Project not found.')}), 404
+        project_names = [project_name]
+    else:
+        project_names = [row[0] for row in get_projects(db_path)]
+    try:
+        results = run_maintenance(db_path, project_names, force=bool(data.get('force', True)))
+    except sqlite3.Error as e:
+        return jsonify({'error': str(e)}), 500
+    return jsonify({'results': results})
+
+
+@api_bp.route('/admin/write_stats', methods=['GET'])
+@admin_required
+def admin_write_stats_route():
+    """
+    Queue depth, group-commit sizes and wait/commit times of this process's database writers.
+    """
+    return jsonify({'pid': os.getpid(), 'writers': writer_stats()})
 
 
 @api_bp.route('/tag_report/chat', methods=['POST'])
@@ -687,172 +802,93 @@ def tag_report_chat_route():
 
     # Build a filtered query mirroring /api/annotations but with an upper cap
     project_db_name = os.path.join(current_app.config.get('DATABASE_PATH', 'databases'), f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-
-    base_where = ["a.project_name = ?"]
-    where = list(base_where)
-    params = [project_name]
-    tag_name_filter = (filters.get('tag_name') or '').strip()
-    data_type_filter = (filters.get('data_type') or '').strip()
-    search_query = (filters.get('search_query') or '').strip()
-    sort_by = (filters.get('sort_by') or 'pair_id').strip()
-    chart_filter = (filters.get('chart_filter') or '').strip()
-
-    if tag_name_filter:
-        where.append("t.name LIKE ?"); params.append(f"%{tag_name_filter}%")
-    if data_type_filter:
-        where.append("a.data_type = ?"); params.append(data_type_filter)
-    if search_query:
-        where.append("(c.error_text LIKE ? OR c.corrected_text LIKE ?)"); params.extend([f"%{search_query}%", f"%{search_query}%"])
-    if chart_filter:
-        where.append("t.name = ?"); params.append(chart_filter)
-
-    order_clause = "a.pair_id ASC, a.start_offset ASC" if sort_by == 'pair_id' else "a.start_offset ASC, a.pair_id ASC"
-
-    base_query = f'''
-        SELECT
-            a.id, a.pair_id, a.data_type, a.text AS annotated_text,
-            t.name AS tag_name, t.color AS tag_color,
-            c.error_text, c.corrected_text
-        FROM annotations a
-        JOIN tags t ON a.tag_id = t.id
-        LEFT JOIN csv_data c ON a.pair_id = c.id
-        WHERE {' AND '.join(where)}
-        ORDER BY {order_clause}
-        LIMIT ?
-    '''
-    params_for_rows = list(params) + [int(sample_limit)]
-
-    # counts
-    count_total_query = f"""
-        SELECT COUNT(*) AS n
-        FROM annotations a
-        JOIN tags t ON a.tag_id = t.id
-        LEFT JOIN csv_data c ON a.pair_id = c.id
-        WHERE {' AND '.join(where)}
-    """
-    count_by_tag_query = f"""
-        SELECT t.name AS tag_name, COUNT(*) AS n
-        FROM annotations a
-        JOIN tags t ON a.tag_id = t.id
-        LEFT JOIN csv_data c ON a.pair_id = c.id
-        WHERE {' AND '.join(where)}
-        GROUP BY t.name
-        ORDER BY n DESC
-        LIMIT 50
-    """
-    count_by_dtype_query = f"""
-        SELECT a.data_type AS data_type, COUNT(*) AS n
-        FROM annotations a
-        JOIN tags t ON a.tag_id = t.id
-        LEFT JOIN csv_data c ON a.pair_id = c.id
-        WHERE {' AND '.join(where)}
-        GROUP BY a.data_type
-    """
-
     try:
-        c.execute(base_query, params_for_rows)
-        rows = [dict(r) for r in c.fetchall()]
-
-        # Clean and truncate long fields for prompt friendliness
-        import re
-        from html import unescape as _html_unescape
-        def strip_html(s):
-            if s is None:
-                return ''
-            txt = str(s)
-            txt = re.sub(r'<\s*br\s*/?>', '\n', txt, flags=re.I)
-            txt = re.sub(r'</\s*p\s*>', '\n', txt, flags=re.I)
-            txt = re.sub(r'<[^>]+>', '', txt)
-            txt = _html_unescape(txt)
-            txt = re.sub(r'[\t\r]+', ' ', txt)
-            txt = re.sub(r'\s+\n', '\n', txt)
-            return txt.strip()
-        def trunc(s, n=140):
-            s = (s or '').strip()
-            return s if len(s) <= n else s[:n-1] + '…'
-        samples = []
-        for r in rows:
-            samples.append({
-                'pair_id': r.get('pair_id'),
-                'data_type': r.get('data_type'),
-                'tag_name': r.get('tag_name'),
-                'annotated_text': trunc(strip_html(r.get('annotated_text'))),
-                'wrong_text': trunc(strip_html(r.get('error_text'))),
-                'corrected_text': trunc(strip_html(r.get('corrected_text'))),
-            })
-
-        # Stats: compute filtered and (when no filters) full totals explicitly
-        c.execute(count_total_query, params)
-        total_filtered = int((c.fetchone() or [0])[0])
-        filters_active = any([tag_name_filter, data_type_filter, search_query, chart_filter])
-        if filters_active:
-            total_annotations = total_filtered
-        else:
-            # Count across entire project, but only annotations that still have a valid tag
-            c.execute(
-                f"""
-                    SELECT COUNT(*) AS n
-                    FROM annotations a
-                    JOIN tags t ON a.tag_id = t.id
-                    WHERE {' AND '.join(base_where)}
-                """,
-                (project_name,)
-            )
-            total_annotations = int((c.fetchone() or [0])[0])
-
-        # Compute counts by tag and data type for filtered view
-        c.execute(count_by_tag_query, params)
-        by_tag_rows = c.fetchall()
-        counts_by_tag = {r['tag_name']: int(r['n']) for r in by_tag_rows}
-
-        c.execute(count_by_dtype_query, params)
-        by_dtype_rows = c.fetchall()
-        counts_by_dtype = {r['data_type']: int(r['n']) for r in by_dtype_rows}
-
-        # If no filters are active, recompute counts across the entire project explicitly
-        if not filters_active:
-            c.execute(
-                """
-                SELECT t.name AS tag_name, COUNT(*) AS n
-                FROM annotations a
-                JOIN tags t ON a.tag_id = t.id
-                WHERE a.project_name = ?
-                GROUP BY t.name
-                ORDER BY n DESC
-                """,
-                (project_name,)
-            )
-            by_tag_rows = c.fetchall()
-            counts_by_tag = {r['tag_name']: int(r['n']) for r in by_tag_rows}
-
-            c.execute(
-                """
-                SELECT a.data_type AS data_type, COUNT(*) AS n
+        with db_transaction(project_db_name) as conn:
+            conn.row_factory = sqlite3.Row
+            c = conn.cursor()
+
+            where = []
+            params = []
+            tag_name_filter = (filters.get('tag_name') or '').strip()
+            data_type_filter = (filters.get('data_type') or '').strip()
+            search_query = (filters.get('search_query') or '').strip()
+            sort_by = (filters.get('sort_by') or 'pair_id').strip()
+            chart_filter = (filters.get('chart_filter') or '').strip()
+
+            if tag_name_filter:
+                where.append("t.name LIKE ?"); params.append(f"%{tag_name_filter}%")
+            if data_type_filter:
+                where.append("a.data_type = ?"); params.append(data_type_filter)
+            if search_query:
+                search_sql, search_params, _ = pair_text_filter(conn, search_query)
+                where.append(search_sql); params.extend(search_params)
+            if chart_filter:
+                where.append("t.name = ?"); params.append(chart_filter)
+
+            order_clause = "a.pair_id ASC, a.start_offset ASC" if sort_by == 'pair_id' else "a.start_offset ASC, a.pair_id ASC"
+
+            base_query = f'''
+                SELECT
+                    a.id, a.pair_id, a.data_type, a.text AS annotated_text,
+                    t.name AS tag_name, t.color AS tag_color,
+                    c.error_text, c.corrected_text
                 FROM annotations a
                 JOIN tags t ON a.tag_id = t.id
-                WHERE a.project_name = ?
-                GROUP BY a.data_type
-                """,
-                (project_name,)
-            )
-            by_dtype_rows = c.fetchall()
-            counts_by_dtype = {r['data_type']: int(r['n']) for r in by_dtype_rows}
-
-        # Compute unique tags count after finalizing counts_by_tag (both cases)
-        unique_tags = len(counts_by_tag)
-        counts_by_tag_sum = sum(int(v) for v in counts_by_tag.values())
-        counts_by_dtype_sum = sum(int(v) for v in counts_by_dtype.values())
+                LEFT JOIN csv_data c ON a.pair_id = c.id
+                WHERE {' AND '.join(where) or '1'}
+                ORDER BY {order_clause}
+                LIMIT ?
+            '''
+            params_for_rows = list(params) + [int(sample_limit)]
+
+            c.execute(base_query, params_for_rows)
+            rows = [dict(r) for r in c.fetchall()]
+
+            # Clean and truncate long fields for prompt friendliness
+            import re
+            from html import unescape as _html_unescape
+            def strip_html(s):
+                if s is None:
+                    return ''
+                txt = str(s)
+                txt = re.sub(r'<\s*br\s*/?>', '\n', txt, flags=re.I)
+                txt = re.sub(r'</\s*p\s*>', '\n', txt, flags=re.I)
+                txt = re.sub(r'<[^>]+>', '', txt)
+                txt = _html_unescape(txt)
+                txt = re.sub(r'[\t\r]+', ' ', txt)
+                txt = re.sub(r'\s+\n', '\n', txt)
+                return txt.strip()
+            def trunc(s, n=140):
+                s = (s or '').strip()
+                return s if len(s) <= n else s[:n-1] + '…'
+            samples = []
+            for r in rows:
+                samples.append({
+                    'pair_id': r.get('pair_id'),
+                    'data_type': r.get('data_type'),
+                    'tag_name': r.get('tag_name'),
+                    'annotated_text': trunc(strip_html(r.get('annotated_text'))),
+                    'wrong_text': trunc(strip_html(r.get('error_text'))),
+                    'corrected_text': trunc(strip_html(r.get('corrected_text'))),
+                })
+
+            # Stats from the trigger-maintained annotation counters
+            filters_active = any([tag_name_filter, data_type_filter, search_query, chart_filter])
+            summary = annotation_count_summary(conn, tag_name_like=tag_name_filter or None,
+                                               data_type=data_type_filter or None, tag_name=chart_filter or None,
+                                               search_query=search_query or None)
+            total_annotations = summary['total']
+            counts_by_tag = summary['by_tag']
+            if filters_active:
+                counts_by_tag = dict(list(counts_by_tag.items())[:50])
+            counts_by_dtype = summary['by_data_type']
+
+            # Compute unique tags count after finalizing counts_by_tag (both cases)
+            unique_tags = len(counts_by_tag)
+            counts_by_tag_sum = sum(int(v) for v in counts_by_tag.values())
+            counts_by_dtype_sum = sum(int(v) for v in counts_by_dtype.values())
     except Exception as e:
-        conn.close()
         return jsonify({'error': str(e)}), 500
-    finally:
-        try:
-            conn.close()
-        except Exception:
-            pass
 
     context = {
         'filters': {
@@ -1234,6 +1270,8 @@ def run_auto_tag_job(job_id, project_name, pair_id, plan, target_text, db_path,
                 
                 print(f"Found {len(matches)} matches.")
 
+                # Queue every match first so they are written in one group commit
+                pending = []
                 for token_indices in matches:
                     if not token_indices:
                         continue
@@ -1250,7 +1288,7 @@ def run_auto_tag_job(job_id, project_name, pair_id, plan, target_text, db_path,
                         print(f"  - Saving annotation: '{annotated_text}' (start: {start_offset}, end: {end_offset}) from tokens {token_indices}")
                         
                         # 4. Save the annotation
-                        save_annotation(
+                        pending.append(submit_annotation(
                             project_name=project_name,
                             pair_id=pair_id,
                             data_type=data_type,
@@ -1259,10 +1297,12 @@ def run_auto_tag_job(job_id, project_name, pair_id, plan, target_text, db_path,
                             tag_id=tag_id_to_apply,
                             text=annotated_text,
                             db_path=db_path
-                        )
-                        annotations_created += 1
+                        ))
                     except (IndexError, TypeError) as e:
                         print(f"Error processing token indices {token_indices}: {e}")
+                for future in pending:
+                    future.result()
+                    annotations_created += 1
 
         result = {'annotations_created': annotations_created}
         if annotations_created == 0:
@@ -1341,22 +1381,22 @@ def download_project_data(project_name, file_format):
     # Export annotations used in Tag Report (not the UI highlights from HTML JSON)
     # This mirrors the data served by /api/annotations but pulls all rows for the project.
     project_db_name = os.path.join(current_app.config.get('DATABASE_PATH', 'databases'), f'{project_name}.db')
-    conn = sqlite3.connect(project_db_name)
-    conn.row_factory = sqlite3.Row
-    c = conn.cursor()
-    c.execute('''
-        SELECT
-            a.id, a.project_name, a.pair_id, a.data_type,
-            a.start_offset, a.end_offset, a.tag_id, a.text,
-            t.name as tag_name, t.description as tag_description, t.color as tag_color, t.parent_tag_id,
-            c2.error_text, c2.corrected_text, d.diff_text
-        FROM annotations a
-        JOIN tags t ON a.tag_id = t.id
-        LEFT JOIN csv_data c2 ON a.pair_id = c2.id
-        LEFT JOIN diff_data d ON a.pair_id = d.pair_id
-        WHERE a.project_name = ?
-        ORDER BY a.pair_id ASC, a.start_offset ASC
-    ''', (project_name,))
+    with db_transaction(project_db_name) as conn:
+        conn.row_factory = sqlite3.Row
+        c = conn.cursor()
+        c.execute('''
+            SELECT
+                a.id, ? AS project_name, a.pair_id, a.data_type,
+                a.start_offset, a.end_offset, a.tag_id, a.text,
+                t.name as tag_name, t.description as tag_description, t.color as tag_color, t.parent_tag_id,
+                c2.error_text, c2.corrected_text, d.diff_text
+            FROM annotations a
+            JOIN tags t ON a.tag_id = t.id
+            LEFT JOIN csv_data c2 ON a.pair_id = c2.id
+            LEFT JOIN diff_data d ON a.pair_id = d.pair_id
+            ORDER BY a.pair_id ASC, a.start_offset ASC
+        ''', (project_name,))
+        rows_raw = [dict(r) for r in c.fetchall()]
     import re
     from html import unescape as _html_unescape
 
@@ -1388,9 +1428,9 @@ def download_project_data(project_name, file_format):
                 out[k] = v
         return out
 
-    rows_raw = [dict(r) for r in c.fetchall()]
+    for r in rows_raw:
+        r['diff_text'] = decode_diff_text(r['diff_text'])
     rows = [_clean_row(r) for r in rows_raw]
-    conn.close()
     df = pd.DataFrame(rows)
 
     # Build a human-friendly export view: rename columns and order them
@@ -16,7 +16,7 @@
 from flask import Blueprint, request, jsonify, current_app
 
 from modules.webutils import project_access_required
-from modules.db import update_tags_or_highlights, load_json_data, save_highlights
+from modules.db import update_tags_or_highlights, save_highlights, delete_highlight
 from modules.translations import get_translation
 
 
@@ -50,7 +50,7 @@ def update_highlight():
 def update_highlight_route():
     data = request.get_json()
     project_name = data['project_name']
-    data_type = data['data_type']
+    data_type = data.get('data_type')  # None renames the highlight in every data type
     original_name = data['original_name']
     new_name = data.get('new_name')
     new_description = data.get('new_description')
@@ -63,14 +63,7 @@ def update_highlight_route():
 def delete_highlight_route():
     data = request.get_json()
     project_name = data.get('project_name')
-    data_type = "wrong"
     name = data['name']
-    html_wrong = load_json_data(project_name, 'wrong', current_app.config['DATABASE_PATH'])
-    html_correct = load_json_data(project_name, 'correct', current_app.config['DATABASE_PATH'])
-    html_diff = load_json_data(project_name, 'diff', current_app.config['DATABASE_PATH'])
-    from modules.db import delete_highlight as _delete
-    highlights, element, pos_wrong, pos_correct, pos_diff, pair_id = _delete(html_wrong, project_name, 'wrong', name, current_app.config['DATABASE_PATH'])
-    highlights, element, pos_wrong, pos_correct, pos_diff, pair_id = _delete(html_correct, project_name, 'correct', name, current_app.config['DATABASE_PATH'])
-    highlights, element, pos_wrong, pos_correct, pos_diff, pair_id = _delete(html_diff, project_name, 'diff', name, current_app.config['DATABASE_PATH'])
-    return jsonify({"message": get_translation('Highlight deleted successfully!'), "highlights": highlights})
+    deleted = delete_highlight(project_name, name, current_app.config['DATABASE_PATH'], data.get('data_type'))
+    return jsonify({"message": get_translation('Highlight deleted successfully!'), "highlights": [], "deleted": deleted})
 
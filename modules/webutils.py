@@ -65,6 +65,20 @@ def project_access_required(f):
     return wrapper
 
 
+def admin_required(f):
+    """
+    Restrict a JSON endpoint to the usernames listed in config.json "ADMIN_USERS".
+    """
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        user_id = session.get('user_id')
+        user = get_user_by_id(current_app.config.get('DATABASE_PATH', 'databases'), user_id) if user_id else None
+        if not user or user.get('username') not in (current_app.config.get('ADMIN_USERS') or []):
+            return jsonify({'error': get_translation('Forbidden')}), 403
+        return f(*args, **kwargs)
+    return wrapper
+
+
 def load_current_user():
     user_id = session.get('user_id')
     g.current_user = get_user_by_id(current_app.config.get('DATABASE_PATH', 'databases'), user_id) if user_id else None
@@ -2357,7 +2357,8 @@ $('#project-tags-list').on('click', '.delete-tag-btn', function() {
                         console.log('Tags deleted successfully:', response);
                         loadTags();
                         loadAndDisplayAnnotations();
-                        Swal.fire('Deleted', 'The selected tags have been deleted.', 'success');
+                        const deleted = response.deleted || {};
+                        Swal.fire('Deleted', `The selected tags have been deleted (${deleted.tags || 0} tags, ${deleted.annotations || 0} annotations, ${deleted.highlights || 0} highlights).`, 'success');
                     },
                     error: function(xhr, status, error) {
                         console.error('Error deleting tags:', error);
@@ -2495,7 +2496,7 @@ $('#project-tags-list').on('click', '.delete-tag-btn', function() {
             return;
         }
         $.ajax({
-            url: `/api/annotations?project_name=${encodeURIComponent(projectName)}`,
+            url: `/api/annotations?project_name=${encodeURIComponent(projectName)}&pair_id=${encodeURIComponent(selectionInfo.pairId)}&limit=10000`,
             type: 'GET',
             success: function(response) {
                 const allAnnotations = response.annotations;
@@ -2741,51 +2742,67 @@ function loadAndDisplayAnnotations() {
     }
     if (!currentPairId) return;
 
-    $.ajax({
-        url: `/api/annotations?project_name=${encodeURIComponent(projectName)}&limit=100000&offset=0&sort_by=start_offset&tag_name=&data_type=&search_query=`,
-        type: 'GET',
-        success: function(res) {
-            const anns = (res && res.annotations) ? res.annotations : [];
-            const byType = { error_text: [], corrected_text: [], diff_text: [] };
-            anns.forEach(a => {
-                if (a.pair_id === currentPairId || String(a.pair_id) === String(currentPairId)) {
-                    let t = (a.data_type || '').toString().toLowerCase();
-                    if (t === 'wrong') t = 'error_text';
-                    if (t === 'correct') t = 'corrected_text';
-                    if (t === 'diff') t = 'diff_text';
-                    if (t === 'error_text' || t === 'corrected_text' || t === 'diff_text') {
-                        byType[t].push(a);
-                    }
+    fetchAllAnnotations(projectName, { pair_id: currentPairId }, function(anns) {
+        const byType = { error_text: [], corrected_text: [], diff_text: [] };
+        anns.forEach(a => {
+            if (a.pair_id === currentPairId || String(a.pair_id) === String(currentPairId)) {
+                let t = (a.data_type || '').toString().toLowerCase();
+                if (t === 'wrong') t = 'error_text';
+                if (t === 'correct') t = 'corrected_text';
+                if (t === 'diff') t = 'diff_text';
+                if (t === 'error_text' || t === 'corrected_text' || t === 'diff_text') {
+                    byType[t].push(a);
                 }
-            });
-            // Sort by start then end desc to avoid nested wrap conflicts
-            Object.keys(byType).forEach(k => byType[k].sort((a,b)=> a.start_offset - b.start_offset || b.end_offset - a.end_offset));
-
-            const containers = {
-                error_text: document.getElementById(`result_wrong_${currentPairId}`),
-                corrected_text: document.getElementById(`result_correct_${currentPairId}`),
-                diff_text: document.getElementById(`result_diff_${currentPairId}`)
-            };
-            for (const dtype of ['error_text','corrected_text','diff_text']) {
-                const root = containers[dtype];
-                if (!root) continue;
-                // Remove existing overlays
-                unwrapAnnotationSpans(root);
-                // Apply new overlays using Range-based wrapping to preserve true nesting
-                const annsForType = byType[dtype].slice().sort((a,b)=> b.start_offset - a.start_offset || a.end_offset - b.end_offset);
-                annsForType.forEach(a => {
-                    try { wrapAnnotationRange(root, a); } catch (e) { /* ignore one-off failures */ }
-                });
             }
-            // Re-apply any active tag visibility filters after rendering
-            try { updateAnnotationVisibility(); } catch (e) {}
-        },
-        error: function(err) {
-            console.error('Failed to load annotations:', err);
+        });
+        // Sort by start then end desc to avoid nested wrap conflicts
+        Object.keys(byType).forEach(k => byType[k].sort((a,b)=> a.start_offset - b.start_offset || b.end_offset - a.end_offset));
+
+        const containers = {
+            error_text: document.getElementById(`result_wrong_${currentPairId}`),
+            corrected_text: document.getElementById(`result_correct_${currentPairId}`),
+            diff_text: document.getElementById(`result_diff_${currentPairId}`)
+        };
+        for (const dtype of ['error_text','corrected_text','diff_text']) {
+            const root = containers[dtype];
+            if (!root) continue;
+            // Remove existing overlays
+            unwrapAnnotationSpans(root);
+            // Apply new overlays using Range-based wrapping to preserve true nesting
+            const annsForType = byType[dtype].slice().sort((a,b)=> b.start_offset - a.start_offset || a.end_offset - b.end_offset);
+            annsForType.forEach(a => {
+                try { wrapAnnotationRange(root, a); } catch (e) { /* ignore one-off failures */ }
+            });
         }
+        // Re-apply any active tag visibility filters after rendering
+        try { updateAnnotationVisibility(); } catch (e) {}
+    }, function(err) {
+        console.error('Failed to load annotations:', err);
     });
 }
 
+// Fetch every annotation matching `filters`, following the keyset cursor page by page
+function fetchAllAnnotations(projectName, filters, onDone, onError) {
+    const collected = [];
+    function nextPage(cursor) {
+        const params = $.param(Object.assign({ project_name: projectName, limit: 1000, cursor: cursor }, filters || {}));
+        $.ajax({
+            url: `/api/annotations?${params}`,
+            type: 'GET',
+            success: function(res) {
+                collected.push(...((res && res.annotations) || []));
+                if (res && res.next_cursor) {
+                    nextPage(res.next_cursor);
+                } else {
+                    onDone(collected);
+                }
+            },
+            error: onError
+        });
+    }
+    nextPage('');
+}
+
 function unwrapAnnotationSpans(root) {
     try {
         const spans = root.querySelectorAll('span.annotation-span');
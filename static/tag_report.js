@@ -185,10 +185,29 @@ function loadTags(tags, selectedTagName) {
   }
 }
 
+// Walk the keyset cursor of /api/annotations and resolve with every page merged,
+// in the same shape as a single $.ajax response ([{annotations, total, counts}])
+function fetchAllAnnotationPages(baseUrl) {
+  const deferred = $.Deferred();
+  const collected = [];
+  let first = null;
+  (function nextPage(cursor) {
+    $.ajax({ url: `${baseUrl}&limit=1000&cursor=${encodeURIComponent(cursor)}`, type: 'GET' })
+      .done(function(res) {
+        if (first === null) first = res;
+        collected.push(...(res.annotations || []));
+        if (res.next_cursor) nextPage(res.next_cursor);
+        else deferred.resolve([{ annotations: collected, total: first.total, counts: first.counts }]);
+      })
+      .fail(function(xhr, status, error) { deferred.reject(xhr, status, error); });
+  })('');
+  return deferred.promise();
+}
+
 function loadAnnotations(tagFilter = '', dataTypeFilter = '', sortBy = 'pair_id', searchQuery = '', chartFilter = '') {
   const isAll = (!tagFilter && !dataTypeFilter && !searchQuery && !chartFilter);
-  const offset = isAll ? 0 : (currentPage - 1) * annotationsPerPage;
-  const limit = isAll ? 100000 : annotationsPerPage;
+  const offset = (currentPage - 1) * annotationsPerPage;
+  const baseUrl = `/api/annotations?project_name=${encodeURIComponent(projectName)}&tag_name=${encodeURIComponent(tagFilter)}&data_type=${encodeURIComponent(dataTypeFilter)}&search_query=${encodeURIComponent(searchQuery)}&chart_filter=${encodeURIComponent(chartFilter)}&sort_by=${encodeURIComponent(sortBy)}`;
   // Expose current filters globally so other UI (e.g., Insights) can use them
   try {
     window.TR_ACTIVE_FILTERS = { tag: tagFilter, dtype: dataTypeFilter, sort: sortBy, search: searchQuery, chart: chartFilter };
@@ -196,14 +215,17 @@ function loadAnnotations(tagFilter = '', dataTypeFilter = '', sortBy = 'pair_id'
   } catch(_) {}
   $.when(
     $.ajax({ url: `/api/tags?project_name=${encodeURIComponent(projectName)}`, type: 'GET' }),
-    $.ajax({ url: `/api/annotations?project_name=${encodeURIComponent(projectName)}&tag_name=${encodeURIComponent(tagFilter)}&data_type=${encodeURIComponent(dataTypeFilter)}&search_query=${encodeURIComponent(searchQuery)}&limit=${limit}&offset=${offset}&chart_filter=${encodeURIComponent(chartFilter)}`, type: 'GET' })
+    isAll ? fetchAllAnnotationPages(baseUrl)
+          : $.ajax({ url: `${baseUrl}&limit=${annotationsPerPage}&offset=${offset}`, type: 'GET' })
   ).done(function(tagsResponse, annotationsResponse) {
     const tags = tagsResponse[0];
     let annotations = annotationsResponse[0].annotations;
     totalAnnotations = annotationsResponse[0].total;
     $('#total-annotations').text(totalAnnotations);
-    const uniqueTagNames = new Set(annotations.map(ann => ann.tag_name));
-    $('#unique-tags').text(uniqueTagNames.size);
+    // Server-side counters cover every page, not just the one loaded
+    const counts = annotationsResponse[0].counts;
+    const uniqueTags = counts ? Object.keys(counts.by_tag || {}).length : new Set(annotations.map(ann => ann.tag_name)).size;
+    $('#unique-tags').text(uniqueTags);
     // Normalize data_type for consistent rendering and sorting
     annotations = annotations.map(a => ({ ...a, data_type: normalizeDataType(a.data_type) }));
     annotations.sort((a, b) => {
@@ -0,0 +1,102 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+Keyset pages of /api/annotations cover every row once, in the requested order.
+"""
+
+import pytest
+from flask import Flask
+
+from modules import db
+from modules.web.api import api_bp
+
+# (pair_id, start_offset) of each annotation; several share the same sort key
+ANNOTATIONS = [(2, 0), (1, 5), (1, 0), (2, 0), (1, 0), (1, 0), (3, 5), (2, 9)]
+
+
+@pytest.fixture
+def project(tmp_path):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    user = db.create_user(db_path, 'ana', 'x')
+    db.create_project_db('demo', '', 'en', db_path, owner_id=user['id'])
+    with db.transaction('demo', db_path) as conn:
+        conn.executemany('INSERT INTO csv_data (error_text, corrected_text) VALUES (?, ?)',
+                         [('the cat sat', 'the cat sits')] * 3)
+    # One tag per annotation: saving a span replaces the overlapping spans of its tag
+    ids = []
+    for i, (pair_id, offset) in enumerate(ANNOTATIONS):
+        tag = db.create_tag('demo', f'tag{i}', '', None, '#000000', db_path)
+        ids.append(db.save_annotation('demo', pair_id, 'error_text', offset, offset + 3, tag['id'], 'x', db_path)['id'])
+
+    app = Flask(__name__)
+    app.config.update(SECRET_KEY='test', DATABASE_PATH=db_path)
+    app.register_blueprint(api_bp)
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user['id']
+    return client, db_path, ids
+
+
+def expected_order(ids, sort_by):
+    rows = [(pair_id, offset, annotation_id) for (pair_id, offset), annotation_id in zip(ANNOTATIONS, ids)]
+    if sort_by == 'start_offset':
+        return [row[2] for row in sorted(rows, key=lambda r: (r[1], r[0], r[2]))]
+    return [row[2] for row in sorted(rows)]
+
+
+def walk(client, sort_by, limit):
+    ids, cursor = [], ''
+    while cursor is not None:
+        res = client.get(f'/api/annotations?project_name=demo&sort_by={sort_by}&limit={limit}&cursor={cursor}')
+        assert res.status_code == 200
+        ids.extend(a['id'] for a in res.get_json()['annotations'])
+        cursor = res.get_json()['next_cursor']
+    return ids
+
+
+@pytest.mark.parametrize('sort_by', ['pair_id', 'start_offset'])
+@pytest.mark.parametrize('limit', [1, 2, 3, len(ANNOTATIONS)])
+def test_keyset_pages_split_equal_sort_keys(project, sort_by, limit):
+    client, _, ids = project
+    assert walk(client, sort_by, limit) == expected_order(ids, sort_by)
+
+    # limit/offset paging honours the same order
+    res = client.get(f'/api/annotations?project_name=demo&sort_by={sort_by}&limit=100&offset=0')
+    assert [a['id'] for a in res.get_json()['annotations']] == expected_order(ids, sort_by)
+
+
+def test_stale_cursor_resumes_after_deleted_row(project):
+    client, db_path, ids = project
+    order = expected_order(ids, 'pair_id')
+    res = client.get('/api/annotations?project_name=demo&limit=2&cursor=').get_json()
+    assert [a['id'] for a in res['annotations']] == order[:2]
+
+    # The row the cursor points at, and the one after it, are gone before the next page
+    db.delete_annotation('demo', order[1], db_path)
+    db.delete_annotation('demo', order[2], db_path)
+    res = client.get(f"/api/annotations?project_name=demo&limit=2&cursor={res['next_cursor']}").get_json()
+    assert [a['id'] for a in res['annotations']] == order[3:5]
+
+
+def test_cursor_is_bound_to_its_sort_order(project):
+    client, _, _ = project
+    cursor = client.get('/api/annotations?project_name=demo&limit=2&cursor=').get_json()['next_cursor']
+
+    res = client.get(f'/api/annotations?project_name=demo&sort_by=start_offset&limit=2&cursor={cursor}')
+    assert res.status_code == 400
+    assert client.get('/api/annotations?project_name=demo&limit=2&cursor=bm90LWpzb24').status_code == 400
+    assert client.get('/api/annotations?project_name=demo&sort_by=tag_id').status_code == 400
@@ -0,0 +1,297 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+Pooled connections go back to the pool whether a helper returns or raises.
+"""
+
+import os
+import threading
+
+import pytest
+
+from modules import db, spacy_models
+
+
+def checked_out(db_file):
+    return db.db_activity().get(os.path.abspath(db_file), (None, 0))[1]
+
+
+@pytest.mark.parametrize('lookup', [db.get_tag, db.get_annotation, db.get_note, db.load_text_pair])
+def test_failed_lookup_releases_connection(tmp_path, lookup):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    db.create_project_db('demo', '', 'en', db_path)
+    project_db = os.path.join(db_path, 'demo.db')
+
+    with pytest.raises(TypeError):
+        lookup('demo', 404, db_path)
+    assert checked_out(project_db) == 0
+
+
+def test_transaction_rolls_back_and_releases(tmp_path):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    db.create_project_db('demo', '', 'en', db_path)
+    project_db = os.path.join(db_path, 'demo.db')
+
+    with pytest.raises(RuntimeError):
+        with db.transaction('demo', db_path) as conn:
+            conn.execute("INSERT INTO tags (name, color) VALUES ('lost', '#000000')")
+            raise RuntimeError('boom')
+    assert checked_out(project_db) == 0
+    assert db.get_tags('demo', db_path) == []
+
+
+def test_writer_survives_failed_lock(tmp_path, monkeypatch):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    db.create_project_db('demo', '', 'en', db_path)
+    project_db = os.path.join(db_path, 'demo.db')
+    monkeypatch.setattr(db, 'WRITER_LOCK_TIMEOUT_SECONDS', 0.05)
+
+    # Another process holds the write lock for longer than the timeout
+    fcntl = pytest.importorskip('fcntl')
+    with open(project_db + '.write-lock', 'a') as held:
+        fcntl.flock(held, fcntl.LOCK_EX)
+        future = db.submit_write(project_db, lambda conn: conn.execute(
+            "INSERT INTO tags (name, color) VALUES ('late', '#000000')").lastrowid)
+        with pytest.raises(db.sqlite3.OperationalError):
+            future.result(timeout=5)
+    assert checked_out(project_db) == 0
+
+    # The same writer thread commits the next write once the lock is free
+    tag = db.create_tag('demo', 'next', '', None, '#000000', db_path)
+    assert [t['name'] for t in db.get_tags('demo', db_path)] == [tag['name']]
+    db._retire_writer(project_db)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork()')
+def test_forked_child_gets_fresh_locks():
+    # A diff worker forked while another thread holds a module lock must not inherit it held
+    holding, release = threading.Event(), threading.Event()
+
+    def hold():
+        with db._migration_lock, db._nlp_cache_lock, spacy_models._models_lock:
+            holding.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait()
+    try:
+        pid = os.fork()
+        if pid == 0:
+            locks = (db._migration_lock, db._nlp_cache_lock, spacy_models._models_lock)
+            os._exit(0 if all(lock.acquire(timeout=2) for lock in locks) else 1)
+        _, status = os.waitpid(pid, 0)
+    finally:
+        release.set()
+        holder.join()
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+
+
+def test_annotation_count_summary_search(tmp_path):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    db.create_project_db('demo', '', 'en', db_path)
+    with db.transaction('demo', db_path) as conn:
+        conn.executemany('INSERT INTO csv_data (error_text, corrected_text) VALUES (?, ?)',
+                         [('the cat sat', 'the cat sits'), ('a dog ran', 'a dog runs')])
+    tag = db.create_tag('demo', 'verb', '', None, '#000000', db_path)
+    for pair_id in (1, 2):
+        db.save_annotation('demo', pair_id, 'error_text', 0, 3, tag['id'], 'x', db_path)
+
+    with db.transaction('demo', db_path) as conn:
+        # Short queries fall back to LIKE on csv_data, longer ones go through csv_fts
+        for query in ('ca', 'cat sat'):
+            _, _, needs_csv_join = db.pair_text_filter(conn, query, pair_column='k.pair_id')
+            assert needs_csv_join == (len(query) < db.FTS_MIN_QUERY_LENGTH)
+            assert db.annotation_count_summary(conn, search_query=query)['total'] == 1
+
+
+def test_csv_stream_claims_empty_table_and_rolls_back_own_rows(tmp_path):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    db.create_project_db('demo', '', 'en', db_path)
+    project_db = os.path.join(db_path, 'demo.db')
+    seen = {}
+
+    def first_upload():
+        yield [('a', 'b'), ('c', 'd')]
+        # A second upload arriving mid-stream finds the table taken
+        seen['second'] = db.save_csv_data_stream('demo', iter([[('x', 'y')]]), db_path)
+        # Another writer adds a row after ours before this upload fails
+        db.run_write(project_db, lambda conn: conn.execute(
+            "INSERT INTO csv_data (error_text, corrected_text) VALUES ('kept', 'kept')").lastrowid)
+        yield [('e', 'f')]
+        raise ValueError('truncated file')
+
+    with pytest.raises(ValueError):
+        db.save_csv_data_stream('demo', first_upload(), db_path)
+    assert seen['second'] is None
+    assert [(p['id'], p['error_text']) for p in db.load_csv_data('demo', db_path)] == [(3, 'kept')]
+
+
+def test_recode_payloads_vacuums_under_file_lock(tmp_path):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    db.create_project_db('demo', '', 'en', db_path)
+    project_db = os.path.join(db_path, 'demo.db')
+    segment = {'operation': 'replaced', 'pair_id': 1, 'position_in_diff': 0, 'position_in_wrong': 0,
+               'position_in_correct': 0, 'element': 'chat', 'morphology': [], 'entities': [], 'Highlights': []}
+    db.submit_text_pair_results('demo', [{'pair_id': 1, 'wrong': [segment], 'correct': [segment], 'diff': [segment],
+                                          'diff_text': '<span>chat</span>'}], db_path).result()
+    before = db.load_json_data('demo', 'diff', db_path)
+    stats = {}
+
+    # The VACUUM waits for maintenance (or a rename/delete) holding the file
+    with db.file_lock(project_db):
+        recode = threading.Thread(target=lambda: stats.update(db.recode_project_payloads('demo', db_path)))
+        recode.start()
+        recode.join(0.3)
+        assert recode.is_alive()
+    recode.join()
+    assert (stats['json_items'], stats['diff_data']) == (3, 1)
+    assert db.load_json_data('demo', 'diff', db_path) == before
+    assert checked_out(project_db) == 0
+    with db.transaction('demo', db_path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM json_items WHERE payload IS NULL').fetchone()[0] == 0
+
+
+def assert_counters_match(db_path):
+    # The trigger-maintained counters equal a GROUP BY over annotations, with no empty rows left behind
+    with db.transaction('demo', db_path) as conn:
+        for counters, key in (('annotation_counts', 'tag_id, data_type, pair_id'),
+                              ('annotation_tag_counts', 'tag_id, data_type')):
+            stored = sorted(conn.execute(f'SELECT {key}, n FROM {counters}').fetchall())
+            actual = sorted(conn.execute(f'SELECT {key}, COUNT(*) FROM annotations GROUP BY {key}').fetchall())
+            assert stored == actual
+
+
+def test_annotation_counters_follow_deletes_and_updates(tmp_path):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    db.create_project_db('demo', '', 'en', db_path)
+    db.save_csv_data_stream('demo', iter([[('the cat sat', 'the cat sits')] * 3]), db_path)
+    noun = db.create_tag('demo', 'noun', '', None, '#000000', db_path)
+    verb = db.create_tag('demo', 'verb', '', None, '#000000', db_path)
+    for pair_id, data_type, start, tag in ((1, 'error_text', 0, noun), (1, 'error_text', 5, noun),
+                                           (2, 'corrected_text', 0, noun), (2, 'error_text', 0, verb),
+                                           (3, 'error_text', 4, verb)):
+        db.save_annotation('demo', pair_id, data_type, start, start + 3, tag['id'], 'x', db_path)
+    assert_counters_match(db_path)
+
+    # A span overlapping two of its tag's spans replaces both
+    replacing = db.save_annotation('demo', 1, 'error_text', 2, 6, noun['id'], 'x', db_path)
+    assert_counters_match(db_path)
+
+    db.delete_annotation('demo', replacing['id'], db_path)
+    assert_counters_match(db_path)
+
+    with db.transaction('demo', db_path) as conn:
+        conn.execute('UPDATE annotations SET tag_id = ? WHERE pair_id = 2 AND data_type = ?', (noun['id'], 'error_text'))
+    assert_counters_match(db_path)
+    with db.transaction('demo', db_path) as conn:
+        conn.execute("UPDATE annotations SET data_type = 'diff', pair_id = 1 WHERE pair_id = 3")
+        conn.execute("UPDATE annotations SET text = 'y'")
+    assert_counters_match(db_path)
+
+    db.delete_tags('demo', [noun['id']], db_path)
+    assert_counters_match(db_path)
+    with db.transaction('demo', db_path) as conn:
+        assert db.annotation_count_summary(conn) == {'total': 1, 'by_tag': {'verb': 1}, 'by_data_type': {'diff': 1}}
+
+
+def search_hits(db_path, query, source):
+    return sorted(r['id'] for r in db.search_project('demo', query, db_path, sources=[source]))
+
+
+def test_search_index_follows_edits(tmp_path):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    db.create_project_db('demo', '', 'en', db_path)
+    db.save_csv_data_stream('demo', iter([[('the cat sat', 'the cat sits'), ('a dog ran', 'a dog runs')]]), db_path)
+    tag = db.create_tag('demo', 'verb', '', None, '#000000', db_path)
+    sat = db.save_annotation('demo', 1, 'error_text', 8, 11, tag['id'], 'sat', db_path)
+    note = db.create_note('demo', 1, 'agreement', 'subject and verb disagree', db_path)
+    assert search_hits(db_path, 'cat', 'pairs') == [1]
+    assert search_hits(db_path, 'sat', 'annotations') == [sat['id']]
+    assert search_hits(db_path, 'disagree', 'notes') == [note['id']]
+
+    with db.transaction('demo', db_path) as conn:
+        conn.execute("UPDATE csv_data SET error_text = 'the bird sat', corrected_text = 'the bird sits' WHERE id = 1")
+    db.save_title_to_db('demo', 2, 'Dogs', db_path)
+    assert search_hits(db_path, 'cat', 'pairs') == []
+    assert search_hits(db_path, 'bird', 'pairs') == [1]
+    assert search_hits(db_path, 'dog ran', 'pairs') == [2]
+
+    # Re-annotating the span replaces the old annotation and its indexed text
+    runs = db.save_annotation('demo', 1, 'error_text', 7, 11, tag['id'], 'd sat', db_path)
+    assert search_hits(db_path, 'sat', 'annotations') == [runs['id']]
+    db.delete_annotation('demo', runs['id'], db_path)
+    assert search_hits(db_path, 'sat', 'annotations') == []
+
+    db.update_note('demo', note['id'], 'agreement', 'fixed in the correction', db_path)
+    assert search_hits(db_path, 'disagree', 'notes') == []
+    assert search_hits(db_path, 'correction', 'notes') == [note['id']]
+    db.delete_note('demo', note['id'], db_path)
+    assert search_hits(db_path, 'correction', 'notes') == []
+
+    with db.transaction('demo', db_path) as conn:
+        for fts in db.FTS_TABLES:
+            # rank 1 also compares the index with its content table
+            if db._has_fts(conn.cursor(), fts):
+                conn.execute(f"INSERT INTO {fts} ({fts}, rank) VALUES ('integrity-check', 1)")
+        assert db.annotation_count_summary(conn, search_query='bird')['total'] == 0
+
+
+def test_nlp_rows_are_upserted_and_pruned(tmp_path):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    db.create_project_db('demo', '', 'en', db_path)
+
+    def token(pair_id, position, tag, text_type='error_text'):
+        return {'pair_id': pair_id, 'text_type': text_type, 'token': 'w', 'position': position, 'tag': tag, 'lemma': 'w'}
+
+    db.save_google_nlp_to_database('demo', 'tokens', [token(1, 0, 'DET'), token(1, 4, 'NOUN'), token(1, 9, 'VERB'),
+                                                      token(1, 0, 'DET', 'corrected_text'), token(2, 0, 'DET')], db_path)
+    # A rerun of pair 1's error text: one row changed, one gone, one unchanged (sent twice)
+    db.save_google_nlp_to_database('demo', 'tokens', [token(1, 0, 'DET'), token(1, 4, 'PRON'), token(1, 0, 'DET')],
+                                   db_path)
+
+    with db.transaction('demo', db_path) as conn:
+        rows = conn.execute('SELECT pair_id, text_type, position, tag FROM tokens ORDER BY pair_id, text_type, position')
+        assert rows.fetchall() == [(1, 'corrected_text', 0, 'DET'), (1, 'error_text', 0, 'DET'),
+                                   (1, 'error_text', 4, 'PRON'), (2, 'error_text', 0, 'DET')]
+
+
+def test_rename_keeps_annotations(tmp_path):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    user = db.create_user(db_path, 'ana', 'x')
+    db.create_project_db('demo', '', 'en', db_path, owner_id=user['id'])
+    db.save_csv_data_stream('demo', iter([[('the cat sat', 'the cat sits')]]), db_path)
+    tag = db.create_tag('demo', 'verb', '', None, '#000000', db_path)
+    saved = db.save_annotation('demo', 1, 'error_text', 8, 11, tag['id'], 'sat', db_path)
+
+    db.update_project_db('demo', 'renamed', '', 'en', db_path, user['id'])
+    assert not os.path.exists(os.path.join(db_path, 'demo.db'))
+    assert db.get_annotation('renamed', saved['id'], db_path) == dict(saved, project_name='renamed')
+
+    # The renamed file gets a writer of its own
+    db.save_annotation('renamed', 1, 'corrected_text', 8, 12, tag['id'], 'sits', db_path)
+    with db.transaction('renamed', db_path) as conn:
+        assert db.annotation_count_summary(conn)['by_data_type'] == {'error_text': 1, 'corrected_text': 1}
@@ -0,0 +1,58 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+Diff processing redoes a pair only when its texts, the project language or its NLP rows changed.
+"""
+
+from modules import db
+from modules.diff_handler import process_and_save_text_pairs
+
+
+def diff_texts(db_path):
+    with db.transaction('demo', db_path) as conn:
+        return dict(conn.execute('SELECT pair_id, diff_text FROM diff_data ORDER BY pair_id').fetchall())
+
+
+def test_unchanged_pairs_are_skipped(tmp_path):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    user = db.create_user(db_path, 'ana', 'x')
+    db.create_project_db('demo', '', 'en', db_path, owner_id=user['id'])
+    db.save_csv_data_stream('demo', iter([[('the cat sat', 'the cat sits'), ('a dog ran', 'a dog runs'),
+                                           ('we was', 'we were')]]), db_path)
+
+    assert process_and_save_text_pairs('demo', db_path, None) == 3
+    assert process_and_save_text_pairs('demo', db_path, None) == 0
+    before = diff_texts(db_path)
+
+    # Edited texts
+    with db.transaction('demo', db_path) as conn:
+        conn.execute("UPDATE csv_data SET corrected_text = 'a dog is running' WHERE id = 2")
+    assert process_and_save_text_pairs('demo', db_path, None) == 1
+    after = diff_texts(db_path)
+    assert after[1] == before[1] and after[3] == before[3]
+    assert 'running' in db.decode_diff_text(after[2])
+
+    # New NLP rows for one pair
+    db.save_google_nlp_to_database('demo', 'tokens', [
+        {'pair_id': 3, 'text_type': 'error_text', 'token': 'was', 'position': 3, 'tag': 'VERB', 'lemma': 'be'}], db_path)
+    assert process_and_save_text_pairs('demo', db_path, None) == 1
+
+    # Another project language, a pair_ids subset, and force
+    db.update_project_db('demo', 'demo', '', 'fr', db_path, user['id'])
+    assert process_and_save_text_pairs('demo', db_path, None, pair_ids=[1]) == 1
+    assert process_and_save_text_pairs('demo', db_path, None) == 2
+    assert process_and_save_text_pairs('demo', db_path, None, force=True) == 3
@@ -0,0 +1,62 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+A database is due for maintenance once it is idle; a leaked connection does not keep it busy.
+"""
+
+import os
+import threading
+
+from modules import db, maintenance
+
+
+def test_stale_lease_does_not_block_maintenance(tmp_path, monkeypatch):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    db.create_project_db('demo', '', 'en', db_path)
+    project_db = os.path.abspath(os.path.join(db_path, 'demo.db'))
+    monkeypatch.setattr(maintenance, 'MAINTENANCE_IDLE_SECONDS', 0)
+
+    leaked = db.get_connection(project_db)
+    try:
+        # A fresh checkout is activity
+        assert project_db not in maintenance.due_databases(db_path)
+
+        # The same checkout held past the stale-lease limit is taken as leaked
+        monkeypatch.setattr(maintenance, 'MAINTENANCE_STALE_LEASE_SECONDS', 0)
+        assert project_db in maintenance.due_databases(db_path)
+    finally:
+        leaked.close()
+
+
+def test_maintenance_locks_only_its_own_file(tmp_path):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    for name in ('demo', 'other'):
+        db.create_project_db(name, '', 'en', db_path)
+    project_db = os.path.join(db_path, 'demo.db')
+
+    # While demo.db is being maintained, another project can still be deleted
+    with db.file_lock(project_db):
+        maintain = threading.Thread(target=maintenance.maintain_db, args=(project_db, True))
+        maintain.start()
+        delete = threading.Thread(target=db.delete_project_db, args=('other', db_path))
+        delete.start()
+        delete.join(5)
+        assert not delete.is_alive()
+        assert not os.path.exists(os.path.join(db_path, 'other.db'))
+        assert maintain.is_alive()
+    maintain.join()
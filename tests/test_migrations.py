@@ -0,0 +1,130 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+Project DBs created before the migration framework must migrate to SCHEMA_VERSION.
+"""
+
+import json
+import os
+import sqlite3
+
+from modules import db
+
+# Schema of a project DB as created by the first release (PRAGMA user_version 0)
+BASELINE_SCHEMA = '''
+CREATE TABLE csv_data (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, error_text TEXT NOT NULL, corrected_text TEXT NOT NULL,
+    meaning TEXT, genre TEXT, title TEXT
+);
+CREATE TABLE json_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, pair_id TEXT NOT NULL, data_type TEXT NOT NULL, json_content JSON NOT NULL
+);
+CREATE TABLE classifications (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, pair_id INTEGER, text_type TEXT, category_name TEXT, confidence REAL
+);
+CREATE TABLE tokens (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, pair_id INTEGER, text_type TEXT, token TEXT, "position" INTEGER,
+    tag TEXT, "number" TEXT, proper TEXT, aspect TEXT, "case" TEXT, form TEXT, gender TEXT, mood TEXT,
+    person TEXT, reciprocity TEXT, tense TEXT, voice TEXT, head_token INTEGER, label TEXT, lemma TEXT,
+    tag_code INTEGER, number_code INTEGER, proper_code INTEGER, aspect_code INTEGER, case_code INTEGER,
+    form_code INTEGER, gender_code INTEGER, mood_code INTEGER, person_code INTEGER, reciprocity_code INTEGER,
+    tense_code INTEGER, voice_code INTEGER, dep_label_code INTEGER
+);
+CREATE TABLE entities (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, pair_id INTEGER, text_type TEXT, name TEXT, type TEXT, content TEXT,
+    position INTEGER, common_or_proper TEXT, entity_type_code INTEGER, mention_type_code INTEGER
+);
+CREATE TABLE tags (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, description TEXT, parent_tag_id INTEGER,
+    color TEXT NOT NULL DEFAULT '#000000'
+);
+CREATE TABLE annotations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, project_name TEXT NOT NULL, pair_id INTEGER NOT NULL,
+    data_type TEXT NOT NULL, start_offset INTEGER NOT NULL, end_offset INTEGER NOT NULL, tag_id INTEGER NOT NULL,
+    text TEXT
+);
+CREATE TABLE nlp_conclusions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, pair_id INTEGER NOT NULL UNIQUE, conclusion TEXT, inconsistencies TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE nlp_linguistic_analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, pair_id INTEGER NOT NULL UNIQUE, analysis_json TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE auto_tagging_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, pair_id INTEGER NOT NULL, instruction TEXT NOT NULL, plan TEXT,
+    status TEXT NOT NULL DEFAULT 'PENDING', result TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP, updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+'''
+
+
+def make_baseline_project(db_path, name):
+    db.init_db(db_path)
+    conn = sqlite3.connect(os.path.join(db_path, 'maindb.db'))
+    conn.execute('INSERT INTO projects (name, description, language) VALUES (?, ?, ?)', (name, '', 'fr'))
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(os.path.join(db_path, f'{name}.db'))
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute("INSERT INTO csv_data (error_text, corrected_text) VALUES ('le chat mange', 'les chats mangent')")
+    conn.execute("INSERT INTO json_items (pair_id, data_type, json_content) VALUES (?, ?, ?)",
+                 ('1', 'diff', json.dumps({'operation': 'replaced', 'pair_id': 1, 'position_in_diff': 0,
+                                           'position_in_wrong': 0, 'element': 'le', 'Highlights': []})))
+    conn.execute("INSERT INTO tokens (pair_id, text_type, token, position, tag) VALUES (1, 'error_text', 'chat', 3, 'NOUN')")
+    conn.execute("INSERT INTO tags (name) VALUES ('accord')")
+    conn.execute("INSERT INTO annotations (project_name, pair_id, data_type, start_offset, end_offset, tag_id, text) "
+                 "VALUES (?, 1, 'wrong', 0, 2, 1, 'le')", (name,))
+    conn.commit()
+    conn.close()
+
+
+def test_baseline_project_migrates_to_schema_version(tmp_path):
+    db_path = str(tmp_path)
+    make_baseline_project(db_path, 'legacy')
+
+    db.migrate_project_db('legacy', db_path)
+
+    db_file = os.path.join(db_path, 'legacy.db')
+    db.close_connections(db_file)
+    conn = sqlite3.connect(db_file)
+    try:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == db.SCHEMA_VERSION
+        indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {name for name, _, _ in db._PROJECT_INDEXES} <= indexes
+        assert conn.execute("SELECT pair_id, operation FROM json_items").fetchall() == [(1, 'replaced')]
+        assert 'project_name' not in [row[1] for row in conn.execute('PRAGMA table_info(annotations)')]
+        assert conn.execute("SELECT COUNT(*) FROM annotations").fetchone()[0] == 1
+        assert conn.execute("SELECT tag_code FROM tokens").fetchone()[0] is not None
+    finally:
+        conn.close()
+
+
+def test_new_project_builds_index_set_once(tmp_path, capsys):
+    db_path = str(tmp_path)
+    db.init_db(db_path)
+    db.create_project_db('fresh', '', 'en', db_path)
+    db.migrate_project_db('fresh', db_path)
+
+    # Every pending index step is served by one rebuild after the last migration step
+    out = capsys.readouterr().out
+    assert out.count(f'Index set v{db.INDEX_SET_VERSION} applied') == 1
+    with db.transaction('fresh', db_path) as conn:
+        c = conn.cursor()
+        assert db._get_meta(c, 'index_set_version') == str(db.INDEX_SET_VERSION)
+        indexes = {row[0] for row in c.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {name for name, _, _ in db._PROJECT_INDEXES} <= indexes
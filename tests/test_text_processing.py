@@ -0,0 +1,121 @@
+# Copyright © 2025 Sid Ahmed KHETTAB
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/agpl-3.0.html>.
+
+"""
+The NlpIndex lookup behind find_token_in_csv returns the same rows as the linear scan it replaced.
+"""
+
+import random
+
+import pandas as pd
+import pytest
+
+from modules.text_processing import FALLBACK_DISTANCE, NlpIndex, _row_dict, find_token_in_csv
+
+
+def linear_find_token_in_csv(tokens, position, text_type, df):
+    # The DataFrame scan find_token_in_csv used before the offset index
+    results = []
+    column = 'token' if 'token' in df.columns else 'name'
+    for token in tokens:
+        if token.strip() == '':
+            continue
+        matched_rows = df[(df[column].str.lower().str.contains(token.lower(), regex=False)) &
+                          (df['text_type'] == text_type)].copy()
+        if matched_rows.empty:
+            mask = ((df['position'] >= position - FALLBACK_DISTANCE) & (df['position'] <= position + FALLBACK_DISTANCE) &
+                    (df['text_type'] == text_type))
+            matched_rows = df[mask].copy()
+        if not matched_rows.empty:
+            matched_rows.loc[:, 'distance'] = (matched_rows['position'] - position).abs()
+            results.append(_row_dict(matched_rows.loc[matched_rows['distance'].idxmin()]))
+    return results
+
+
+WORDS = ['le', 'chat', 'Chat', 'chats', 'mange', 'la', 'souris', 'Paris', 'de', "l'", 'a', 'été']
+
+
+def tokens_frame(rows):
+    return pd.DataFrame(rows, columns=['pair_id', 'text_type', 'token', 'position', 'tag', 'lemma'])
+
+
+def random_frame(rng, n):
+    rows = []
+    for text_type in ('error_text', 'corrected_text'):
+        position = 0
+        for _ in range(n):
+            word = rng.choice(WORDS)
+            rows.append((1, text_type, word, position, rng.choice(['NOUN', 'VERB', 'DET', None]), word.lower()))
+            # Repeated offsets make ties between rows at the same position
+            position += rng.choice([0, 1, 2, 3, len(word) + 1])
+    rng.shuffle(rows)
+    return tokens_frame(rows)
+
+
+def assert_same(tokens, position, text_type, df, index):
+    expected = linear_find_token_in_csv(tokens, position, text_type, df)
+    assert find_token_in_csv(tokens, position, text_type, index) == expected
+    assert find_token_in_csv(tokens, position, text_type, df) == expected
+
+
+def test_index_matches_linear_scan_on_random_corpus():
+    rng = random.Random(22)
+    for _ in range(20):
+        df = random_frame(rng, rng.randint(1, 40))
+        index = NlpIndex(df)
+        end = int(df['position'].max())
+        for _ in range(30):
+            tokens = rng.sample(WORDS + ['xyz', ' ', 'at', 'ou'], rng.randint(1, 3))
+            position = rng.randint(-8, end + 8)
+            assert_same(tokens, position, rng.choice(['error_text', 'corrected_text', 'other']), df, index)
+
+
+@pytest.mark.parametrize('tokens, position', [
+    (['chat'], 5),            # equidistant rows left and right of the position
+    (['chat'], 10),           # several rows at the same offset
+    (['chat'], 12),           # several rows at the same offset left of the position
+    (['at'], 7),              # substring of several forms
+    (['CHAT'], 0),            # case-insensitive, offset 0
+    (['absent'], 10),         # no match: nearest row within FALLBACK_DISTANCE
+    (['absent'], 10 + FALLBACK_DISTANCE),
+    (['absent'], 15 + FALLBACK_DISTANCE + 1),  # just outside the fallback window
+    (['absent'], -FALLBACK_DISTANCE),
+    (['absent'], -FALLBACK_DISTANCE - 1),
+    (['absent'], 1000),
+    (['', '  ', 'le'], 3),    # blank tokens are skipped
+])
+def test_index_matches_linear_scan_on_edge_cases(tokens, position):
+    df = tokens_frame([
+        (1, 'error_text', 'le', 0, 'DET', 'le'),
+        (1, 'error_text', 'chat', 0, 'NOUN', 'chat'),
+        (1, 'error_text', 'Chat', 10, 'NOUN', 'chat'),
+        (1, 'error_text', 'chats', 10, 'NOUN', 'chat'),
+        (1, 'error_text', 'chat', 10, 'ADJ', 'chat'),
+        (1, 'error_text', 'mange', 15, 'VERB', 'manger'),
+        (1, 'error_text', 'gâteau', None, 'NOUN', 'gâteau'),
+        (1, 'corrected_text', 'chat', 5, 'NOUN', 'chat'),
+    ])
+    assert_same(tokens, position, 'error_text', df, NlpIndex(df))
+
+
+def test_index_matches_linear_scan_on_entities():
+    df = pd.DataFrame([
+        (1, 'error_text', 'Paris', 'LOCATION', 4),
+        (1, 'error_text', 'Marie Curie', 'PERSON', 12),
+        (1, 'error_text', 'Paris-Saclay', 'ORGANIZATION', 20),
+    ], columns=['pair_id', 'text_type', 'name', 'type', 'position'])
+    index = NlpIndex(df)
+    for tokens, position in ((['paris'], 16), (['Curie'], 0), (['Lyon'], 9), (['Lyon'], 30)):
+        assert_same(tokens, position, 'error_text', df, index)